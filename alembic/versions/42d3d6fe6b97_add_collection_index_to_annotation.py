@@ -0,0 +1,26 @@
+"""Add collection index to Annotation
+
+Revision ID: 42d3d6fe6b97
+Revises: f8801fb82be4
+Create Date: 2026-10-18 18:52:16.093412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '42d3d6fe6b97'
+down_revision = 'f8801fb82be4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_annotation_collection', 'annotation',
+                    ['collection_key', 'created', 'key'],
+                    postgresql_where=sa.text('NOT deleted'))
+
+
+def downgrade():
+    op.drop_index('idx_annotation_collection')
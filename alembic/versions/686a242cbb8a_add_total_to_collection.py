@@ -0,0 +1,102 @@
+"""Add total to Collection
+
+Revision ID: 686a242cbb8a
+Revises: 0585e7d309a1
+Create Date: 2026-10-18 10:12:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '686a242cbb8a'
+down_revision = '0585e7d309a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('collection', sa.Column('_total', sa.Integer,
+                                          nullable=False, server_default='0'))
+    sql = ("""
+        CREATE OR REPLACE FUNCTION update_collection_total()
+        RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE collection SET _total = collection._total + delta.n
+                FROM (
+                    SELECT collection_key, count(*) AS n
+                    FROM new_annotation
+                    WHERE deleted IS FALSE
+                    GROUP BY collection_key
+                ) AS delta
+                WHERE collection.key = delta.collection_key;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE collection SET _total = collection._total - delta.n
+                FROM (
+                    SELECT collection_key, count(*) AS n
+                    FROM old_annotation
+                    WHERE deleted IS FALSE
+                    GROUP BY collection_key
+                ) AS delta
+                WHERE collection.key = delta.collection_key;
+            ELSE
+                UPDATE collection SET _total = collection._total + delta.n
+                FROM (
+                    SELECT collection_key, sum(n) AS n
+                    FROM (
+                        SELECT collection_key, count(*) AS n
+                        FROM new_annotation
+                        WHERE deleted IS FALSE
+                        GROUP BY collection_key
+                        UNION ALL
+                        SELECT collection_key, -count(*) AS n
+                        FROM old_annotation
+                        WHERE deleted IS FALSE
+                        GROUP BY collection_key
+                    ) AS changes
+                    GROUP BY collection_key
+                    HAVING sum(n) <> 0
+                ) AS delta
+                WHERE collection.key = delta.collection_key;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE TRIGGER annotation_insert_total
+            AFTER INSERT ON annotation
+            REFERENCING NEW TABLE AS new_annotation
+            FOR EACH STATEMENT EXECUTE PROCEDURE update_collection_total();
+
+        CREATE TRIGGER annotation_update_total
+            AFTER UPDATE ON annotation
+            REFERENCING OLD TABLE AS old_annotation
+            NEW TABLE AS new_annotation
+            FOR EACH STATEMENT EXECUTE PROCEDURE update_collection_total();
+
+        CREATE TRIGGER annotation_delete_total
+            AFTER DELETE ON annotation
+            REFERENCING OLD TABLE AS old_annotation
+            FOR EACH STATEMENT EXECUTE PROCEDURE update_collection_total();
+
+        LOCK TABLE annotation IN SHARE MODE;
+        UPDATE collection SET _total = (
+            SELECT count(*) FROM annotation
+            WHERE annotation.collection_key = collection.key
+            AND annotation.deleted IS FALSE
+        );
+    """)
+    op.execute(sql)
+
+
+def downgrade():
+    sql = ("""
+        DROP TRIGGER annotation_insert_total ON annotation;
+        DROP TRIGGER annotation_update_total ON annotation;
+        DROP TRIGGER annotation_delete_total ON annotation;
+        DROP FUNCTION update_collection_total();
+    """)
+    op.execute(sql)
+    op.drop_column('collection', '_total')
@@ -0,0 +1,121 @@
+"""Add version to Collection
+
+Revision ID: 9e1f0c7a5b2d
+Revises: 42d3d6fe6b97
+Create Date: 2026-10-18 19:02:11.408213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e1f0c7a5b2d'
+down_revision = '42d3d6fe6b97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('collection', sa.Column('_version', sa.Integer,
+                                          nullable=False, server_default='0'))
+    sql = ("""
+        CREATE OR REPLACE FUNCTION update_collection_total()
+        RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE collection SET _total = collection._total + delta.n,
+                                      _version = collection._version + 1
+                FROM (
+                    SELECT collection_key,
+                           count(*) FILTER (WHERE deleted IS FALSE) AS n
+                    FROM new_annotation
+                    GROUP BY collection_key
+                ) AS delta
+                WHERE collection.key = delta.collection_key;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE collection SET _total = collection._total - delta.n,
+                                      _version = collection._version + 1
+                FROM (
+                    SELECT collection_key,
+                           count(*) FILTER (WHERE deleted IS FALSE) AS n
+                    FROM old_annotation
+                    GROUP BY collection_key
+                ) AS delta
+                WHERE collection.key = delta.collection_key;
+            ELSE
+                UPDATE collection SET _total = collection._total + delta.n,
+                                      _version = collection._version + 1
+                FROM (
+                    SELECT collection_key, sum(n) AS n
+                    FROM (
+                        SELECT collection_key,
+                               count(*) FILTER (WHERE deleted IS FALSE) AS n
+                        FROM new_annotation
+                        GROUP BY collection_key
+                        UNION ALL
+                        SELECT collection_key,
+                               -count(*) FILTER (WHERE deleted IS FALSE) AS n
+                        FROM old_annotation
+                        GROUP BY collection_key
+                    ) AS changes
+                    GROUP BY collection_key
+                ) AS delta
+                WHERE collection.key = delta.collection_key;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute(sql)
+
+
+def downgrade():
+    sql = ("""
+        CREATE OR REPLACE FUNCTION update_collection_total()
+        RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE collection SET _total = collection._total + delta.n
+                FROM (
+                    SELECT collection_key, count(*) AS n
+                    FROM new_annotation
+                    WHERE deleted IS FALSE
+                    GROUP BY collection_key
+                ) AS delta
+                WHERE collection.key = delta.collection_key;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE collection SET _total = collection._total - delta.n
+                FROM (
+                    SELECT collection_key, count(*) AS n
+                    FROM old_annotation
+                    WHERE deleted IS FALSE
+                    GROUP BY collection_key
+                ) AS delta
+                WHERE collection.key = delta.collection_key;
+            ELSE
+                UPDATE collection SET _total = collection._total + delta.n
+                FROM (
+                    SELECT collection_key, sum(n) AS n
+                    FROM (
+                        SELECT collection_key, count(*) AS n
+                        FROM new_annotation
+                        WHERE deleted IS FALSE
+                        GROUP BY collection_key
+                        UNION ALL
+                        SELECT collection_key, -count(*) AS n
+                        FROM old_annotation
+                        WHERE deleted IS FALSE
+                        GROUP BY collection_key
+                    ) AS changes
+                    GROUP BY collection_key
+                    HAVING sum(n) <> 0
+                ) AS delta
+                WHERE collection.key = delta.collection_key;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute(sql)
+    op.drop_column('collection', '_version')
@@ -0,0 +1,93 @@
+"""Add tsv columns to Annotation
+
+Revision ID: c65f4b92f96e
+Revises: 686a242cbb8a
+Create Date: 2026-10-18 18:02:47.318250
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c65f4b92f96e'
+down_revision = '686a242cbb8a'
+branch_labels = None
+depends_on = None
+
+# The number of Annotations updated by each backfill statement
+BATCH_SIZE = 10000
+
+
+def upgrade():
+    # Statements are idempotent, so that an interrupted backfill can be
+    # resumed by running the upgrade again
+    sql = ("""
+        ALTER TABLE annotation ADD COLUMN IF NOT EXISTS body_tsv tsvector;
+        ALTER TABLE annotation ADD COLUMN IF NOT EXISTS target_tsv tsvector;
+
+        CREATE OR REPLACE FUNCTION update_annotation_tsv()
+        RETURNS trigger AS $$
+        BEGIN
+            NEW.body_tsv := to_tsvector(lang_cast(NEW.language),
+                                        NEW._data -> 'body');
+            NEW.target_tsv := to_tsvector(lang_cast(NEW.language),
+                                          NEW._data -> 'target');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS annotation_tsv ON annotation;
+        CREATE TRIGGER annotation_tsv
+            BEFORE INSERT OR UPDATE OF _data, language ON annotation
+            FOR EACH ROW EXECUTE PROCEDURE update_annotation_tsv();
+    """)
+    op.execute(sql)
+
+    # Alembic runs each migration in a single transaction, so it is committed
+    # here and after each batch of the backfill. This releases the lock taken
+    # when adding the columns and avoids holding row locks on every
+    # Annotation until the backfill ends. Annotations written meanwhile are
+    # kept up to date by the trigger.
+    conn = op.get_bind()
+    conn.execute('COMMIT')
+    max_key = conn.execute('SELECT max(key) FROM annotation').scalar() or 0
+    backfill = sa.text("""
+        UPDATE annotation SET
+            body_tsv = to_tsvector(lang_cast(language), _data -> 'body'),
+            target_tsv = to_tsvector(lang_cast(language), _data -> 'target')
+        WHERE key >= :start AND key < :end
+    """)
+    for start in range(0, max_key + 1, BATCH_SIZE):
+        conn.execute(backfill, start=start, end=start + BATCH_SIZE)
+        conn.execute('COMMIT')
+
+    # Replace the expression indexes
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_annotation_body_tsv
+            ON annotation USING gin (body_tsv);
+        CREATE INDEX IF NOT EXISTS idx_annotation_target_tsv
+            ON annotation USING gin (target_tsv);
+        DROP INDEX IF EXISTS idx_annotation_body;
+        DROP INDEX IF EXISTS idx_annotation_target;
+    """)
+
+
+def downgrade():
+    sql = ("""
+        CREATE INDEX idx_annotation_body
+            ON annotation
+            USING gin (to_tsvector(lang_cast(language), _data -> 'body'));
+
+        CREATE INDEX idx_annotation_target
+            ON annotation
+            USING gin (to_tsvector(lang_cast(language), _data -> 'target'));
+
+        DROP TRIGGER annotation_tsv ON annotation;
+        DROP FUNCTION update_annotation_tsv();
+    """)
+    op.execute(sql)
+    op.drop_index('idx_annotation_body_tsv')
+    op.drop_index('idx_annotation_target_tsv')
+    op.drop_column('annotation', 'body_tsv')
+    op.drop_column('annotation', 'target_tsv')
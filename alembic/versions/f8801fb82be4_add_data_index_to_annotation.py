@@ -0,0 +1,26 @@
+"""Add data index to Annotation
+
+Revision ID: f8801fb82be4
+Revises: c65f4b92f96e
+Create Date: 2026-10-18 18:31:05.624719
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8801fb82be4'
+down_revision = 'c65f4b92f96e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('idx_annotation_data', 'annotation', ['_data'],
+                    postgresql_using='gin',
+                    postgresql_ops={'_data': 'jsonb_path_ops'})
+
+
+def downgrade():
+    op.drop_index('idx_annotation_data')
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""Compare the latency of contains searches with and without the data index.
+
+A temporary table of synthetic Annotation data is generated for each number
+of rows, so no existing data is read or modified.
+
+Usage: python benchmarks/contains.py <database_uri> [rows ...]
+"""
+
+import sys
+import json
+import time
+from sqlalchemy import create_engine, text
+
+
+populate = text("""
+    INSERT INTO benchmark_annotation (_data)
+    SELECT jsonb_build_object(
+        'type', 'Annotation',
+        'motivation', 'tagging',
+        'body', jsonb_build_object(
+            'type', 'TextualBody',
+            'purpose', 'tagging',
+            'value', 'tag' || (g % 1000)
+        ),
+        'target', jsonb_build_object(
+            'source', 'http://example.org/page' || (g % 10000)
+        )
+    )
+    FROM generate_series(1, :rows) AS g
+""")
+
+search = text("""
+    SELECT count(*) FROM benchmark_annotation WHERE _data @> :query
+""")
+
+queries = [
+    {'target': {'source': 'http://example.org/page42'}},
+    {'body': {'value': 'tag42'}},
+    {'motivation': 'tagging', 'body': {'value': 'tag7'}},
+]
+
+
+def time_queries(conn, repeat):
+    """Return the median latency in ms of each query."""
+    latencies = []
+    for query in queries:
+        params = dict(query=json.dumps(query))
+        timings = []
+        for _ in range(repeat):
+            start = time.time()
+            conn.execute(search, **params).scalar()
+            timings.append((time.time() - start) * 1000)
+        latencies.append(sorted(timings)[len(timings) // 2])
+    return latencies
+
+
+def main(uri, sizes, repeat=5):
+    engine = create_engine(uri)
+    with engine.connect() as conn:
+        for rows in sizes:
+            conn.execute('DROP TABLE IF EXISTS benchmark_annotation')
+            conn.execute("""
+                CREATE TEMPORARY TABLE benchmark_annotation (
+                    key serial PRIMARY KEY,
+                    _data jsonb
+                )
+            """)
+            conn.execute(populate, rows=rows)
+            conn.execute('ANALYZE benchmark_annotation')
+            before = time_queries(conn, repeat)
+
+            conn.execute("""
+                CREATE INDEX ON benchmark_annotation
+                USING gin (_data jsonb_path_ops)
+            """)
+            conn.execute('ANALYZE benchmark_annotation')
+            after = time_queries(conn, repeat)
+
+            print('{0:<58} {1:>12} {2:>12}'.format(
+                '{0} rows'.format(rows), 'no index', 'index'))
+            for query, b, a in zip(queries, before, after):
+                print('  {0:<56} {1:>9.1f} ms {2:>9.1f} ms'.format(
+                    json.dumps(query), b, a))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    sizes = [int(n) for n in sys.argv[2:]] or [1000000, 10000000]
+    main(sys.argv[1], sizes)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+"""Measure the latency, throughput and memory use of the API endpoints.
+
+For each dataset size a disposable database is seeded with generated
+Annotations and requests are made to the app in-process. The p50, p95 and
+p99 latencies, rows per second and peak RSS of each endpoint are printed and
+can be saved as JSON, to be compared against the results of another commit.
+
+The database is created using the given URI, which should point to an
+existing database on a local server, and is dropped when finished.
+
+Usage: python benchmarks/endpoints.py <database_uri> [options]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import platform
+import threading
+import subprocess
+from timeit import default_timer
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine.url import make_url
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#: The number of Annotations created or deleted by each batch request.
+BATCH_SIZE = 100
+
+
+class RSSSampler(object):
+    """Record the peak resident set size of this process within a block.
+
+    The size is sampled from /proc where available. Otherwise the peak size
+    of the process so far is used, which will never decrease.
+    """
+
+    interval = 0.005
+
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample)
+        self._thread.daemon = True
+
+    def _get_rss(self):
+        """Return the resident set size in bytes."""
+        try:
+            with open('/proc/self/statm') as f:
+                pages = int(f.read().split()[1])
+            return pages * os.sysconf('SC_PAGE_SIZE')
+        except (IOError, OSError):
+            import resource
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._get_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._get_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._get_rss())
+
+
+def percentile(values, p):
+    """Return the nearest-rank percentile of a list of values."""
+    values = sorted(values)
+    index = int(round(p / 100.0 * len(values) + 0.5)) - 1
+    return values[min(max(index, 0), len(values) - 1)]
+
+
+def get_commit():
+    """Return the current commit, if known."""
+    try:
+        out = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                      cwd=ROOT, stderr=subprocess.STDOUT)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.decode('utf8').strip()
+
+
+def make_annotation(i):
+    """Return an Annotation to be posted."""
+    return {
+        'type': 'Annotation',
+        'motivation': 'commenting',
+        'body': {
+            'type': 'TextualBody',
+            'value': 'benchmark comment {}'.format(i),
+            'language': 'en'
+        },
+        'target': 'http://example.org/benchmark/page{}'.format(i)
+    }
+
+
+def get_cases(collection_id, collection_iri, total, page_size, repeat):
+    """Return the requests to be made for each endpoint.
+
+    Each case includes a function that makes one request and a function
+    that returns the number of Annotations in its response.
+    """
+    json_type = 'application/json'
+    last_page = max(total - 1, 0) // page_size
+    created = []
+
+    def search(query):
+        data = json.dumps(dict(query, collection=collection_iri, limit=100))
+        return lambda client: client.get('/search/', data=data,
+                                         content_type=json_type)
+
+    def batch_create(client):
+        data = json.dumps([make_annotation(i) for i in range(BATCH_SIZE)])
+        endpoint = '/batch/?collection={}'.format(collection_iri)
+        res = client.post(endpoint, data=data, content_type=json_type)
+        created.extend(json.loads(res.data.decode('utf8'))['items'])
+        return res
+
+    def batch_delete(client):
+        ids = [{'id': iri} for iri in created[-BATCH_SIZE:]]
+        del created[-BATCH_SIZE:]
+        return client.delete('/batch/', data=json.dumps(ids),
+                             content_type=json_type)
+
+    def count_items(data):
+        if 'first' in data:
+            data = data['first']
+        return len(data.get('items', []))
+
+    collection_url = '/annotations/{}/'.format(collection_id)
+    return [
+        ('collection', repeat, lambda client: client.get(collection_url),
+         count_items),
+        ('first_page', repeat,
+         lambda client: client.get(collection_url + '?page=0'), count_items),
+        ('last_page', repeat,
+         lambda client: client.get(collection_url +
+                                   '?page={}'.format(last_page)),
+         count_items),
+        ('search_fts', repeat,
+         search({'fts': {'body': {'query': 'archive'}}}), count_items),
+        ('search_contains', repeat,
+         search({'contains': {'body': {'value': 'person'}}}), count_items),
+        ('export', max(repeat // 10, 1),
+         lambda client: client.get('/export/{}/'.format(collection_id)),
+         len),
+        ('create', repeat,
+         lambda client: client.post(collection_url,
+                                    data=json.dumps(make_annotation(0)),
+                                    content_type=json_type),
+         lambda data: 1),
+        ('batch_create', repeat, batch_create, lambda data: BATCH_SIZE),
+        ('batch_delete', repeat, batch_delete, lambda data: BATCH_SIZE)
+    ]
+
+
+def run_case(client, request, count_rows, repeat, warmup=2):
+    """Make the requests for an endpoint and return the results."""
+    latencies = []
+    rows = 0
+    for i in range(warmup + repeat):
+        start = default_timer()
+        res = request(client)
+        body = res.get_data()
+        seconds = default_timer() - start
+        if res.status_code >= 400:
+            raise RuntimeError('{0} {1}'.format(res.status, body[:500]))
+        if i >= warmup:
+            latencies.append(seconds * 1000)
+            data = json.loads(body.decode('utf8')) if body else None
+            rows += count_rows(data)
+    return latencies, rows
+
+
+def seed(app, n, seed_value, env):
+    """Rebuild the database with n generated Annotations."""
+    from explicates.core import db
+    from explicates.model.collection import Collection
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(Collection(id='benchmark'))
+        db.session.commit()
+        db.session.remove()
+    script = os.path.join(ROOT, 'bin', 'generate_annotations.py')
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call([sys.executable, script, str(n), 'benchmark',
+                               '--seed', str(seed_value),
+                               '--deleted-ratio', '0.05'],
+                              env=env, stdout=devnull)
+    with app.app_context():
+        with db.engine.connect() as conn:
+            conn.execution_options(isolation_level='AUTOCOMMIT')
+            conn.execute('VACUUM ANALYZE')
+
+
+def benchmark(app, sizes, repeat, seed_value, env):
+    """Return the results for each dataset size."""
+    from explicates.core import repo
+    from explicates.model.collection import Collection
+    results = {}
+    for n in sizes:
+        print('Seeding {} Annotations...'.format(n))
+        seed(app, n, seed_value, env)
+        with app.app_context():
+            collection = repo.get_by(Collection, id='benchmark')
+            collection_iri, total = collection.iri, collection.total
+        page_size = app.config['ANNOTATIONS_PER_PAGE']
+        cases = get_cases('benchmark', collection_iri, total, page_size,
+                          repeat)
+        client = app.test_client()
+        results[str(n)] = size_results = {}
+        for name, case_repeat, request, count_rows in cases:
+            with RSSSampler() as sampler:
+                latencies, rows = run_case(client, request, count_rows,
+                                           case_repeat)
+            size_results[name] = {
+                'requests': len(latencies),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'rows_per_second': rows / (sum(latencies) / 1000),
+                'peak_rss_mb': sampler.peak / 1024.0 / 1024.0
+            }
+            print_result(n, name, size_results[name])
+    return results
+
+
+def print_result(n, name, result, previous=None):
+    """Print the results for an endpoint, with any change from before."""
+    line = ('{0:>9} {1:<16} p50 {p50_ms:>8.1f}ms  p95 {p95_ms:>8.1f}ms  '
+            'p99 {p99_ms:>8.1f}ms  {rows_per_second:>10.0f} rows/s  '
+            'RSS {peak_rss_mb:>6.1f}MB').format(n, name, **result)
+    if previous:
+        changes = []
+        for key in ['p50_ms', 'p95_ms', 'rows_per_second']:
+            if previous.get(key):
+                change = (result[key] / previous[key] - 1) * 100
+                changes.append('{0} {1:+.0f}%'.format(key, change))
+        line += '  (' + ', '.join(changes) + ')'
+    print(line)
+
+
+def compare(results, path):
+    """Print the results alongside those saved for another run."""
+    with open(path) as f:
+        previous = json.load(f)
+    print('\nCompared with {}:'.format(previous.get('commit') or path))
+    for n, size_results in sorted(results.items(), key=lambda x: int(x[0])):
+        for name, result in sorted(size_results.items()):
+            prev = previous['results'].get(n, {}).get(name)
+            print_result(n, name, result, prev)
+
+
+def drop_database(engine, db_name):
+    """Drop a database, closing any connections that are still open."""
+    engine.execute(text("""
+        SELECT pg_terminate_backend(pid) FROM pg_stat_activity
+        WHERE datname = :db_name AND pid <> pg_backend_pid()
+    """), db_name=db_name)
+    engine.execute('DROP DATABASE IF EXISTS {}'.format(db_name))
+
+
+def main(uri, sizes, repeat=50, seed_value=0, output=None, settings=None,
+         page_size=100, previous=None):
+    url = make_url(uri)
+    db_name = 'explicates_benchmark_{}'.format(os.getpid())
+    admin_engine = create_engine(uri, isolation_level='AUTOCOMMIT')
+    admin_engine.execute('CREATE DATABASE {}'.format(db_name))
+    url.database = db_name
+
+    base_settings = ''
+    if settings:
+        with open(settings) as f:
+            base_settings = f.read()
+    settings_file = tempfile.NamedTemporaryFile('w', suffix='.py',
+                                                delete=False)
+    with settings_file:
+        settings_file.write(base_settings)
+        settings_file.write('\nSQLALCHEMY_DATABASE_URI = {0!r}\n'
+                            'SQLALCHEMY_DATABASE_TEST_URI = None\n'
+                            'SQLALCHEMY_BINDS = None\n'
+                            'SERVER_NAME = \'localhost\'\n'
+                            'ANNOTATIONS_PER_PAGE = {1}\n'
+                            .format(str(url), page_size))
+    env = dict(os.environ, EXPLICATES_SETTINGS=settings_file.name,
+               PYTHONPATH=os.pathsep.join([ROOT] + sys.path))
+    os.environ['EXPLICATES_SETTINGS'] = settings_file.name
+
+    try:
+        from explicates.core import create_app
+        app = create_app()
+        results = benchmark(app, sizes, repeat, seed_value, env)
+    finally:
+        os.remove(settings_file.name)
+        drop_database(admin_engine, db_name)
+
+    out = {
+        'commit': get_commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'seed': seed_value,
+        'page_size': page_size,
+        'results': results
+    }
+    if output:
+        with open(output, 'w') as f:
+            json.dump(out, f, indent=2, sort_keys=True)
+        print('\nSaved results to {}'.format(output))
+    if previous:
+        compare(results, previous)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('uri', help='the URI of an existing local database')
+    parser.add_argument('sizes', type=int, nargs='*',
+                        default=[1000, 10000, 100000],
+                        help='the dataset sizes (default 1000 10000 100000)')
+    parser.add_argument('-r', '--repeat', type=int, default=50,
+                        help='the number of requests to each endpoint')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='the seed for the generated Annotations')
+    parser.add_argument('--page-size', type=int, default=100,
+                        help='the number of Annotations per page')
+    parser.add_argument('--settings',
+                        help='a settings file to benchmark the app with')
+    parser.add_argument('-o', '--output', help='save the results as JSON')
+    parser.add_argument('-c', '--compare',
+                        help='compare with results saved by another run')
+    args = parser.parse_args()
+    main(args.uri, args.sizes, repeat=args.repeat, seed_value=args.seed,
+         output=args.output, settings=args.settings,
+         page_size=args.page_size, previous=args.compare)
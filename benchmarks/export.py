@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Compare the rate at which Annotations are serialized for export.
+
+Synthetic rows are serialized in memory, so no database is required.
+
+Usage: python benchmarks/export.py [n]
+"""
+
+import sys
+import json
+import time
+
+from explicates.core import create_app
+
+
+def make_rows(n):
+    """Return rows as streamed from the annotation table."""
+    return [{
+        'key': i,
+        'id': 'annotation-{}'.format(i),
+        'created': '2018-05-27T19:44:10Z',
+        'modified': None,
+        'deleted': False,
+        'collection_key': 1,
+        'language': 'english',
+        '_data': {
+            'type': 'Annotation',
+            'motivation': 'tagging',
+            'body': {
+                'type': 'TextualBody',
+                'purpose': 'tagging',
+                'value': 'tag{}'.format(i % 1000)
+            },
+            'target': {
+                'source': 'http://example.org/page{}'.format(i % 10000),
+                'selector': {
+                    'type': 'FragmentSelector',
+                    'value': '?xywh=10,20,30,40'
+                }
+            }
+        }
+    } for i in range(n)]
+
+
+def serialize_orm(collection, rows):
+    """Serialize as before, via an Annotation object for each row."""
+    from explicates.model.annotation import Annotation
+    for row in rows:
+        anno = Annotation(**dict(row))
+        anno.collection = collection
+        json.dumps(anno.dictize())
+
+
+def serialize_rows(collection, rows):
+    """Serialize each row directly."""
+    from explicates.exporter import Exporter
+    serialize = Exporter()._get_serializer(collection)
+    for row in rows:
+        serialize(row)
+
+
+def main(n):
+    app = create_app()
+    rows = make_rows(n)
+    with app.test_request_context():
+        from explicates.model.collection import Collection
+        collection = Collection(id='collection1', data={})
+        results = [
+            ('ORM objects', serialize_orm),
+            ('raw rows', serialize_rows)
+        ]
+        for label, func in results:
+            start = time.time()
+            func(collection, rows)
+            seconds = time.time() - start
+            print('{0:<12} {1:>10.0f} rows/second'.format(label, n / seconds))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Compare the cost of encoding AnnotationPages and exports as JSON.
+
+Each supported encoder that is installed is compared against Flask's
+jsonify, which sorts keys and, when debugging, pretty-prints the output.
+
+Usage: python benchmarks/serialization.py [n]
+"""
+
+import sys
+import json
+import timeit
+
+from flask import jsonify
+
+from explicates.core import create_app
+from explicates.encoder import JSONEncoder
+
+
+def make_annotation(i):
+    """Return a dictized Annotation."""
+    return {
+        'id': 'http://example.org/annotations/collection1/{}/'.format(i),
+        'type': 'Annotation',
+        'motivation': 'tagging',
+        'created': '2018-05-27T19:44:10Z',
+        'generated': '2018-05-27T19:44:10Z',
+        'generator': 'http://example.org/client1',
+        'body': {
+            'type': 'TextualBody',
+            'purpose': 'tagging',
+            'value': 'tag{}'.format(i % 1000)
+        },
+        'target': {
+            'source': 'http://example.org/page{}'.format(i % 10000),
+            'selector': {
+                'type': 'FragmentSelector',
+                'value': '?xywh=10,20,30,40'
+            }
+        }
+    }
+
+
+def make_page(n):
+    """Return a dictized AnnotationPage of n Annotations."""
+    return {
+        '@context': 'http://www.w3.org/ns/anno.jsonld',
+        'id': 'http://example.org/annotations/collection1/?page=0',
+        'type': 'AnnotationPage',
+        'startIndex': 0,
+        'items': [make_annotation(i) for i in range(n)]
+    }
+
+
+def get_encoders():
+    """Return the installed encoders."""
+    encoders = []
+    for backend in JSONEncoder.backends:
+        try:
+            encoders.append((backend, JSONEncoder(backend).dumps))
+        except ImportError:
+            print('{} is not installed'.format(backend))
+    return encoders
+
+
+def main(n):
+    app = create_app()
+    page = make_page(1000)
+    annotations = [make_annotation(i) for i in range(n)]
+    with app.test_request_context():
+        results = [('jsonify', lambda obj: jsonify(obj).get_data())]
+        results += get_encoders()
+        print('AnnotationPage of 1000 items (debug={})'.format(app.debug))
+        for label, func in results:
+            seconds = timeit.timeit(lambda: func(page), number=10)
+            print('  {0:<10} {1:>8.1f} ms/page'.format(label, seconds * 100))
+
+        print('Export of {} Annotations'.format(n))
+        for label, func in results[1:]:
+            seconds = timeit.timeit(lambda: [func(a) for a in annotations],
+                                    number=1)
+            print('  {0:<10} {1:>8.0f} rows/second'.format(label, n / seconds))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""Compare the per-request cost of JSON schema validation.
+
+Usage: python benchmarks/validation.py [n]
+"""
+
+import os
+import sys
+import json
+import timeit
+from jsonschema import validate as validate_json
+
+from explicates.validator import Validator
+from explicates.model.annotation import Annotation
+from explicates.model.collection import Collection
+
+
+here = os.path.dirname(os.path.abspath(__file__))
+schemas_dir = os.path.join(os.path.dirname(here), 'explicates', 'schemas')
+
+data = {
+    'type': 'Annotation',
+    'motivation': 'tagging',
+    'body': {
+        'type': 'TextualBody',
+        'purpose': 'tagging',
+        'value': 'foo',
+        'language': 'en'
+    },
+    'target': {
+        'source': 'http://example.org/page1',
+        'selector': {
+            'type': 'FragmentSelector',
+            'value': '?xywh=10,20,30,40'
+        }
+    }
+}
+
+
+def validate_from_file():
+    """Validate as before, reading the schema from disk every time."""
+    schema_path = os.path.join(schemas_dir, 'annotation.json')
+    with open(schema_path) as json_file:
+        schema = json.load(json_file)
+        validate_json(data, schema)
+
+
+def main(n):
+    validator = Validator([Annotation, Collection], schemas_dir)
+    results = [
+        ('schema read per request', validate_from_file),
+        ('cached validator', lambda: validator.validate(data, Annotation))
+    ]
+    for label, func in results:
+        seconds = timeit.timeit(func, number=n)
+        print('{0:<24} {1:>8.1f} us/request'.format(label, seconds / n * 1e6))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""Dump the Annotations in an AnnotationCollection to a file.
+
+Usage: python bin/export_collection.py collection_id out.json [options]
+"""
+
+import io
+import sys
+import argparse
+
+from explicates.core import create_app
+
+
+app = create_app()
+
+
+def export_collection(collection_id, path, workers=1, processes=False,
+                      ndjson=False):
+    """Export an AnnotationCollection in parallel partitions."""
+    if not app.config.get('SERVER_NAME'):
+        sys.exit('SERVER_NAME must be configured to generate Annotation IRIs')
+
+    from explicates.exporter import Exporter
+    exporter = Exporter(workers=workers, processes=processes)
+    with app.app_context():
+        if ndjson:
+            data_gen = exporter.generate_ndjson(collection_id)
+        else:
+            data_gen = exporter.generate_data(collection_id)
+        with io.open(path, 'w', encoding='utf8') as f:
+            for chunk in data_gen:
+                f.write(chunk)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('collection_id')
+    parser.add_argument('path')
+    parser.add_argument('-w', '--workers', type=int, default=4,
+                        help='the number of workers (default 4)')
+    parser.add_argument('-p', '--processes', action='store_true',
+                        help='use worker processes rather than threads')
+    parser.add_argument('--ndjson', action='store_true',
+                        help='write newline-delimited JSON')
+    args = parser.parse_args()
+    export_collection(args.collection_id, args.path, workers=args.workers,
+                      processes=args.processes, ndjson=args.ndjson)
@@ -1,26 +1,244 @@
 #!/usr/bin/env python
+# -*- coding: utf8 -*-
+"""Generate realistic Annotations in an AnnotationCollection for testing.
+
+The Annotations are multilingual, with bodies of varying length and targets
+with selectors, so that full-text and contains searches can be benchmarked.
+They are generated in chunks, each seeded from the given seed and its
+position, so the same seed always produces the same data, however many
+processes are used.
+
+Usage: python bin/generate_annotations.py n collection_id [options]
+"""
 
 import sys
+import math
+import uuid
+import random
+import argparse
+import multiprocessing
+from datetime import datetime, timedelta
 
-from explicates.core import db, create_app
-from explicates.model.collection import Collection
-from explicates.model.annotation import Annotation
+from explicates.core import create_app
 
 
 app = create_app()
 
 
-def generate_annotations(n, collection_key):
-    """Add n Annotations to the AnnotationCollection with collection_key."""
+#: Common words used to build the text of each language.
+VOCABULARY = {
+    'en': u'the archive letter manuscript history library map music river '
+          u'city war king garden church ship painting poem family school '
+          u'language island railway newspaper museum street travel winter',
+    'fr': u'le la les archives lettre manuscrit histoire bibliothèque carte '
+          u'musique rivière ville guerre roi jardin église navire peinture '
+          u'poème famille école langue île journal musée rue voyage hiver',
+    'de': u'der die das Archiv Brief Handschrift Geschichte Bibliothek Karte '
+          u'Musik Fluss Stadt Krieg König Garten Kirche Schiff Gemälde '
+          u'Gedicht Familie Schule Sprache Insel Zeitung Straße Reise Winter',
+    'es': u'el la los archivo carta manuscrito historia biblioteca mapa '
+          u'música río ciudad guerra rey jardín iglesia barco pintura poema '
+          u'familia escuela idioma isla periódico museo calle viaje invierno',
+    'it': u'il la gli archivio lettera manoscritto storia biblioteca mappa '
+          u'musica fiume città guerra re giardino chiesa nave dipinto poesia '
+          u'famiglia scuola lingua isola giornale museo strada viaggio',
+    'nl': u'de het archief brief handschrift geschiedenis bibliotheek kaart '
+          u'muziek rivier stad oorlog koning tuin kerk schip schilderij '
+          u'gedicht familie school taal eiland krant museum straat reis',
+    'ru': u'архив письмо рукопись история библиотека карта музыка река '
+          u'город война король сад церковь корабль картина стихотворение '
+          u'семья школа язык остров газета музей улица путешествие зима'
+}
+
+#: The tags given to tagging Annotations.
+TAGS = [u'person', u'place', u'event', u'date', u'organisation', u'object',
+        u'quote', u'transcription', u'translation', u'correction']
+
+#: The earliest creation time of the Annotations.
+START = datetime(2015, 1, 1)
+
+
+class AnnotationGenerator(object):
+    """Generate the Annotation rows for a chunk of a dataset."""
+
+    def __init__(self, collection_key, seed=0, languages=None, words=20,
+                 words_sigma=1.0, selector_ratio=0.5, deleted_ratio=0.0,
+                 sources=10000):
+        self.collection_key = collection_key
+        self.seed = seed
+        self.languages = sorted(languages or VOCABULARY)
+        self.vocabulary = {lang: VOCABULARY[lang].split()
+                           for lang in self.languages}
+        # Log-normal body lengths with the given mean number of words
+        self.words_mu = math.log(words) - words_sigma ** 2 / 2
+        self.words_sigma = words_sigma
+        self.max_words = words * 50
+        self.selector_ratio = selector_ratio
+        self.deleted_ratio = deleted_ratio
+        self.sources = sources
+
+    def generate_chunk(self, index, size):
+        """Generate the rows for a chunk of the dataset."""
+        from explicates.model.annotation import get_data_language
+        rng = random.Random(self.seed * 2 ** 32 + index)
+        for _ in range(size):
+            data = self._get_data(rng)
+            created = START + timedelta(seconds=rng.randint(0, 10 ** 8))
+            modified = None
+            if rng.random() < 0.2:
+                modified = created + timedelta(seconds=rng.randint(1, 10 ** 6))
+            yield dict(id=str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                       created=self._format_time(created),
+                       modified=self._format_time(modified),
+                       deleted=rng.random() < self.deleted_ratio,
+                       language=get_data_language(data),
+                       collection_key=self.collection_key,
+                       _data=data)
+
+    def _format_time(self, dt):
+        """Return a time in the format used for Annotation timestamps."""
+        return dt.strftime('%Y-%m-%dT%H:%M:%SZ') if dt else None
+
+    def _get_text(self, rng, lang, n_words):
+        """Return some text in a language."""
+        words = self.vocabulary[lang]
+        return u' '.join(rng.choice(words) for _ in range(n_words))
+
+    def _get_data(self, rng):
+        """Return the data for an Annotation."""
+        lang = rng.choice(self.languages)
+        if rng.random() < 0.3:
+            data = {
+                'type': 'Annotation',
+                'motivation': 'tagging',
+                'body': {
+                    'type': 'TextualBody',
+                    'purpose': 'tagging',
+                    'value': rng.choice(TAGS)
+                }
+            }
+        else:
+            n_words = int(rng.lognormvariate(self.words_mu, self.words_sigma))
+            data = {
+                'type': 'Annotation',
+                'motivation': 'commenting',
+                'body': {
+                    'type': 'TextualBody',
+                    'value': self._get_text(rng, lang,
+                                            min(max(n_words, 1),
+                                                self.max_words)),
+                    'format': 'text/plain',
+                    'language': lang
+                }
+            }
+        targets = [self._get_target(rng, lang)
+                   for _ in range(1 if rng.random() < 0.9 else 2)]
+        data['target'] = targets[0] if len(targets) == 1 else targets
+        return data
+
+    def _get_target(self, rng, lang):
+        """Return a target, with a selector for some of them."""
+        # A few sources are annotated much more often than the rest
+        page = int(rng.paretovariate(1.2)) % self.sources
+        source = u'http://example.org/{0}/page{1}'.format(lang, page)
+        if rng.random() >= self.selector_ratio:
+            return source
+        kind = rng.choice(['quote', 'position', 'fragment'])
+        if kind == 'quote':
+            selector = {
+                'type': 'TextQuoteSelector',
+                'exact': self._get_text(rng, lang, rng.randint(1, 5)),
+                'prefix': self._get_text(rng, lang, 2),
+                'suffix': self._get_text(rng, lang, 2)
+            }
+        elif kind == 'position':
+            start = rng.randint(0, 10000)
+            selector = {
+                'type': 'TextPositionSelector',
+                'start': start,
+                'end': start + rng.randint(1, 500)
+            }
+        else:
+            selector = {
+                'type': 'FragmentSelector',
+                'conformsTo': 'http://www.w3.org/TR/media-frags/',
+                'value': 'xywh={0},{1},{2},{3}'.format(
+                    *[rng.randint(0, 2000) for _ in range(4)])
+            }
+        return {'source': source, 'selector': selector}
+
+
+def _copy_chunk(args):
+    """Generate a chunk of Annotations and load them with COPY."""
+    generator, index, size = args
+    from explicates.core import repo
+    from explicates.importer import Importer
+    from explicates.model.annotation import Annotation
     with app.app_context():
-        collection = db.session.query(Collection).get(collection_key)
-        for i in range(n):
-            anno = Annotation(collection=collection)
-            db.session.add(anno)
-        db.session.commit()
+        rows = generator.generate_chunk(index, size)
+        return repo.batch_copy(Annotation, rows, Importer.columns,
+                               chunk_size=size)
+
+
+def generate_annotations(n, collection_id, processes=1, chunk_size=10000,
+                         **kwargs):
+    """Add n generated Annotations to an AnnotationCollection."""
+    from explicates.core import db, repo
+    from explicates.model.collection import Collection
+    with app.app_context():
+        collection = repo.get_by(Collection, id=collection_id)
+        if not collection:
+            sys.exit('Collection not found: {}'.format(collection_id))
+        generator = AnnotationGenerator(collection.key, **kwargs)
+        # Worker processes must not share the parent's connections
+        db.session.remove()
+        db.engine.dispose()
+
+    jobs = [(generator, i, min(chunk_size, n - start))
+            for i, start in enumerate(range(0, n, chunk_size))]
+    pool = None
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(_copy_chunk, jobs)
+    else:
+        results = (_copy_chunk(job) for job in jobs)
+    total = 0
+    try:
+        for loaded in results:
+            total += loaded
+            print('Generated {0}/{1} Annotations'.format(total, n))
+    finally:
+        if pool:
+            pool.terminate()
 
 
 if __name__ == '__main__':
-    n = int(sys.argv[1])
-    collection_key = int(sys.argv[2])
-    generate_annotations(n, collection_key)
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('n', type=int)
+    parser.add_argument('collection_id')
+    parser.add_argument('-s', '--seed', type=int, default=0,
+                        help='the random seed (default 0)')
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help='the number of processes (default 1)')
+    parser.add_argument('-c', '--chunk-size', type=int, default=10000,
+                        help='the number of Annotations loaded at a time')
+    parser.add_argument('-l', '--languages', type=lambda s: s.split(','),
+                        help='comma-separated language codes from: ' +
+                             ', '.join(sorted(VOCABULARY)))
+    parser.add_argument('--words', type=float, default=20,
+                        help='the mean number of words in each comment')
+    parser.add_argument('--words-sigma', type=float, default=1.0,
+                        help='the spread of the log-normal comment lengths')
+    parser.add_argument('--selector-ratio', type=float, default=0.5,
+                        help='the proportion of targets with a selector')
+    parser.add_argument('--deleted-ratio', type=float, default=0.0,
+                        help='the proportion of Annotations marked deleted')
+    args = parser.parse_args()
+    if args.languages and not set(args.languages) <= set(VOCABULARY):
+        parser.error('unsupported languages: {}'.format(args.languages))
+    generate_annotations(args.n, args.collection_id, seed=args.seed,
+                         processes=args.processes, chunk_size=args.chunk_size,
+                         languages=args.languages, words=args.words,
+                         words_sigma=args.words_sigma,
+                         selector_ratio=args.selector_ratio,
+                         deleted_ratio=args.deleted_ratio)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""Load the Annotations in an export file into an AnnotationCollection.
+
+The file may be JSON, newline-delimited JSON or a ZIP file containing either,
+as produced by the export endpoint. The format is taken from the extension.
+
+Usage: python bin/import_collection.py collection_id in.json [options]
+"""
+
+import os
+import sys
+import argparse
+
+from explicates.core import create_app
+
+
+app = create_app()
+
+
+def import_collection(collection_id, path, fmt=None, chunk_size=None):
+    """Import Annotations into an AnnotationCollection."""
+    from explicates.core import repo
+    from explicates.importer import Importer
+    from explicates.model.collection import Collection
+    importer = Importer()
+    if chunk_size:
+        importer.chunk_size = chunk_size
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+    with app.app_context():
+        collection = repo.get_by(Collection, id=collection_id)
+        if not collection:
+            sys.exit('Collection not found: {}'.format(collection_id))
+        with open(path, 'rb') as f:
+            n = importer.import_data(collection, importer.read(f, fmt))
+        print('Imported {0} Annotations into {1}'.format(n, collection_id))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('collection_id')
+    parser.add_argument('path')
+    parser.add_argument('-f', '--format', choices=['json', 'ndjson', 'zip'],
+                        help='the file format, if not given by the extension')
+    parser.add_argument('-c', '--chunk-size', type=int,
+                        help='the number of Annotations loaded at a time')
+    args = parser.parse_args()
+    import_collection(args.collection_id, args.path, fmt=args.format,
+                      chunk_size=args.chunk_size)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+
+from explicates.core import db, create_app
+
+
+app = create_app()
+
+
+def rebuild_totals():
+    """Recount the Annotations in each AnnotationCollection.
+
+    The totals are normally maintained by triggers, this is for repairing
+    them. Writes to Annotations are blocked until the recount is complete.
+    """
+    with app.app_context():
+        db.session.execute("""
+            LOCK TABLE annotation IN SHARE MODE;
+            UPDATE collection SET _total = (
+                SELECT count(*) FROM annotation
+                WHERE annotation.collection_key = collection.key
+                AND annotation.deleted IS FALSE
+            );
+        """)
+        db.session.commit()
+
+
+if __name__ == '__main__':
+    rebuild_totals()
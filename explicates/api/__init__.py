@@ -12,6 +12,8 @@ from explicates.api.index import IndexAPI
 from explicates.api.search import SearchAPI
 from explicates.api.export import ExportAPI
 from explicates.api.batch import BatchAPI
+from explicates.api.imports import ImportAPI
+from explicates.api.metrics import MetricsAPI
 
 
 blueprint = Blueprint('api', __name__)
@@ -30,3 +32,5 @@ register_api(AnnotationsAPI, 'annotations',
 register_api(SearchAPI, 'search', '/search/')
 register_api(ExportAPI, 'export', '/export/<collection_id>/')
 register_api(BatchAPI, 'batch', '/batch/')
+register_api(ImportAPI, 'import', '/import/<collection_id>/')
+register_api(MetricsAPI, 'metrics', '/metrics')
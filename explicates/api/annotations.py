@@ -27,6 +27,9 @@ class AnnotationsAPI(APIBase, MethodView):
     def get(self, collection_id, annotation_id):
         """Get an Annotation."""
         annotation = self._get_annotation(collection_id, annotation_id)
+        not_modified = self._get_not_modified_response(annotation)
+        if not_modified:
+            return not_modified
         return self._jsonld_response(annotation)
 
     def put(self, collection_id, annotation_id):
@@ -7,21 +7,57 @@ Design notes:
   Web Annotation profile, more formats may be added in future.
 """
 
-import os
 import json
+import uuid
+import base64
+import hashlib
+import binascii
+from datetime import datetime
+from itertools import islice
 from flask import current_app
-from flask import abort, request, jsonify, make_response, url_for
-from jsonschema import validate as validate_json
+from flask import abort, request, make_response, url_for
+from flask import Response, stream_with_context
 from jsonschema.exceptions import ValidationError
+from sqlalchemy import any_, bindparam, tuple_, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import IntegrityError
 from past.builtins import basestring
 
-from explicates.core import repo
+from explicates.core import repo, validator, json_encoder, instrumentation
 from explicates.model.annotation import Annotation
 from explicates.model.collection import Collection
 from explicates.model.base import BaseDomainObject
 
 
+class StreamedItems(object):
+    """The items of an AnnotationPage, fetched as the response is sent.
+
+    The query is executed and its first row fetched straight away, so that
+    errors are raised and empty pages found before the response begins.
+    """
+
+    #: The number of rows fetched from the database at a time.
+    batch_size = 100
+
+    def __init__(self, query, decorate):
+        self._rows = iter(query.yield_per(self.batch_size))
+        self._first = next(self._rows, None)
+        self.decorate = decorate
+
+    def __bool__(self):
+        return self._first is not None
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        if self._first is None:
+            return
+        yield self.decorate(self._first)
+        self._first = None
+        for row in self._rows:
+            yield self.decorate(row)
+
+
 class APIBase(object):
 
     def _get_domain_object(self, model_cls, id, **kwargs):
@@ -94,24 +130,48 @@ class APIBase(object):
 
     def _validate_data(self, obj, model_cls):
         """Validate data according JSON schema for the model class."""
-        schema_fn = '{}.json'.format(model_cls.__name__.lower())
-        here = os.path.dirname(os.path.abspath(__file__))
-        schemas_dir = os.path.join(os.path.dirname(here), 'schemas')
-        schema_path = os.path.join(schemas_dir, schema_fn)
-        with open(schema_path) as json_file:
-            schema = json.load(json_file)
-            validate_json(obj, schema)
-
-    def _jsonld_response(self, rv, status_code=200, headers=None):
+        validator.validate(obj, model_cls)
+
+    def _ndjson_requested(self):
+        """Check if the client asked for newline-delimited JSON."""
+        mimetypes = ['application/ld+json', 'application/x-ndjson']
+        best = request.accept_mimetypes.best_match(mimetypes)
+        return best == 'application/x-ndjson'
+
+    def _add_vary_accept(self, response):
+        """Mark a response as negotiated on the Accept header.
+
+        This stops caches serving one format to clients asking for another.
+        """
+        response.vary.add('Accept')
+        return response
+
+    def _ndjson_response(self, generator, headers=None):
+        """Return a streamed newline-delimited JSON Response."""
+        response = Response(stream_with_context(generator),
+                            mimetype='application/x-ndjson')
+        common_headers = getattr(self, 'headers', {})
+        response.headers.extend(common_headers)
+        if headers:
+            response.headers.extend(headers)
+        return response
+
+    def _jsonld_response(self, rv, status_code=200, headers=None,
+                         version=None):
         """Return a JSON-LD Response.
 
         The Web Annotation profile is used for Web Annotations.
 
         See https://www.w3.org/TR/annotation-protocol/#annotation-retrieval
+
+        The version is the domain object from which caching headers are
+        derived, by default the object being returned.
         """
         out = rv if rv else {}
         if isinstance(rv, BaseDomainObject):
-            out = rv.dictize()
+            with instrumentation.serializing():
+                out = rv.dictize()
+            version = version or rv
 
         if not isinstance(out, dict):
             err_msg = '{} is not a valid return value'.format(type(rv))
@@ -119,11 +179,15 @@ class APIBase(object):
 
         context = 'http://www.w3.org/ns/anno.jsonld'
         out['@context'] = context
-        response = jsonify(out)
-        response.mimetype = 'application/ld+json; profile="{}"'.format(context)
+        mimetype = 'application/ld+json; profile="{}"'.format(context)
+        with instrumentation.serializing():
+            body = self._encode_jsonld(out)
+        response = Response(body, mimetype=mimetype)
 
         # Add Etags for HEAD and GET requests
-        if request.method in ['HEAD', 'GET']:
+        if request.method in ['HEAD', 'GET'] and version:
+            self._add_cache_headers(response, version)
+        elif request.method in ['HEAD', 'GET'] and not response.is_streamed:
             response.add_etag()
 
         # Add headers
@@ -136,6 +200,93 @@ class APIBase(object):
         response.status_code = status_code
         return response
 
+    def _encode_jsonld(self, out):
+        """Encode a JSON-LD body.
+
+        If the body contains an AnnotationPage of StreamedItems then the
+        body is streamed, with the items encoded as they are fetched.
+        """
+        page = out.get('first') if isinstance(out.get('first'), dict) else out
+        items = page.get('items')
+        if not isinstance(items, StreamedItems):
+            return json_encoder.dumps(out)
+
+        placeholder = uuid.uuid4().hex
+        page['items'] = placeholder
+        head, _, tail = json_encoder.dumps(out).partition(
+            json_encoder.dumps(placeholder))
+        return stream_with_context(self._generate_jsonld(head, items, tail))
+
+    def _generate_jsonld(self, head, items, tail):
+        """Generate a JSON-LD body around a list of streamed items.
+
+        The items are encoded a batch at a time, so that the time taken to
+        serialize each batch can be recorded separately from sending it.
+        """
+        rows = iter(items)
+        chunk = head + '['
+        separator = ''
+        while True:
+            with instrumentation.serializing():
+                batch = [json_encoder.dumps(item)
+                         for item in islice(rows, items.batch_size)]
+            instrumentation.add_rows(len(batch))
+            if batch:
+                chunk += separator + ','.join(batch)
+                separator = ','
+            if len(batch) < items.batch_size:
+                break
+            yield chunk
+            chunk = ''
+        yield chunk + ']' + tail
+
+    def _get_etag(self, obj):
+        """Return an ETag derived from the version of a domain object.
+
+        For Collections the container preferences are also included, as they
+        change the container representation.
+        """
+        version = obj.get_version()
+        if isinstance(obj, Collection):
+            version += [
+                request.query_string.decode('utf8'),
+                request.headers.get('Prefer')
+            ]
+        raw = json.dumps(version, sort_keys=True).encode('utf8')
+        return hashlib.sha1(raw).hexdigest()
+
+    def _add_cache_headers(self, response, obj):
+        """Add ETag and Last-Modified headers based on a domain object.
+
+        Last-Modified is only given for Annotations, as the modified time of
+        a Collection does not account for all changes to its container, and
+        is skipped for any timestamp not in the expected format.
+        """
+        response.set_etag(self._get_etag(obj), weak=True)
+        timestamp = obj.modified or obj.created
+        if isinstance(obj, Annotation) and timestamp:
+            fmt = '%Y-%m-%dT%H:%M:%SZ'
+            try:
+                response.last_modified = datetime.strptime(timestamp, fmt)
+            except (TypeError, ValueError):
+                pass
+
+    def _get_not_modified_response(self, obj):
+        """Return a 304 response if the client has the current version.
+
+        This allows conditional requests to be handled before anything is
+        queried or dictized. Returns None if the response should be sent.
+        """
+        if request.method not in ['HEAD', 'GET']:
+            return None
+        response = make_response('')
+        self._add_cache_headers(response, obj)
+        response.make_conditional(request)
+        if response.status_code != 304:
+            return None
+        response.headers.extend(getattr(self, 'headers', {}))
+        return response
+
     def _add_link_headers(self, response, out):
         """Add Link headers basic on the domain object."""
         types = out.get('type', [])
@@ -198,9 +349,15 @@ class APIBase(object):
         return minimal, iris
 
     def _get_container(self, collection_base, items=None, total=None,
-                       **params):
-        """Return a container for Annotations."""
-        out = collection_base.dictize()
+                       keyset=False, **params):
+        """Return a container for Annotations.
+
+        If keyset is True then items must be a query for Annotations ordered
+        by created and key, and AnnotationPages will be linked via opaque
+        cursors that seek directly to the next or previous page.
+        """
+        with instrumentation.serializing():
+            out = collection_base.dictize()
         minimal, iris = self._get_container_preferences()
         if not params:
             params = {}
@@ -214,21 +371,39 @@ class APIBase(object):
             out['total'] = total
 
         page = self._get_page_arg()
-        per_page = current_app.config.get('ANNOTATIONS_PER_PAGE')
+        after = request.args.get('after')
+        before = request.args.get('before')
+        per_page = int(current_app.config.get('ANNOTATIONS_PER_PAGE'))
         n_pages = self._get_n_pages(items, out['total'], per_page)
 
         if items:
-            items = self._slice_items(items, int(per_page), page)
-            if isinstance(page, int) and not items:
-                abort(404)
-            elif isinstance(page, int):
-                return self._get_page(page, n_pages, per_page, collection_base,
-                                      items, partof=out, **params)
-            elif minimal:
+            if keyset and (after or before):
+                return self._get_cursor_page(collection_base, items, per_page,
+                                             after=after, before=before,
+                                             partof=out, **params)
+
+            if minimal and not isinstance(page, int):
                 out['first'] = self._get_iri(collection_base, page=0, **params)
             else:
-                out['first'] = self._get_page(0, n_pages, per_page,
-                                              collection_base, items, **params)
+                keys = None
+                page_items = self._slice_items(items, per_page, page)
+                if keyset:
+                    keys = self._get_item_keys(page_items)
+                    page_items = self._filter_items_by_key(items, keys)
+
+                page_items = self._stream_page_items(page_items,
+                                                     params.get('iris'))
+                if isinstance(page, int) and not page_items:
+                    abort(404)
+                elif isinstance(page, int):
+                    return self._get_numbered_page(page, n_pages,
+                                                   collection_base,
+                                                   page_items, keys=keys,
+                                                   partof=out, **params)
+                out['first'] = self._get_numbered_page(0, n_pages,
+                                                       collection_base,
+                                                       page_items, keys=keys,
+                                                       **params)
             if n_pages > 1:
                 out['last'] = self._get_iri(collection_base, page=n_pages - 1,
                                             **params)
@@ -236,9 +411,70 @@ class APIBase(object):
         return out
 
     def _slice_items(self, items, per_page, page=0):
-        """Return a slice of items. """
+        """Return a query for a slice of items."""
         start = page * per_page if page and page > 0 else 0
-        return items[start:start + per_page]
+        return items.slice(start, start + per_page)
+
+    def _get_item_keys(self, items):
+        """Return the created time and key of each item in a query."""
+        return items.with_entities(Annotation.created, Annotation.key).all()
+
+    def _filter_items_by_key(self, items, keys):
+        """Return a query for the items with the given keys."""
+        keys = bindparam('keys', [item.key for item in keys],
+                         type_=ARRAY(Integer))
+        return items.filter(Annotation.key == any_(keys))
+
+    def _stream_page_items(self, items, iris=False):
+        """Return the items of an AnnotationPage, to be streamed."""
+        if iris:
+            return StreamedItems(items, self._get_iri)
+        return StreamedItems(items, lambda item: item.dictize())
+
+    def _seek_items(self, items, per_page, after=None, before=None):
+        """Return the keys of the items either side of a cursor.
+
+        Also returns a flag indicating whether there are further items beyond
+        those returned, in the direction of the seek.
+        """
+        sort_key = tuple_(Annotation.created, Annotation.key)
+        if after:
+            cursor = tuple_(*self._decode_cursor(after))
+            items = (items.filter(sort_key > cursor)
+                          .order_by(None)
+                          .order_by(Annotation.created, Annotation.key))
+        else:
+            cursor = tuple_(*self._decode_cursor(before))
+            items = (items.filter(sort_key < cursor)
+                          .order_by(None)
+                          .order_by(Annotation.created.desc(),
+                                    Annotation.key.desc()))
+
+        # Fetch one extra item to find out if there is another page
+        keys = self._get_item_keys(items.limit(per_page + 1))
+        more = len(keys) > per_page
+        keys = keys[:per_page]
+        if not after:
+            keys.reverse()
+        return keys, more
+
+    def _encode_cursor(self, item):
+        """Return an opaque cursor pointing at an Annotation."""
+        raw = json.dumps([item.created, item.key]).encode('utf8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    def _decode_cursor(self, cursor):
+        """Return the created time and key from a cursor."""
+        padding = '=' * (-len(cursor) % 4)
+        try:
+            raw = base64.urlsafe_b64decode(str(cursor + padding))
+            created, key = json.loads(raw.decode('utf8'))
+            if not isinstance(created, basestring) or \
+               not isinstance(key, int):
+                raise ValueError('bad cursor values')
+        except (TypeError, ValueError, binascii.Error):
+            abort(400, 'invalid cursor')
+        return created, key
 
     def _get_page_arg(self):
         """Return the page query param and check it's an int."""
@@ -255,38 +491,84 @@ class APIBase(object):
         n = 0 if total <= 0 else (total - 1) // per_page
         return n + 1
 
-    def _get_page(self, page, n_pages, per_page, collection_base, items,
-                  partof=None, **params):
-        """Return an AnnotationPage."""
-        page_iri = self._get_iri(collection_base, page=page, **params)
+    def _get_numbered_page(self, page, n_pages, collection_base, items,
+                           keys=None, partof=None, **params):
+        """Return an AnnotationPage identified by its page number.
+
+        If the keys of the items are given then the AnnotationPages are
+        linked via cursors.
+        """
+        prev_args = None
+        next_args = None
+        if page > 0:
+            prev_args = dict(page=page - 1)
+            if keys:
+                prev_args = dict(before=self._encode_cursor(keys[0]))
+        if page < n_pages - 1:
+            next_args = dict(page=page + 1)
+            if keys:
+                next_args = dict(after=self._encode_cursor(keys[-1]))
+
+        return self._get_page(collection_base, items, dict(page=page),
+                              prev_args=prev_args, next_args=next_args,
+                              partof=partof, **params)
+
+    def _get_cursor_page(self, collection_base, items, per_page, after=None,
+                         before=None, partof=None, **params):
+        """Return an AnnotationPage identified by a cursor."""
+        keys, more = self._seek_items(items, per_page, after=after,
+                                      before=before)
+        if not keys:
+            abort(404)
+
+        page_items = self._filter_items_by_key(items, keys)
+        items = self._stream_page_items(page_items, params.get('iris'))
+        page_args = dict(after=after) if after else dict(before=before)
+        prev_args = dict(before=self._encode_cursor(keys[0]))
+        next_args = dict(after=self._encode_cursor(keys[-1]))
+        if after and not more:
+            next_args = None
+        elif before and not more:
+            prev_args = None
+
+        return self._get_page(collection_base, items, page_args,
+                              prev_args=prev_args, next_args=next_args,
+                              partof=partof, **params)
+
+    def _get_page(self, collection_base, items, page_args, prev_args=None,
+                  next_args=None, partof=None, **params):
+        """Return an AnnotationPage.
+
+        The page, prev and next args are the query params that identify each
+        AnnotationPage, either by page number or by cursor.
+        """
+        page_iri = self._get_iri(collection_base, **dict(page_args, **params))
         data = {
             'id': page_iri,
             'type': 'AnnotationPage',
             'startIndex': 0
         }
 
-        if page > 0:
-            data['prev'] = self._get_iri(collection_base, page=page - 1,
-                                         **params)
-        if page < n_pages - 1:
-            data['next'] = self._get_iri(collection_base, page=page + 1,
-                                         **params)
+        if prev_args:
+            data['prev'] = self._get_iri(collection_base,
+                                         **dict(prev_args, **params))
+        if next_args:
+            data['next'] = self._get_iri(collection_base,
+                                         **dict(next_args, **params))
 
         if partof:
             data['partOf'] = partof
 
-        items = self._decorate_page_items(items, params.get('iris'))
         data['items'] = items
         return data
 
     def _decorate_page_items(self, items, iris=False):
         """Dictize and decorate a list of page items."""
         out = []
-        for item in items:
-            item_dict = item.dictize()
-            item_dict['id'] = self._get_iri(item)
-            if iris:
-                out.append(item_dict['id'])
-            else:
-                out.append(item_dict)
+        with instrumentation.serializing():
+            for item in items:
+                if iris:
+                    out.append(self._get_iri(item))
+                else:
+                    out.append(item.dictize())
         return out
@@ -2,8 +2,9 @@
 """Batch API module."""
 
 import json
-from flask import request, abort
+from flask import request, abort, url_for
 from flask.views import MethodView
+from jsonschema.exceptions import ValidationError
 from sqlalchemy.exc import IntegrityError
 
 try:  # pragma: no cover
@@ -11,9 +12,11 @@ try:  # pragma: no cover
 except ImportError:  # pragma: no cover
     from urllib import unquote
 
-from explicates.core import repo
+from explicates.core import repo, metrics
 from explicates.api.base import APIBase
-from explicates.model.annotation import Annotation
+from explicates.model.annotation import Annotation, get_data_language
+from explicates.model.collection import Collection
+from explicates.model.utils import make_timestamp, make_uuid
 
 
 class BatchAPI(APIBase, MethodView):
@@ -21,26 +24,88 @@ class BatchAPI(APIBase, MethodView):
 
     # Common headers for all responses
     headers = {
-        'Allow': 'DELETE,OPTIONS,HEAD'
+        'Allow': 'POST,DELETE,OPTIONS,HEAD'
     }
 
     def _get_base_id(self, annotation):
         """Return the base ID extracted from the full IRI."""
-        iri = annotation.get('id')
+        iri = annotation.get('id') if isinstance(annotation, dict) else None
         if not iri:
             abort(400, 'Invalid Annotation passed in request')
+        return self._get_id_from_iri(iri)
+
+    def _get_id_from_iri(self, iri):
+        """Return the ID from the end of an IRI."""
         return unquote(iri).rstrip('/').split('/')[-1]
 
-    def delete(self):
-        """Batch delete items."""
+    def _get_json_list(self):
+        """Return the list of objects sent with the request."""
         if not request.data:
             abort(400)
-        json_data = json.loads(request.data.decode('utf8'))
+        try:
+            json_data = json.loads(request.data.decode('utf8'))
+        except (UnicodeDecodeError, ValueError):
+            abort(400, 'The data must be a JSON list')
         if type(json_data) != list:
             abort(400)
+        return json_data
+
+    def _get_rows(self, collection, json_data):
+        """Return validated Annotation rows ready to be inserted."""
+        created = make_timestamp()
+        rows = []
+        for i, data in enumerate(json_data):
+            try:
+                self._validate_data(data, Annotation)
+            except ValidationError as err:
+                abort(400, 'Annotation {0} is invalid: {1}'.format(i, err))
+
+            # Move posted ID to via
+            if data.get('id'):
+                data['via'] = data.pop('id')
+
+            rows.append(dict(id=make_uuid(),
+                             created=created,
+                             deleted=False,
+                             language=get_data_language(data),
+                             collection_key=collection.key,
+                             _data=data))
+        return rows
+
+    def post(self):
+        """Batch create Annotations in an AnnotationCollection."""
+        collection_iri = request.args.get('collection')
+        if not collection_iri:
+            abort(400, 'The collection query parameter is required')
+        collection_id = self._get_id_from_iri(collection_iri)
+        collection = self._get_domain_object(Collection, collection_id)
+        rows = self._get_rows(collection, self._get_json_list())
+
+        # The Collection update is committed along with the Annotations
+        collection.update()
+        try:
+            repo.batch_save(Annotation, rows)
+        except IntegrityError as err:  # pragma: no cover
+            abort(400, err)
+        metrics.observe_batch('create', len(rows))
+
+        iris = [url_for('api.annotations', collection_id=collection.id,
+                        annotation_id=row['id'], _external=True)
+                for row in rows]
+        page = {
+            'type': 'AnnotationPage',
+            'partOf': collection.iri,
+            'items': iris
+        }
+        return self._jsonld_response(page, status_code=201)
+
+    def delete(self):
+        """Batch delete items."""
+        json_data = self._get_json_list()
         annotation_ids = [self._get_base_id(anno) for anno in json_data]
         try:
             repo.batch_delete(Annotation, annotation_ids)
         except (IntegrityError, ValueError) as err:
             abort(400, err)
+        metrics.observe_batch('delete', len(annotation_ids))
         return self._jsonld_response(None, status_code=204)
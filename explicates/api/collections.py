@@ -22,12 +22,24 @@ class CollectionsAPI(APIBase, MethodView):
         """Get a Collection object."""
         return self._get_domain_object(Collection, collection_id)
 
+    def _get_items(self, collection):
+        """Return a query for the Annotations in a Collection.
+
+        The Annotations are ordered so that they can be paged by cursor.
+        """
+        return (collection.annotations
+                          .filter(Annotation.deleted == False)
+                          .order_by(Annotation.created, Annotation.key))
+
     def get(self, collection_id):
         """Get a Collection."""
         collection = self._get_collection(collection_id)
-        items = collection.annotations.filter(Annotation.deleted == False)
-        container = self._get_container(collection, items=items)
-        return self._jsonld_response(container)
+        not_modified = self._get_not_modified_response(collection)
+        if not_modified:
+            return not_modified
+        items = self._get_items(collection)
+        container = self._get_container(collection, items=items, keyset=True)
+        return self._jsonld_response(container, version=collection)
 
     def post(self, collection_id):
         """Create an Annotation."""
@@ -43,8 +55,8 @@ class CollectionsAPI(APIBase, MethodView):
         """Update a Collection."""
         collection = self._get_collection(collection_id)
         self._update(collection)
-        items = collection.annotations.filter(Annotation.deleted == False)
-        container = self._get_container(collection, items=items)
+        items = self._get_items(collection)
+        container = self._get_container(collection, items=items, keyset=True)
         return self._jsonld_response(container)
 
     def delete(self, collection_id):
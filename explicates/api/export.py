@@ -1,13 +1,15 @@
 # -*- coding: utf8 -*-
 """Export API module."""
 
+import json
 import unidecode
 import zipfile
 import zipstream
-from flask import Response, abort, request, stream_with_context
+from flask import Response, abort, current_app, request, send_file
+from flask import stream_with_context
 from flask.views import MethodView
 
-from explicates.core import exporter
+from explicates.core import exporter, json_encoder, metrics
 from explicates.api.base import APIBase
 from explicates.model.collection import Collection
 
@@ -34,26 +36,72 @@ class ExportAPI(APIBase, MethodView):
         name = unidecode.unidecode(collection_id)
         return name
 
-    def _zip_response(self, collection_id, generator):
-        """Respond with a ZIP file."""
+    def _zip_stream(self, collection_id, chunks, ext='json'):
+        """Return a ZIP file containing the chunks."""
         compression = self._get_zip_compression()
         z = zipstream.ZipFile(mode='w', compression=compression)
-        safe_name = self._ascii_encode(collection_id)
-        json_fn = safe_name + '.json'
-        zip_fn = safe_name + '.zip'
-        z.write_iter(json_fn, generator)
-        response = Response(stream_with_context(z), mimetype='application/zip')
-        content_disposition = 'attachment; filename={}'.format(zip_fn)
-        response.headers['Content-Disposition'] = content_disposition
-        return response
+        data_fn = '{0}.{1}'.format(self._ascii_encode(collection_id), ext)
+        z.write_iter(data_fn, chunks)
+        return z
+
+    def _get_cache_version(self, collection, ext, _zip):
+        """Return a version that changes whenever the export would."""
+        return json.dumps(collection.get_version() + [
+            collection.iri,
+            ext,
+            _zip,
+            current_app.config.get('GENERATOR'),
+            current_app.config.get('EXPORT_SERVER_SIDE_JSON'),
+            json_encoder.backend
+        ], sort_keys=True)
 
     def get(self, collection_id):
         """Export the contents of an AnnotationCollection."""
         collection = self._get_domain_object(Collection, collection_id)
-        _zip = request.args.get('zip')
-        data_gen = exporter.generate_data(collection.id)
-        if _zip == '1':
-            return self._zip_response(collection_id, data_gen)
+        _zip = request.args.get('zip') == '1'
+        if self._ndjson_requested():
+            ext = 'ndjson'
+            mimetype = 'application/x-ndjson'
+        else:
+            ext = 'json'
+            mimetype = 'application/ld+json'
+
+        zip_fn = None
+        fmt = 'zip' if _zip else ext
+        if _zip:
+            zip_fn = self._ascii_encode(collection_id) + '.zip'
+            mimetype = 'application/zip'
+
+        cache = exporter.cache
+        if cache:
+            name = json.dumps([collection.id, ext, _zip])
+            version = self._get_cache_version(collection, ext, _zip)
+            path = cache.get(name, version)
+            if path:
+                response = send_file(path, mimetype=mimetype,
+                                     as_attachment=_zip,
+                                     attachment_filename=zip_fn,
+                                     conditional=True, cache_timeout=0)
+                if response.status_code in [200, 206]:
+                    metrics.observe_export(response.content_length, fmt,
+                                           'cache')
+                response.headers.extend(self.headers)
+                return self._add_vary_accept(response)
+
+        if ext == 'ndjson':
+            data_gen = exporter.generate_ndjson(collection.id)
+        else:
+            data_gen = exporter.generate_data(collection.id)
+        chunks = (chunk.encode('utf8') for chunk in data_gen)
+        if _zip:
+            chunks = self._zip_stream(collection_id, chunks, ext=ext)
+        if cache:
+            chunks = cache.write(name, version, chunks)
+        chunks = metrics.count_export_bytes(chunks, fmt, 'database')
 
-        return Response(stream_with_context(data_gen),
-                        mimetype='application/ld+json')
+        response = Response(stream_with_context(chunks), mimetype=mimetype,
+                            headers=self.headers.copy())
+        if _zip:
+            content_disposition = 'attachment; filename={}'.format(zip_fn)
+            response.headers['Content-Disposition'] = content_disposition
+        return self._add_vary_accept(response)
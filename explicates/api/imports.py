@@ -0,0 +1,61 @@
+# -*- coding: utf8 -*-
+"""Import API module."""
+
+import shutil
+import tempfile
+from contextlib import contextmanager
+from flask import abort, request
+from flask.views import MethodView
+from sqlalchemy.exc import IntegrityError
+
+from explicates.core import metrics
+from explicates.api.base import APIBase
+from explicates.importer import Importer
+from explicates.model.collection import Collection
+
+
+class ImportAPI(APIBase, MethodView):
+    """Import API class."""
+
+    # Common headers for all responses
+    headers = {
+        'Allow': 'POST,OPTIONS'
+    }
+
+    def _get_format(self):
+        """Return the import format given by the Content-Type."""
+        if request.mimetype == 'application/zip':
+            return 'zip'
+        elif request.mimetype == 'application/x-ndjson':
+            return 'ndjson'
+        return 'json'
+
+    @contextmanager
+    def _open_stream(self, fmt):
+        """Yield the request data as a stream that can be read in a format.
+
+        ZIP files are read from the end, so must be seekable and are spooled
+        to a temporary file. Other formats are read from the request as it
+        is received.
+        """
+        if fmt != 'zip':
+            yield request.stream
+            return
+        with tempfile.TemporaryFile() as tmp:
+            shutil.copyfileobj(request.stream, tmp)
+            tmp.seek(0)
+            yield tmp
+
+    def post(self, collection_id):
+        """Import Annotations into an AnnotationCollection."""
+        collection = self._get_domain_object(Collection, collection_id)
+        fmt = self._get_format()
+        importer = Importer()
+        with self._open_stream(fmt) as stream:
+            try:
+                n = importer.import_data(collection,
+                                         importer.read(stream, fmt))
+            except (ValueError, IntegrityError) as err:
+                abort(400, err)
+        metrics.observe_batch('import', n)
+        return self._jsonld_response(collection)
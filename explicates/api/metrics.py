@@ -0,0 +1,24 @@
+# -*- coding: utf8 -*-
+"""Metrics API module."""
+
+from flask import Response, abort
+from flask.views import MethodView
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from explicates.core import metrics
+
+
+class MetricsAPI(MethodView):
+    """Metrics API class."""
+
+    # Common headers for all responses
+    headers = {
+        'Allow': 'GET,OPTIONS,HEAD'
+    }
+
+    def get(self):
+        """Return the metrics in the Prometheus text format."""
+        if not metrics.enabled:
+            abort(404)
+        return Response(metrics.generate(), content_type=CONTENT_TYPE_LATEST,
+                        headers=self.headers)
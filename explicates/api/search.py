@@ -6,7 +6,7 @@ from flask import abort, request
 from flask.views import MethodView
 from sqlalchemy.exc import ProgrammingError
 
-from explicates.core import search
+from explicates.core import search, json_encoder
 from explicates.api.base import APIBase
 from explicates.model.collection import Collection
 from explicates.model.annotation import Annotation
@@ -20,12 +20,42 @@ class SearchAPI(APIBase, MethodView):
         'Allow': 'GET,OPTIONS,HEAD'
     }
 
+    # The number of results fetched and streamed at a time
+    chunk_size = 1000
+
     def _filter_valid_params(self, data):
         """Return the valid search parameters."""
         valid_keys = ['contains', 'collection', 'fts', 'fts_phrase', 'limit',
                       'range', 'order_by', 'offset', 'deleted']
         return {k: v for k, v in data.items() if k in valid_keys}
 
+    def _ndjson_search(self, params):
+        """Stream all search results as newline-delimited JSON.
+
+        The first result is fetched before the response is started, so that
+        any errors in the query can still be returned as a 400.
+        """
+        try:
+            results = iter(search.search(**params).yield_per(self.chunk_size))
+            first = next(results, None)
+        except (ValueError, ProgrammingError) as err:
+            abort(400, err)
+
+        def generate():
+            if not first:
+                return
+            buffer = [json_encoder.dumps(first.dictize())]
+            for annotation in results:
+                buffer.append(json_encoder.dumps(annotation.dictize()))
+                if len(buffer) == self.chunk_size:
+                    yield '\n'.join(buffer) + '\n'
+                    buffer = []
+            if buffer:
+                yield '\n'.join(buffer) + '\n'
+
+        response = self._ndjson_response(generate())
+        return self._add_vary_accept(response)
+
     def get(self):
         """Search Annotations."""
         data = request.args.to_dict(flat=True)
@@ -33,8 +63,12 @@ class SearchAPI(APIBase, MethodView):
             data = json.loads(request.data.decode('utf8'))
         params = self._filter_valid_params(data)
 
+        if self._ndjson_requested():
+            return self._ndjson_search(params)
+
         try:
             results = search.search(**params)
+            total = search.count(results)
         except (ValueError, ProgrammingError) as err:
             abort(400, err)
 
@@ -44,6 +78,8 @@ class SearchAPI(APIBase, MethodView):
                 "BasicContainer"
             ]
         })
-        container = self._get_container(tmp_collection, items=results,
-                                        total=len(results), **params)
-        return self._jsonld_response(container)
+        items = results if total else None
+        container = self._get_container(tmp_collection, items=items,
+                                        total=total, **params)
+        response = self._jsonld_response(container)
+        return self._add_vary_accept(response)
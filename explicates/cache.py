@@ -0,0 +1,101 @@
+# -*- coding: utf8 -*-
+"""Cache module."""
+
+import os
+import time
+import uuid
+import hashlib
+
+
+class FileCache(object):
+    """A directory of cached files with a maximum total size.
+
+    Each file is stored under a name and a version, with only the latest
+    version of each name being kept. When the total size exceeds max_size
+    the least recently used files are evicted.
+    """
+
+    def __init__(self, cache_dir, max_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def get(self, name, version):
+        """Return the path to a cached file, or None if not cached."""
+        path = self._get_path(name, version)
+        try:
+            # Record the access, leaving the modified time unchanged
+            stat = os.stat(path)
+            os.utime(path, (time.time(), stat.st_mtime))
+        except OSError:
+            return None
+        return path
+
+    def write(self, name, version, chunks):
+        """Cache a file while passing its chunks on.
+
+        The file is only added to the cache once all of the chunks have been
+        written, so incomplete files are never served.
+        """
+        path = self._get_path(name, version)
+        tmp_path = '{0}.{1}.tmp'.format(path, uuid.uuid4().hex)
+        complete = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                os.rename(tmp_path, path)
+                self._remove_old_versions(name, path)
+                self.evict()
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self):
+        """Remove the least recently used files until under the size cap."""
+        entries = []
+        for fn in os.listdir(self.cache_dir):
+            if fn.endswith('.tmp'):
+                continue
+            path = os.path.join(self.cache_dir, fn)
+            try:
+                stat = os.stat(path)
+            except OSError:  # pragma: no cover
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    def _get_path(self, name, version):
+        """Return the path for a version of a cached file."""
+        fn = '{0}.{1}'.format(self._hash(name), self._hash(version))
+        return os.path.join(self.cache_dir, fn)
+
+    def _remove_old_versions(self, name, current_path):
+        """Remove all other versions of a cached file."""
+        prefix = self._hash(name) + '.'
+        for fn in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, fn)
+            is_tmp = fn.endswith('.tmp')
+            if fn.startswith(prefix) and path != current_path and not is_tmp:
+                self._remove(path)
+
+    def _remove(self, path):
+        """Remove a file, if it still exists."""
+        try:
+            os.remove(path)
+        except OSError:  # pragma: no cover
+            pass
+
+    def _hash(self, value):
+        """Return a hash suitable for use in a filename."""
+        return hashlib.sha1(value.encode('utf8')).hexdigest()
@@ -2,7 +2,7 @@
 """Core module."""
 
 import os
-from flask import Flask, jsonify, _app_ctx_stack
+from flask import Flask, Response, _app_ctx_stack
 from werkzeug.exceptions import HTTPException
 
 from explicates import default_settings
@@ -14,8 +14,12 @@ def create_app():
     app = Flask(__name__)
     configure_app(app)
     setup_db(app)
+    setup_instrumentation(app)
+    setup_metrics(app)
+    setup_json_encoder(app)
     setup_repository(app)
     setup_search(app)
+    setup_validator(app)
     setup_exporter(app)
     setup_blueprint(app)
     setup_error_handler(app)
@@ -69,21 +73,30 @@ def setup_search(app):
     search = Search(db)
 
 
+def setup_validator(app):
+    """Setup JSON schema validator."""
+    from explicates.validator import Validator
+    from explicates.model.annotation import Annotation
+    from explicates.model.collection import Collection
+    global validator
+    schemas_dir = os.path.join(app.root_path, 'schemas')
+    auto_reload = app.config.get('SCHEMAS_AUTO_RELOAD')
+    validator = Validator([Annotation, Collection], schemas_dir,
+                          auto_reload=auto_reload)
+
+
 def setup_db(app):
     """Setup database."""
-    from explicates.model.indexes import indexes
+    from explicates.session import set_last_write
 
     def create_slave_session(db, bind):
         slave = app.config.get('SQLALCHEMY_BINDS')['slave']
         if slave == app.config.get('SQLALCHEMY_DATABASE_URI'):
             return db.session
-        options = dict(bind=engine, scopefunc=_app_ctx_stack.__ident_func__)
-        slave_session = db.create_scoped_session(options=options)
-
-        for idx in indexes:
-            idx.create(bind=engine)
-
-        return slave_session
+        engine = db.get_engine(app, bind=bind)
+        options = dict(bind=engine, binds={},
+                       scopefunc=_app_ctx_stack.__ident_func__)
+        return db.create_scoped_session(options=options)
 
     db.app = app
     db.init_app(app)
@@ -98,6 +111,8 @@ def setup_db(app):
             db.slave_session.remove()
             return response_or_exc
 
+    app.after_request(set_last_write)
+
 
 def setup_error_handler(app):
     """Setup generic error handler."""
@@ -107,8 +122,8 @@ def setup_error_handler(app):
         if isinstance(e, HTTPException):
             code = e.code
         error_dict = dict(code=code, message=str(e))
-        response = jsonify(error_dict)
-        response.status_code = code
+        response = Response(json_encoder.dumps(error_dict), status=code,
+                            mimetype='application/json')
 
         # Re-raise server errors during debugging
         if code == 500 and app.debug:
@@ -121,8 +136,37 @@ def setup_cors(app):
     cors.init_app(app, resources=app.config.get('CORS_RESOURCES'))
 
 
+def setup_json_encoder(app):
+    """Setup JSON encoder."""
+    global json_encoder
+    from explicates.encoder import JSONEncoder
+    json_encoder = JSONEncoder(app.config.get('JSON_ENCODER'))
+
+
+def setup_instrumentation(app):
+    """Setup request instrumentation."""
+    global instrumentation
+    from explicates.instrumentation import Instrumentation
+    instrumentation = Instrumentation(db)
+    instrumentation.init_app(app)
+
+
+def setup_metrics(app):
+    """Setup Prometheus metrics."""
+    global metrics
+    from explicates.metrics import Metrics
+    metrics = Metrics(db)
+    metrics.init_app(app)
+
+
 def setup_exporter(app):
     """Setup exporter."""
     global exporter
+    from explicates.cache import FileCache
     from explicates.exporter import Exporter
-    exporter = Exporter()
+    cache = None
+    cache_dir = app.config.get('EXPORT_CACHE_DIR')
+    if cache_dir:
+        cache = FileCache(cache_dir, app.config.get('EXPORT_CACHE_SIZE'))
+    workers = app.config.get('EXPORT_WORKERS')
+    exporter = Exporter(cache=cache, workers=workers)
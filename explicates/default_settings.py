@@ -5,6 +5,16 @@ PORT = 3000
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 STRICT_SLASHES = False
 ANNOTATIONS_PER_PAGE = 1000
+SEARCH_ESTIMATE_THRESHOLD = None
+SCHEMAS_AUTO_RELOAD = False
+READ_YOUR_WRITES_WINDOW = None
+JSON_ENCODER = None
+INSTRUMENTATION = False
+METRICS = False
+EXPORT_SERVER_SIDE_JSON = False
+EXPORT_WORKERS = 1
+EXPORT_CACHE_DIR = None
+EXPORT_CACHE_SIZE = 1024 * 1024 * 1024
 CORS_RESOURCES = {
     r"/*": {
         "origins": "*",
@@ -0,0 +1,41 @@
+# -*- coding: utf8 -*-
+"""JSON encoder module."""
+
+import json
+import importlib
+from functools import partial
+
+
+class JSONEncoder(object):
+    """Encode JSON using the fastest supported library that is installed.
+
+    The output is compact, with keys in their original order, and always
+    falls back to the standard library.
+    """
+
+    #: The supported libraries, in order of preference.
+    backends = ['rapidjson', 'ujson', 'json']
+
+    def __init__(self, backend=None):
+        if backend and backend not in self.backends:
+            err_msg = 'Unsupported JSON encoder: {}'.format(backend)
+            raise ValueError(err_msg)
+
+        for name in [backend] if backend else self.backends:
+            try:
+                module = importlib.import_module(name)
+            except ImportError:
+                if backend:
+                    raise
+                continue
+            self.backend = name
+            self.dumps = self._get_dumps(module)
+            break
+
+    def _get_dumps(self, module):
+        """Return a function that encodes compact JSON with the module."""
+        if self.backend == 'ujson':
+            return partial(module.dumps, escape_forward_slashes=False)
+        elif self.backend == 'json':
+            return partial(module.dumps, separators=(',', ':'))
+        return module.dumps
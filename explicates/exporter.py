@@ -1,52 +1,302 @@
 # -*- coding: utf8 -*-
 """Exporter module."""
 
-import json
+import math
 import string
+import multiprocessing
 import tempfile
 import zipfile
 import unidecode
-from flask import current_app
-from sqlalchemy import and_
+from collections import deque
+from itertools import islice
+from multiprocessing.pool import ThreadPool
+from flask import current_app, url_for
+from sqlalchemy import and_, select, func, cast, create_engine, Text
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql import bindparam, text
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 
-from explicates.core import repo, db
+from explicates.core import repo, db, json_encoder
+from explicates.session import get_read_session
 from explicates.model.annotation import Annotation
 from explicates.model.collection import Collection
+from explicates.model.base import PRIVATE_ATTRS
+from explicates.model.utils import make_timestamp
+
+
+# The partition export run by each worker process
+_process_job = None
+
+
+def _init_process(job):
+    """Prepare a worker process to export partitions."""
+    global _process_job
+    _process_job = job
+    # Connections cannot be shared with the parent process
+    job.engine = create_engine(job.engine.url, poolclass=NullPool)
+
+
+def _run_process_job(bounds):
+    """Export a partition in a worker process."""
+    return _process_job(bounds)
+
+
+class PartitionExport(object):
+    """Read and serialize a range of Annotation keys on its own connection.
+
+    If a snapshot is given then the range is read as of that snapshot, so
+    that all partitions see the same state of the database.
+    """
+
+    def __init__(self, engine, query, serialize, snapshot=None):
+        self.engine = engine
+        self.query = query
+        self.serialize = serialize
+        self.snapshot = snapshot
+
+    def __call__(self, bounds):
+        start, end = bounds
+        conn = self.engine.connect()
+        try:
+            with conn.begin():
+                if self.snapshot:
+                    conn.execute(text('SET TRANSACTION ISOLATION LEVEL '
+                                      'REPEATABLE READ'))
+                    conn.execute(text('SET TRANSACTION SNAPSHOT :snapshot'),
+                                 snapshot=self.snapshot)
+                rows = conn.execute(self.query, start=start, end=end)
+                return [self.serialize(row) for row in rows]
+        finally:
+            conn.close()
 
 
 class Exporter(object):
 
-    def _stream_annotation_data(self, collection):
-        """Stream the contents of an AnnotationCollection from the database."""
+    #: The number of Annotations serialized for each chunk of the output.
+    chunk_size = 1000
+
+    #: The approximate number of Annotations in each partition of a
+    #: parallel export.
+    partition_size = 10000
+
+    def __init__(self, cache=None, workers=1, processes=False):
+        self.cache = cache
+        self.workers = workers
+        self.processes = processes
+
+    def _get_query(self, collection, columns=None, partitioned=False):
+        """Return a query for the contents of an AnnotationCollection.
+
+        A partitioned query selects the keys in the range given by the start
+        and end parameters.
+        """
         table = Annotation.__table__
         where_clauses = [
             table.c.collection_key == collection.key,
-            table.c.deleted is not True
+            table.c.deleted == False
         ]
+        if partitioned:
+            where_clauses += [
+                table.c.key >= bindparam('start'),
+                table.c.key < bindparam('end')
+            ]
+
+        if not columns:
+            columns = [table.c.id, table.c['_data']]
+            columns += self._get_public_columns()
+        return select(columns).where(and_(*where_clauses))
 
-        query = table.select().where(and_(*where_clauses))
-        exec_opts = dict(stream_results=True)
-        res = db.session.connection(execution_options=exec_opts).execute(query)
+    def _stream_annotation_data(self, collection, columns=None):
+        """Stream the contents of an AnnotationCollection from the database."""
+        query = self._get_query(collection, columns)
+        conn = get_read_session(db).connection()
+        res = conn.execution_options(stream_results=True).execute(query)
         while True:
             chunk = res.fetchmany(10000)
             if not chunk:
                 break
             for row in chunk:
-                yield dict(row)
+                yield row
+
+    def _get_partitions(self, conn, collection):
+        """Split the keys of an AnnotationCollection into ranges."""
+        table = Annotation.__table__
+        query = select([func.min(table.c.key), func.max(table.c.key)]).where(
+            and_(table.c.collection_key == collection.key,
+                 table.c.deleted == False))
+        first, last = conn.execute(query).first()
+        if first is None:
+            return []
+        n = int(math.ceil(collection.total / float(self.partition_size)))
+        n = max(n, self.workers)
+        step = int(math.ceil((last - first + 1) / float(n)))
+        return [(start, start + step)
+                for start in range(first, last + 1, step)]
+
+    def _imap_ordered(self, pool, func, iterable):
+        """Apply a function on a pool, yielding the results in order.
+
+        Only a few tasks are queued ahead of the results consumed, so that
+        the output of a slow client is not buffered in memory.
+        """
+        args = iter(iterable)
+        pending = deque(pool.apply_async(func, (arg,))
+                        for arg in islice(args, self.workers * 2))
+        while pending:
+            result = pending.popleft().get()
+            for arg in islice(args, 1):
+                pending.append(pool.apply_async(func, (arg,)))
+            yield result
+
+    def _generate_partitions(self, collection, query, serialize):
+        """Generate lists of Annotations exported in parallel.
+
+        The AnnotationCollection is split into ranges of keys that are read
+        and serialized concurrently by a pool of workers, each with its own
+        connection. The lists are returned in order of their keys.
+        """
+        engine = get_read_session(db).get_bind()
+        conn = engine.connect()
+        trans = conn.begin()
+        try:
+            conn.execute(text('SET TRANSACTION ISOLATION LEVEL '
+                              'REPEATABLE READ'))
+            snapshot = conn.execute(text('SELECT pg_export_snapshot()'))
+            job = PartitionExport(engine, query, serialize,
+                                  snapshot=snapshot.scalar())
+            partitions = self._get_partitions(conn, collection)
+            if self.processes:
+                pool = multiprocessing.Pool(self.workers,
+                                            initializer=_init_process,
+                                            initargs=(job,))
+                func = _run_process_job
+            else:
+                pool = ThreadPool(self.workers)
+                func = job
+            try:
+                for result in self._imap_ordered(pool, func, partitions):
+                    yield result
+            finally:
+                pool.terminate()
+                pool.join()
+        finally:
+            trans.rollback()
+            conn.close()
+
+    def _get_public_columns(self):
+        """Return the Annotation columns that are included in the output."""
+        table = Annotation.__table__
+        return [col for col in table.c if col.name not in PRIVATE_ATTRS]
+
+    def _get_iri_template(self, collection):
+        """Return the parts of an Annotation IRI either side of its ID."""
+        placeholder = '__annotation_id__'
+        iri = url_for('api.annotations', collection_id=collection.id,
+                      annotation_id=placeholder, _external=True)
+        prefix, _, suffix = iri.rpartition(placeholder)
+        return prefix, suffix
+
+    def _get_serializer(self, collection):
+        """Return a function that serializes an Annotation row as JSON.
+
+        The output is the same as that of Annotation.dictize(), except that
+        everything shared by the Annotations is computed once per export.
+        """
+        iri_prefix, iri_suffix = self._get_iri_template(collection)
+        url_map = current_app.url_map
+        quote = url_map.converters['default'](url_map).to_url
+        columns = [col.name for col in self._get_public_columns()]
+        generator = current_app.config.get('GENERATOR')
+        generated = make_timestamp()
+
+        def serialize(row):
+            out = {}
+            for col in columns:
+                if row[col]:
+                    out[col] = row[col]
+            if generator:
+                out['generator'] = generator
+            if row['_data']:
+                out.update(row['_data'])
+            out['generated'] = generated
+            if row['id']:
+                out['id'] = iri_prefix + quote(row['id']) + iri_suffix
+            return json_encoder.dumps(out)
+
+        return serialize
+
+    def _get_json_column(self):
+        """Return a column that builds each Annotation's JSON in the database.
+
+        The JSON is built as by Annotation.dictize(), except for the ID, which
+        is left for the serializer to add.
+        """
+        table = Annotation.__table__
+        columns = []
+        for col in self._get_public_columns():
+            columns += [col.name, col]
+        doc = func.jsonb_strip_nulls(func.jsonb_build_object(*columns))
+
+        generator = current_app.config.get('GENERATOR')
+        if generator:
+            doc = doc.op('||')(func.jsonb_build_object('generator',
+                                                       generator))
+
+        data = func.coalesce(table.c['_data'], text("'{}'::jsonb"))
+        generated = func.jsonb_build_object('generated', make_timestamp())
+        doc = doc.op('||')(data).op('||')(generated).op('-')('id')
+        return cast(doc, Text).label('json')
+
+    def _get_json_serializer(self, collection):
+        """Return a function adding the IRI to JSON built by the database."""
+        iri_prefix, iri_suffix = self._get_iri_template(collection)
+        url_map = current_app.url_map
+        quote = url_map.converters['default'](url_map).to_url
+
+        def serialize(row):
+            iri = iri_prefix + quote(row['id']) + iri_suffix
+            return '{"id": ' + json_encoder.dumps(iri) + ', ' + row['json'][1:]
+
+        return serialize
+
+    def _generate_chunks(self, collection_id):
+        """Generate lists of Annotations serialized as JSON."""
+        collection = repo.get_by(Collection, id=collection_id)
+        columns = None
+        if current_app.config.get('EXPORT_SERVER_SIDE_JSON'):
+            columns = [Annotation.__table__.c.id, self._get_json_column()]
+            serialize = self._get_json_serializer(collection)
+        else:
+            serialize = self._get_serializer(collection)
+
+        if self.workers > 1:
+            query = self._get_query(collection, columns, partitioned=True)
+            for result in self._generate_partitions(collection, query,
+                                                    serialize):
+                for i in range(0, len(result), self.chunk_size):
+                    yield result[i:i + self.chunk_size]
+            return
+
+        buffer = []
+        for row in self._stream_annotation_data(collection, columns):
+            buffer.append(serialize(row))
+            if len(buffer) == self.chunk_size:
+                yield buffer
+                buffer = []
+        if buffer:
+            yield buffer
 
     def generate_data(self, collection_id):
         """Return all Annotations as JSON-LD."""
-        collection = repo.get_by(Collection, id=collection_id)
-        data_gen = self._stream_annotation_data(collection)
-        first = True
         yield '['
-        for row in data_gen:
-            anno = Annotation(**dict(row))
-            anno.collection = collection
-            anno_dict = anno.dictize()
-            out = json.dumps(anno_dict)
-            yield out if first else ', ' + out
-            first = False
+        separator = ''
+        for chunk in self._generate_chunks(collection_id):
+            yield separator + ', '.join(chunk)
+            separator = ', '
         yield ']'
+
+    def generate_ndjson(self, collection_id):
+        """Return all Annotations as newline-delimited JSON-LD."""
+        for chunk in self._generate_chunks(collection_id):
+            yield '\n'.join(chunk) + '\n'
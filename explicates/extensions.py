@@ -1,7 +1,8 @@
 # -*- coding: utf8 -*-
 """Extensions module."""
 
-__all__ = ['db', 'cors', 'exporter']
+__all__ = ['db', 'cors', 'exporter', 'json_encoder', 'instrumentation',
+           'metrics']
 
 
 # DB
@@ -15,3 +16,12 @@ cors = CORS()
 
 # Exporter
 exporter = None
+
+# JSON encoder
+json_encoder = None
+
+# Instrumentation
+instrumentation = None
+
+# Metrics
+metrics = None
@@ -0,0 +1,169 @@
+# -*- coding: utf8 -*-
+"""Importer module."""
+
+import io
+import json
+import codecs
+import zipfile
+from flask import current_app
+from jsonschema.exceptions import ValidationError
+
+try:  # pragma: no cover
+    from urllib.parse import unquote
+except ImportError:  # pragma: no cover
+    from urllib import unquote
+
+from explicates.core import repo, validator
+from explicates.model.annotation import Annotation, get_data_language
+from explicates.model.utils import make_timestamp, make_uuid
+from explicates.model.utils import parse_timestamp
+
+
+class Importer(object):
+
+    #: The number of Annotations loaded by each COPY.
+    chunk_size = 10000
+
+    #: The number of characters read from a JSON file at a time.
+    read_size = 65536
+
+    #: The supported formats.
+    formats = ['json', 'ndjson', 'zip']
+
+    #: The columns loaded for each Annotation.
+    columns = ['id', 'created', 'modified', 'deleted', 'language',
+               'collection_key', '_data']
+
+    def _read_text(self, fileobj):
+        """Return a reader that decodes a binary file as UTF-8."""
+        return codecs.getreader('utf8')(fileobj)
+
+    def read_json(self, fileobj):
+        """Generate the objects in a JSON list, without reading it all.
+
+        Each object is decoded as soon as enough of the file has been read.
+        """
+        reader = self._read_text(fileobj)
+        decoder = json.JSONDecoder()
+        buf = ''
+        while not buf.strip():
+            chunk = reader.read(self.read_size)
+            if not chunk:
+                break
+            buf += chunk
+        buf = buf.lstrip()
+        if not buf.startswith('['):
+            raise ValueError('The data must be a JSON list')
+        pos = 1
+        eof = False
+        while True:
+            # Skip whitespace and separators between objects
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Read more if the next object may be incomplete
+                if eof:
+                    raise ValueError('The data must be a JSON list')
+                chunk = reader.read(self.read_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            if end == len(buf) and not eof:
+                # A number at the end of the buffer may continue
+                chunk = reader.read(self.read_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            pos = end
+            yield obj
+
+    def read_ndjson(self, fileobj):
+        """Generate the objects in a newline-delimited JSON file."""
+        for line in fileobj:
+            if line.strip():
+                yield json.loads(line.decode('utf8'))
+
+    def read_zip(self, fileobj):
+        """Generate the objects in a ZIP file produced by the exporter."""
+        try:
+            z = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipfile:
+            raise ValueError('The data must be a ZIP file')
+        with z:
+            names = [name for name in z.namelist()
+                     if name.rsplit('.', 1)[-1] in ['json', 'ndjson']]
+            if len(names) != 1:
+                err_msg = 'The ZIP file must contain one JSON or NDJSON file'
+                raise ValueError(err_msg)
+            read = self.read_json
+            if names[0].endswith('.ndjson'):
+                read = self.read_ndjson
+            with z.open(names[0]) as data_file:
+                for obj in read(data_file):
+                    yield obj
+
+    def read(self, fileobj, fmt):
+        """Generate the objects in a file of the given format."""
+        if fmt not in self.formats:
+            raise ValueError('Unsupported format: {}'.format(fmt))
+        return getattr(self, 'read_' + fmt)(fileobj)
+
+    def _get_id_from_iri(self, iri):
+        """Return the ID from the end of an IRI."""
+        return unquote(iri).rstrip('/').split('/')[-1]
+
+    def _get_row(self, collection, data, created, generator):
+        """Return a validated Annotation row ready to be loaded.
+
+        Exported IDs and timestamps are kept, with the timestamps normalised
+        to UTC, other values are computed as for Annotations created via the
+        API.
+        """
+        if not isinstance(data, dict):
+            raise ValueError('Each Annotation must be a JSON object')
+        data = dict(data)
+        validator.validate(data, Annotation)
+        iri = data.pop('id', None)
+        data.pop('generated', None)
+        if generator and data.get('generator') == generator:
+            del data['generator']
+        timestamps = {}
+        for key in ['created', 'modified']:
+            value = data.pop(key, None)
+            timestamps[key] = parse_timestamp(value) if value else None
+        return dict(id=self._get_id_from_iri(iri) if iri else make_uuid(),
+                    created=timestamps['created'] or created,
+                    modified=timestamps['modified'],
+                    deleted=False,
+                    language=get_data_language(data),
+                    collection_key=collection.key,
+                    _data=data)
+
+    def _get_rows(self, collection, annotations):
+        """Generate validated Annotation rows."""
+        created = make_timestamp()
+        generator = current_app.config.get('GENERATOR')
+        for i, data in enumerate(annotations):
+            try:
+                yield self._get_row(collection, data, created, generator)
+            except ValidationError as err:
+                msg = 'Annotation {0} is invalid: {1}'.format(i, err.message)
+                raise ValueError(msg)
+
+    def import_data(self, collection, annotations):
+        """Load Annotations into an AnnotationCollection.
+
+        The Annotations are all loaded in a single transaction, along with an
+        update to the AnnotationCollection's modified time. Returns the
+        number of Annotations loaded.
+        """
+        rows = self._get_rows(collection, annotations)
+        collection.update()
+        return repo.batch_copy(Annotation, rows, self.columns,
+                               chunk_size=self.chunk_size)
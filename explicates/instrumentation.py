@@ -0,0 +1,194 @@
+# -*- coding: utf8 -*-
+"""Instrumentation module.
+
+When enabled, the number of SQL queries, the time spent executing them, the
+number of rows they fetched and the time spent serializing the response are
+recorded for each request. They are sent in a Server-Timing header and
+logged once the response has been sent.
+
+When disabled, no SQLAlchemy events are listened for and the request hooks
+and serialization timers return straight away.
+"""
+
+import logging
+from timeit import default_timer
+from flask import g, request, has_request_context
+from flask.logging import default_handler, has_level_handler
+from sqlalchemy import event
+
+
+class RequestTimings(object):
+    """The timings recorded while handling a request."""
+
+    def __init__(self):
+        self.start = default_timer()
+        self.queries = 0
+        self.sql = 0.0
+        self.rows = 0
+        self.serialize = 0.0
+        self.serializing = 0
+        self.status = None
+
+    @property
+    def total(self):
+        """Return the time since the request started."""
+        return default_timer() - self.start
+
+    def get_server_timing(self):
+        """Return the value of the Server-Timing header, times in ms."""
+        desc = '{0} queries, {1} rows'.format(self.queries, self.rows)
+        return ('db;dur={0:.2f};desc="{1}", serialize;dur={2:.2f}, '
+                'app;dur={3:.2f}').format(self.sql * 1000, desc,
+                                          self.serialize * 1000,
+                                          self.total * 1000)
+
+
+class SerializationTimer(object):
+    """Time the serialization of a response.
+
+    Nested timers are only counted once. Any SQL executed while serializing,
+    such as lazy loads, is counted as SQL rather than serialization time.
+    """
+
+    def __init__(self, timings):
+        self.timings = timings
+
+    def __enter__(self):
+        if not self.timings.serializing:
+            self.start = default_timer()
+            self.sql = self.timings.sql
+        self.timings.serializing += 1
+
+    def __exit__(self, *exc_info):
+        self.timings.serializing -= 1
+        if not self.timings.serializing:
+            elapsed = default_timer() - self.start
+            self.timings.serialize += elapsed - (self.timings.sql - self.sql)
+
+
+class NullTimer(object):
+    """A timer that does nothing, used when instrumentation is disabled."""
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+null_timer = NullTimer()
+
+
+class Instrumentation(object):
+    """Record the SQL and serialization timings for each request."""
+
+    def __init__(self, db):
+        self.db = db
+        self.enabled = False
+        self.logger = logging.getLogger(__name__)
+        self._engines = []
+
+    def init_app(self, app):
+        """Add the request hooks and enable if configured."""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if app.config.get('INSTRUMENTATION'):
+            self.enable(app)
+
+    def enable(self, app):
+        """Start recording timings, listening to each database engine."""
+        if self.enabled:
+            return
+        engines = [self.db.get_engine(app)]
+        for bind in app.config.get('SQLALCHEMY_BINDS') or {}:
+            engine = self.db.get_engine(app, bind=bind)
+            if engine not in engines:
+                engines.append(engine)
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute',
+                         self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute',
+                         self._after_cursor_execute)
+        self._engines = engines
+        if not self.logger.level:
+            self.logger.setLevel(logging.INFO)
+        if not has_level_handler(self.logger):
+            self.logger.addHandler(default_handler)
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording timings."""
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute',
+                         self._before_cursor_execute)
+            event.remove(engine, 'after_cursor_execute',
+                         self._after_cursor_execute)
+        self._engines = []
+        self.enabled = False
+
+    def get_timings(self):
+        """Return the timings for the current request, if recording."""
+        if not self.enabled or not has_request_context():
+            return None
+        return getattr(g, '_request_timings', None)
+
+    def serializing(self):
+        """Return a context manager that times serialization."""
+        timings = self.get_timings() if self.enabled else None
+        if timings is None:
+            return null_timer
+        return SerializationTimer(timings)
+
+    def add_rows(self, n):
+        """Record rows fetched from a server-side cursor."""
+        timings = self.get_timings() if self.enabled else None
+        if timings is not None:
+            timings.rows += n
+
+    def _before_request(self):
+        if self.enabled:
+            g._request_timings = RequestTimings()
+
+    def _after_request(self, response):
+        timings = self.get_timings() if self.enabled else None
+        if timings is not None:
+            timings.status = response.status_code
+            response.headers['Server-Timing'] = timings.get_server_timing()
+        return response
+
+    def _teardown_request(self, exc=None):
+        """Log the timings once the response has been sent."""
+        timings = self.get_timings() if self.enabled else None
+        if timings is None:
+            return
+        fields = [
+            ('method', request.method),
+            ('path', request.path),
+            ('status', timings.status or 500),
+            ('queries', timings.queries),
+            ('sql_ms', round(timings.sql * 1000, 2)),
+            ('rows', timings.rows),
+            ('serialize_ms', round(timings.serialize * 1000, 2)),
+            ('total_ms', round(timings.total * 1000, 2))
+        ]
+        msg = ' '.join('{0}={1}'.format(k, v) for k, v in fields)
+        self.logger.info(msg, extra={'timings': dict(fields)})
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        if self.get_timings() is not None:
+            conn.info.setdefault('query_start', []).append(default_timer())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters,
+                              context, executemany):
+        timings = self.get_timings()
+        starts = conn.info.get('query_start')
+        if timings is None or not starts:
+            return
+        timings.sql += default_timer() - starts.pop()
+        timings.queries += 1
+        # Rows from server-side cursors are fetched later, and so added by
+        # whatever iterates over them
+        if cursor.description is not None and cursor.rowcount > 0:
+            timings.rows += cursor.rowcount
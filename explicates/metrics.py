@@ -0,0 +1,173 @@
+# -*- coding: utf8 -*-
+"""Metrics module.
+
+When enabled, request counts and latencies, database pool usage, export
+sizes and batch sizes are recorded and exposed in the Prometheus text format.
+
+Under a multi-process server each process writes its metrics to files in the
+directory given by the PROMETHEUS_MULTIPROC_DIR environment variable, which
+must be set before the app is imported. The files of all processes are then
+aggregated whenever the metrics are collected.
+"""
+
+import os
+import threading
+from timeit import default_timer
+from flask import g, request
+from sqlalchemy import event
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import generate_latest, multiprocess
+
+
+#: Request duration buckets in seconds, extended for long exports.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0, 300.0, float('inf'))
+
+#: Batch size buckets in numbers of Annotations.
+BATCH_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000, float('inf'))
+
+
+def get_multiprocess_dir():
+    """Return the directory used to share metrics between processes."""
+    return (os.environ.get('PROMETHEUS_MULTIPROC_DIR') or
+            os.environ.get('prometheus_multiproc_dir'))
+
+
+class Metrics(object):
+    """Record and expose metrics for Prometheus."""
+
+    def __init__(self, db):
+        self.db = db
+        self.enabled = False
+        self.registry = CollectorRegistry(auto_describe=True)
+        self._listeners = []
+        self._checked_out = {}
+        self._lock = threading.Lock()
+
+        self.requests = Counter('explicates_requests',
+                                'The number of requests handled.',
+                                ['endpoint', 'method', 'status'],
+                                registry=self.registry)
+        self.latency = Histogram('explicates_request_duration_seconds',
+                                 'The time taken to send each response.',
+                                 ['endpoint', 'method'],
+                                 buckets=LATENCY_BUCKETS,
+                                 registry=self.registry)
+        self.pool_checked_out = Gauge('explicates_db_pool_checked_out',
+                                      'The database connections in use.',
+                                      ['bind'], multiprocess_mode='livesum',
+                                      registry=self.registry)
+        self.pool_overflow = Gauge('explicates_db_pool_overflow',
+                                   'The database connections in use beyond '
+                                   'the size of the pool.',
+                                   ['bind'], multiprocess_mode='livesum',
+                                   registry=self.registry)
+        self.export_bytes = Counter('explicates_export_bytes',
+                                    'The number of bytes of exports sent.',
+                                    ['format', 'source'],
+                                    registry=self.registry)
+        self.batch_size = Histogram('explicates_batch_size',
+                                    'The number of Annotations in each batch '
+                                    'operation.',
+                                    ['operation'], buckets=BATCH_BUCKETS,
+                                    registry=self.registry)
+
+    def init_app(self, app):
+        """Add the request hooks and enable if configured."""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if app.config.get('METRICS'):
+            self.enable(app)
+
+    def enable(self, app):
+        """Start recording metrics, listening to each database pool."""
+        if self.enabled:
+            return
+        engines = {'default': self.db.get_engine(app)}
+        for bind in app.config.get('SQLALCHEMY_BINDS') or {}:
+            engine = self.db.get_engine(app, bind=bind)
+            if engine not in engines.values():
+                engines[bind] = engine
+        for bind, engine in engines.items():
+            self._checked_out[bind] = 0
+            for identifier, change in [('checkout', 1), ('checkin', -1)]:
+                listener = self._get_pool_listener(bind, engine.pool, change)
+                event.listen(engine.pool, identifier, listener)
+                self._listeners.append((engine.pool, identifier, listener))
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording metrics."""
+        for pool, identifier, listener in self._listeners:
+            event.remove(pool, identifier, listener)
+        self._listeners = []
+        self.enabled = False
+
+    def generate(self):
+        """Return the metrics in the Prometheus text format."""
+        if get_multiprocess_dir():
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return generate_latest(registry)
+        return generate_latest(self.registry)
+
+    def count_export_bytes(self, chunks, fmt, source):
+        """Count the bytes in each chunk of an export as it is sent."""
+        if not self.enabled:
+            return chunks
+        return self._count_bytes(chunks, self.export_bytes.labels(fmt, source))
+
+    def _count_bytes(self, chunks, counter):
+        for chunk in chunks:
+            counter.inc(len(chunk))
+            yield chunk
+
+    def observe_export(self, n_bytes, fmt, source):
+        """Record the bytes of an export sent all at once."""
+        if self.enabled:
+            self.export_bytes.labels(fmt, source).inc(n_bytes)
+
+    def observe_batch(self, operation, size):
+        """Record the number of Annotations in a batch operation."""
+        if self.enabled:
+            self.batch_size.labels(operation).observe(size)
+
+    def _get_pool_listener(self, bind, pool, change):
+        """Return a listener for connections being used or returned."""
+        def listener(*args):
+            self._update_pool(bind, pool, change)
+        return listener
+
+    def _update_pool(self, bind, pool, change):
+        """Update the gauges for a pool as a connection is used or returned.
+
+        Connections beyond the size of the pool are closed when returned,
+        so the overflow is the number in use beyond that size.
+        """
+        with self._lock:
+            self._checked_out[bind] += change
+            checked_out = self._checked_out[bind]
+        size = pool.size() if hasattr(pool, 'size') else checked_out
+        self.pool_checked_out.labels(bind).set(checked_out)
+        self.pool_overflow.labels(bind).set(max(checked_out - size, 0))
+
+    def _before_request(self):
+        if self.enabled:
+            g._metrics_start = default_timer()
+
+    def _after_request(self, response):
+        if self.enabled:
+            g._metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc=None):
+        """Record the request once the response has been sent."""
+        start = g.get('_metrics_start') if self.enabled else None
+        if start is None:
+            return
+        endpoint = request.endpoint or 'none'
+        status = g.get('_metrics_status', 500)
+        self.requests.labels(endpoint, request.method, status).inc()
+        self.latency.labels(endpoint, request.method).observe(
+            default_timer() - start)
@@ -2,8 +2,12 @@
 """Annotation model."""
 
 from flask import url_for, current_app
-from sqlalchemy.schema import Column, ForeignKey
-from sqlalchemy import Integer, String
+from sqlalchemy.schema import Column, ForeignKey, Index, FetchedValue
+from sqlalchemy.sql import text
+from sqlalchemy import Integer, String, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
+from sqlalchemy.inspection import inspect as sa_inspect
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -17,7 +21,11 @@ Base = declarative_base(cls=BaseDomainObject)
 def get_language(context):
     """Return the language to be used for full-text searches."""
     data = context.current_parameters.get('_data')
+    return get_data_language(data)
 
+
+def get_data_language(data):
+    """Return the full-text search language for some Annotation data."""
     # Map of the available PostgreSQL dictionaries
     lang_map = current_app.config['FTS_LANGUAGE_MAP']
 
@@ -48,6 +56,16 @@ class Annotation(db.Model, Base):
 
     __tablename__ = 'annotation'
 
+    __table_args__ = (
+        Index('idx_annotation_body_tsv', 'body_tsv', postgresql_using='gin'),
+        Index('idx_annotation_target_tsv', 'target_tsv',
+              postgresql_using='gin'),
+        Index('idx_annotation_data', '_data', postgresql_using='gin',
+              postgresql_ops={'_data': 'jsonb_path_ops'}),
+        Index('idx_annotation_collection', 'collection_key', 'created', 'key',
+              postgresql_where=text('NOT deleted')),
+    )
+
     #: The related Collection ID.
     collection_key = Column(Integer, ForeignKey('collection.key'),
                             nullable=False)
@@ -55,8 +73,23 @@ class Annotation(db.Model, Base):
     #: The language used for full-text searches.
     language = Column(String, nullable=False, default=get_language)
 
+    #: The full-text search document for the body, maintained by a trigger.
+    body_tsv = deferred(Column(TSVECTOR, server_default=FetchedValue(),
+                               server_onupdate=FetchedValue()))
+
+    #: The full-text search document for the target, maintained by a trigger.
+    target_tsv = deferred(Column(TSVECTOR, server_default=FetchedValue(),
+                                 server_onupdate=FetchedValue()))
+
     @hybrid_property
     def iri(self):
         if self.id:
             return url_for('api.annotations', collection_id=self.collection.id,
                            annotation_id=self.id, _external=True)
+
+
+@event.listens_for(Annotation, 'before_update')
+def update_language(mapper, connection, target):
+    """Update the full-text search language when the data is modified."""
+    if sa_inspect(target).attrs['_data'].history.has_changes():
+        target.language = get_data_language(target._data)
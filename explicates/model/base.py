@@ -14,6 +14,23 @@ from sqlalchemy.inspection import inspect as sa_inspect
 from explicates.model.utils import make_timestamp, make_uuid
 
 
+#: Attributes that are not included when a domain object is dictized.
+PRIVATE_ATTRS = [
+    'key',
+    'id',
+    '_data',
+    '_total',
+    '_version',
+    'deleted',
+    'collection_key',
+    'data',
+    'iri',
+    'language',
+    'body_tsv',
+    'target_tsv'
+]
+
+
 class BaseDomainObject(object):
     """Base domain object class."""
 
@@ -45,22 +62,15 @@ class BaseDomainObject(object):
 
     def dictize(self):
         """Return the domain object as a dictionary."""
-        private = [
-            'key',
-            'id',
-            '_data',
-            'deleted',
-            'collection_key',
-            'data',
-            'iri',
-            'language'
-        ]
+        private = PRIVATE_ATTRS
         out = {}
 
         # Add column values
         for col in self.__table__.c:
+            if col.name in private:
+                continue
             obj = getattr(self, col.name)
-            if not obj or col.name in private:
+            if not obj:
                 continue
             elif isinstance(obj, datetime.datetime):
                 obj = obj.isoformat()
@@ -85,11 +95,26 @@ class BaseDomainObject(object):
         out['generated'] = make_timestamp()
 
         # Add ID
-        if self.iri:
-            out['id'] = self.iri
+        iri = self.iri
+        if iri:
+            out['id'] = iri
 
         return out
 
+    def get_version(self):
+        """Return values that change whenever the object is written to.
+
+        Timestamps only have a resolution of one second, so the data is
+        included to distinguish writes made within the same second.
+        """
+        return [
+            self.__class__.__name__,
+            self.id,
+            self.modified or self.created,
+            self.deleted,
+            self._data
+        ]
+
     def update(self):
         """Set the modified time to now."""
         self.modified = make_timestamp()
@@ -2,7 +2,8 @@
 """Collection model."""
 
 from flask import url_for
-from sqlalchemy import func, and_
+from sqlalchemy import Integer, event
+from sqlalchemy.schema import Column
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
@@ -10,6 +11,7 @@ from sqlalchemy.orm import relationship
 from explicates.core import db
 from explicates.model.base import BaseDomainObject
 from explicates.model.annotation import Annotation
+from explicates.model.triggers import triggers
 
 
 Base = declarative_base(cls=BaseDomainObject)
@@ -20,26 +22,37 @@ class Collection(db.Model, Base):
 
     __tablename__ = 'collection'
 
+    #: The number of non-deleted Annotations, maintained by triggers.
+    _total = Column(Integer, nullable=False, default=0, server_default='0')
+
+    #: Incremented whenever its Annotations change, maintained by triggers.
+    _version = Column(Integer, nullable=False, default=0, server_default='0')
+
     annotations = relationship(Annotation, backref='collection',
                                lazy='dynamic')
 
     @hybrid_property
     def total(self):
-        count_q = func.count(Annotation.id) \
-                      .filter(Annotation.deleted == False) \
-                      .filter(Annotation.collection_key == self.key)
-        return db.session.execute(db.session.query(count_q)).scalar()
+        return self._total or 0
 
     @total.expression
     def total(cls):
-        return (select([func.count(Annotation.id)]).
-                and_(
-                    where(Annotation.collection_key == cls.key),
-                    where(Annotation.deleted == False)).
-                label("total"))
+        return cls._total
+
+    def get_version(self):
+        """Return values that change whenever the Collection is written to.
+
+        This includes any change to its Annotations.
+        """
+        return super(Collection, self).get_version() + [self.total,
+                                                        self._version]
 
     @hybrid_property
     def iri(self):
         if self.id:
             return url_for('api.collections', collection_id=self.id,
                            _external=True)
+
+
+for trigger in triggers:
+    event.listen(Annotation.__table__, 'after_create', trigger)
@@ -0,0 +1,122 @@
+# -*- coding: utf8 -*-
+"""Triggers."""
+
+from sqlalchemy.schema import DDL
+
+
+#: Cast a language to a text search configuration. Casting to regconfig
+#: directly is not immutable, so cannot be used in an index expression.
+lang_cast = DDL("""
+    CREATE OR REPLACE FUNCTION lang_cast(VARCHAR) RETURNS regconfig
+        AS 'select cast($1 as regconfig)'
+        LANGUAGE SQL
+        IMMUTABLE
+        RETURNS NULL ON NULL INPUT;
+""")
+
+#: Store the full-text search documents for each Annotation whenever its data
+#: or language changes, so that they are not computed at query time.
+update_annotation_tsv = DDL("""
+    CREATE OR REPLACE FUNCTION update_annotation_tsv()
+    RETURNS trigger AS $$
+    BEGIN
+        NEW.body_tsv := to_tsvector(lang_cast(NEW.language),
+                                    NEW._data -> 'body');
+        NEW.target_tsv := to_tsvector(lang_cast(NEW.language),
+                                      NEW._data -> 'target');
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+""")
+
+tsv_trigger = DDL("""
+    CREATE TRIGGER annotation_tsv
+        BEFORE INSERT OR UPDATE OF _data, language ON annotation
+        FOR EACH ROW EXECUTE PROCEDURE update_annotation_tsv();
+""")
+
+
+#: Keep the number of non-deleted Annotations in each Collection up to date
+#: and increment the version of each Collection whose Annotations change.
+#: Statement-level triggers are used so that bulk inserts, updates and deletes
+#: only touch each Collection row once.
+update_collection_total = DDL("""
+    CREATE OR REPLACE FUNCTION update_collection_total()
+    RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE collection SET _total = collection._total + delta.n,
+                                  _version = collection._version + 1
+            FROM (
+                SELECT collection_key,
+                       count(*) FILTER (WHERE deleted IS FALSE) AS n
+                FROM new_annotation
+                GROUP BY collection_key
+            ) AS delta
+            WHERE collection.key = delta.collection_key;
+        ELSIF TG_OP = 'DELETE' THEN
+            UPDATE collection SET _total = collection._total - delta.n,
+                                  _version = collection._version + 1
+            FROM (
+                SELECT collection_key,
+                       count(*) FILTER (WHERE deleted IS FALSE) AS n
+                FROM old_annotation
+                GROUP BY collection_key
+            ) AS delta
+            WHERE collection.key = delta.collection_key;
+        ELSE
+            UPDATE collection SET _total = collection._total + delta.n,
+                                  _version = collection._version + 1
+            FROM (
+                SELECT collection_key, sum(n) AS n
+                FROM (
+                    SELECT collection_key,
+                           count(*) FILTER (WHERE deleted IS FALSE) AS n
+                    FROM new_annotation
+                    GROUP BY collection_key
+                    UNION ALL
+                    SELECT collection_key,
+                           -count(*) FILTER (WHERE deleted IS FALSE) AS n
+                    FROM old_annotation
+                    GROUP BY collection_key
+                ) AS changes
+                GROUP BY collection_key
+            ) AS delta
+            WHERE collection.key = delta.collection_key;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+""")
+
+insert_trigger = DDL("""
+    CREATE TRIGGER annotation_insert_total
+        AFTER INSERT ON annotation
+        REFERENCING NEW TABLE AS new_annotation
+        FOR EACH STATEMENT EXECUTE PROCEDURE update_collection_total();
+""")
+
+update_trigger = DDL("""
+    CREATE TRIGGER annotation_update_total
+        AFTER UPDATE ON annotation
+        REFERENCING OLD TABLE AS old_annotation
+        NEW TABLE AS new_annotation
+        FOR EACH STATEMENT EXECUTE PROCEDURE update_collection_total();
+""")
+
+delete_trigger = DDL("""
+    CREATE TRIGGER annotation_delete_total
+        AFTER DELETE ON annotation
+        REFERENCING OLD TABLE AS old_annotation
+        FOR EACH STATEMENT EXECUTE PROCEDURE update_collection_total();
+""")
+
+triggers = [
+    lang_cast,
+    update_annotation_tsv,
+    tsv_trigger,
+    update_collection_total,
+    insert_trigger,
+    update_trigger,
+    delete_trigger
+]
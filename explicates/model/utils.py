@@ -1,8 +1,15 @@
 # -*- coding: utf8 -*-
 """Model utilities module."""
 
+import re
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+from past.builtins import basestring
+
+
+#: An xsd:dateTime, with optional fractional seconds and time zone.
+XSD_DATETIME = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(\.\d+)?'
+                          r'(Z|[+-]\d{2}:\d{2})?\Z')
 
 
 def make_timestamp():
@@ -10,6 +17,26 @@ def make_timestamp():
     return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
 
 
+def parse_timestamp(value):
+    """Return an xsd:dateTime in the UTC format used for timestamps.
+
+    Fractional seconds are dropped and times without a time zone are taken
+    to be UTC. Raises a ValueError for anything else.
+    """
+    match = None
+    if isinstance(value, basestring):
+        match = XSD_DATETIME.match(value)
+    if not match:
+        raise ValueError('Invalid timestamp: {!r}'.format(value))
+    dt = datetime.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S')
+    tz = match.group(3)
+    if tz and tz != 'Z':
+        sign = -1 if tz[0] == '-' else 1
+        offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[4:6]))
+        dt -= sign * offset
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
 def make_uuid():
     """Return a Unicode UUID."""
     return str(uuid.uuid4())
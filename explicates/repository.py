@@ -1,13 +1,17 @@
 # -*- coding: utf8 -*-
 """Repository module."""
 
+import io
 import json
-from sqlalchemy import func
-from sqlalchemy.sql import and_, or_
+import psycopg2
+from itertools import islice
+from sqlalchemy import func, any_, bindparam, Boolean
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm.base import _entity_descriptor
 from future.utils import iteritems
 
+from explicates.session import get_read_session
+
 
 class Repository(object):
     """Repository class for all domain objects."""
@@ -15,22 +19,31 @@ class Repository(object):
     def __init__(self, db):
         self.db = db
 
+    @property
+    def _read_session(self):
+        """Return the session for read-only queries."""
+        return get_read_session(self.db)
+
     def get(self, model_cls, key):
         """Get an object by key."""
-        return self.db.session.query(model_cls).get(key)
+        return self._read_session.query(model_cls).get(key)
 
     def get_by(self, model_cls, **attrs):
         """Get an object by given attributes."""
-        return self.db.session.query(model_cls).filter_by(**attrs).first()
+        return self._read_session.query(model_cls).filter_by(**attrs).first()
 
     def filter_by(self, model_cls, **attrs):
-        """Get all objects filtered by given attributes."""
-        return self.db.session.query(model_cls).filter_by(**attrs).all()
+        """Get all objects filtered by given attributes, in key order."""
+        return (self._read_session.query(model_cls)
+                                  .filter_by(**attrs)
+                                  .order_by(model_cls.key)
+                                  .all())
 
     def count(self, model_cls):
         """Count all non-deleted objects."""
         count_q = func.count(model_cls.key).filter(model_cls.deleted == False)
-        return self.db.session.execute(self.db.session.query(count_q)).scalar()
+        session = self._read_session
+        return session.execute(session.query(count_q)).scalar()
 
     def save(self, model_cls, obj):
         """Save an object."""
@@ -42,6 +55,74 @@ class Repository(object):
             self.db.session.rollback()
             raise err
 
+    def batch_save(self, model_cls, rows, chunk_size=1000):
+        """Insert a list of rows, given as dicts of column values.
+
+        The rows are inserted with multi-row INSERT statements and committed
+        in a single transaction, along with any other pending changes.
+        """
+        table = model_cls.__table__
+        try:
+            for i in range(0, len(rows), chunk_size):
+                chunk = rows[i:i + chunk_size]
+                self.db.session.execute(table.insert().values(chunk))
+            self.db.session.commit()
+        except IntegrityError as err:
+            self.db.session.rollback()
+            raise err
+
+    def batch_copy(self, model_cls, rows, columns, chunk_size=10000):
+        """Load rows, given as dicts of column values, with COPY.
+
+        The rows may be any iterable, so are read and loaded a chunk at a
+        time. All chunks are committed in a single transaction, along with
+        any other pending changes. Returns the number of rows loaded.
+        """
+        from explicates.core import json_encoder
+        table = model_cls.__table__
+        sql = 'COPY {0} ({1}) FROM STDIN'.format(table.name,
+                                                 ', '.join(columns))
+        table_columns = [table.c[col] for col in columns]
+        rows = iter(rows)
+        n = 0
+        try:
+            cursor = self.db.session.connection().connection.cursor()
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                lines = []
+                for row in chunk:
+                    values = [self._get_copy_value(row.get(col.name), col,
+                                                   json_encoder)
+                              for col in table_columns]
+                    lines.append(u'\t'.join(values) + u'\n')
+                buf = io.BytesIO(u''.join(lines).encode('utf8'))
+                cursor.copy_expert(sql, buf)
+                n += len(chunk)
+            self.db.session.commit()
+        except psycopg2.IntegrityError as err:
+            self.db.session.rollback()
+            raise IntegrityError(sql, None, err)
+        except Exception:
+            self.db.session.rollback()
+            raise
+        return n
+
+    def _get_copy_value(self, value, column, json_encoder):
+        """Return a column value in COPY's text format."""
+        if value is None:
+            return u'\\N'
+        elif isinstance(column.type, JSONB):
+            value = json_encoder.dumps(value)
+        elif isinstance(column.type, Boolean):
+            value = u't' if value else u'f'
+        value = u'{}'.format(value)
+        return (value.replace(u'\\', u'\\\\')
+                     .replace(u'\t', u'\\t')
+                     .replace(u'\n', u'\\n')
+                     .replace(u'\r', u'\\r'))
+
     def update(self, model_cls, obj):
         """Update an object."""
         self._validate_can_be(model_cls, 'updated', obj)
@@ -64,34 +145,35 @@ class Repository(object):
             self.db.session.rollback()
             raise err
 
-    def batch_delete(self, model_cls, ids):
-        """Mark a list of objects as deleted."""
-        batch_clause = self._get_batch_clause(model_cls, ids)
+    def batch_delete(self, model_cls, ids, chunk_size=10000):
+        """Mark a list of objects as deleted, by ID.
+
+        The IDs are passed to the database as arrays of up to chunk_size items
+        and updated in a single transaction, which is rolled back if any of
+        the IDs cannot be found.
+        """
+        table = model_cls.__table__
+        found = set()
         try:
-            self.db.session.execute(model_cls.__table__.update()
-                                                       .values(deleted=True)
-                                                       .where(batch_clause))
-            self.db.session.commit()
+            for i in range(0, len(ids), chunk_size):
+                chunk = bindparam('ids', ids[i:i + chunk_size],
+                                  type_=ARRAY(table.c.id.type))
+                query = (table.update()
+                              .values(deleted=True)
+                              .where(table.c.id == any_(chunk))
+                              .returning(table.c.id))
+                found.update(row.id for row in self.db.session.execute(query))
         except IntegrityError as err:  # pragma: no cover
             self.db.session.rollback()
             raise err
 
-    def _validate_batch_clause(self, model_cls, batch_clause, ids):
-        """Confirm that all IDs exist for the batch clause."""
-        query = model_cls.__table__.select().where(batch_clause)
-        count = self.db.session.execute(query).rowcount
-        if count < len(ids):
-            msg = 'The query contains IDs that cannot be found in the database'
+        missing = [_id for _id in ids if _id not in found]
+        if missing:
+            self.db.session.rollback()
+            msg = ('The query contains IDs that cannot be found in the '
+                   'database: {}'.format(', '.join(missing)))
             raise ValueError(msg)
-
-    def _get_batch_clause(self, model_cls, ids):
-        """Return OR clauses for batch operations by ID."""
-        clauses = []
-        for _id in ids:
-            clauses.append(_entity_descriptor(model_cls, 'id') == _id)
-        batch_clause = or_(*clauses)
-        self._validate_batch_clause(model_cls, batch_clause, ids)
-        return batch_clause
+        self.db.session.commit()
 
     def _validate_can_be(self, model_cls, action, obj):
         """Verify that the query is for an object of the right type."""
@@ -2,11 +2,16 @@
 """Search module."""
 
 import json
+from flask import current_app
 from sqlalchemy import func
 from sqlalchemy.sql import and_, or_
+from sqlalchemy.sql.expression import Executable, ClauseElement
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import contains_eager
 from sqlalchemy.orm.base import _entity_descriptor
 from future.utils import iteritems
+from past.builtins import basestring
 
 try:  # pragma: no cover
     from urllib.parse import unquote
@@ -20,6 +25,20 @@ except ImportError:  # pragma: no cover
 
 from explicates.model.collection import Collection
 from explicates.model.annotation import Annotation
+from explicates.session import get_read_session
+
+
+class Explain(Executable, ClauseElement):
+    """An EXPLAIN statement returning the query plan as JSON."""
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def pg_explain(element, compiler, **kw):
+    text = 'EXPLAIN (FORMAT JSON) '
+    return text + compiler.process(element.statement, **kw)
 
 
 class Search(object):
@@ -59,13 +78,44 @@ class Search(object):
         if len(clauses) > 1:
             clauses = and_(*clauses)
 
-        return (self.db.session.query(Annotation)
-                .join(Collection)
-                .filter(*clauses)
-                .order_by(order_by)
-                .limit(limit)
-                .offset(offset)
-                .all())
+        # The key breaks ties, so that pages of results with equal values,
+        # such as those created in the same batch, are in a stable order
+        order_by = self._get_order_by(order_by)
+        query = (get_read_session(self.db).query(Annotation)
+                 .join(Collection)
+                 .filter(*clauses)
+                 .order_by(order_by, Annotation.key))
+
+        # Wrap any limited results so that they can be paged through
+        if limit or offset:
+            query = (query.limit(limit)
+                          .offset(offset)
+                          .from_self()
+                          .join(Annotation.collection)
+                          .order_by(order_by, Annotation.key))
+
+        # Load each Annotation's Collection from the same query
+        return query.options(contains_eager(Annotation.collection))
+
+    def count(self, query):
+        """Count the results of a search query.
+
+        If SEARCH_ESTIMATE_THRESHOLD is set then the query planner's estimate
+        is returned when it exceeds that number, avoiding an exact count over
+        very large result sets.
+        """
+        query = query.order_by(None)
+        threshold = current_app.config.get('SEARCH_ESTIMATE_THRESHOLD')
+        if threshold:
+            estimate = self.estimate(query)
+            if estimate > threshold:
+                return estimate
+        return query.count()
+
+    def estimate(self, query):
+        """Return the query planner's estimate of the number of results."""
+        plan = query.session.execute(Explain(query.statement)).scalar()
+        return plan[0]['Plan']['Plan Rows']
 
     def _parse_json(self, key, data):
         if isinstance(data, dict):
@@ -122,7 +172,7 @@ class Search(object):
         err_base = 'invalid "fts" clause'
         clauses = []
         for col, settings in q.items():
-            vector = self._get_vector(col)
+            document = self._get_document(col)
 
             # Check params
             if not isinstance(settings, dict):
@@ -134,6 +184,7 @@ class Search(object):
                 raise ValueError(msg)
             operator = settings.get('operator', 'and')
             prefix = settings.get('prefix', True)
+            regconfig = self._get_regconfig(settings, err_base)
 
             # Generate clauses
             tokens = query.split()
@@ -141,14 +192,15 @@ class Search(object):
             for t in tokens:
                 if prefix:
                     t += ':*'
-                clause = func.to_tsvector(vector).match(t)
+                ts_query = func.to_tsquery(regconfig, t)
+                clause = document.op('@@')(ts_query)
                 word_clauses.append(clause)
             if operator == 'or':
                 clauses.append(or_(*word_clauses))
             else:
                 clauses.append(and_(*word_clauses))
 
-            return clauses
+        return clauses
 
     def _get_fts_phrase_clauses(self, data):
         """Return full-text search phrase clauses."""
@@ -156,7 +208,7 @@ class Search(object):
         err_base = 'invalid "fts_phrase" clause'
         clauses = []
         for col, settings in q.items():
-            vector = self._get_vector(col)
+            document = self._get_document(col)
 
             # Check params
             if not isinstance(settings, dict):
@@ -168,17 +220,41 @@ class Search(object):
                 raise ValueError(msg)
             distance = settings.get('distance', 1)
             operator = ' <{}> '.format(distance)
+            regconfig = self._get_regconfig(settings, err_base)
 
             # Generate clause
             tokens = query.split()
             word_clauses = []
             query_str = operator.join(tokens)
-            ts_query = func.to_tsquery(query_str)
-            clause = func.to_tsvector(vector).op('@@')(ts_query)
+            ts_query = func.to_tsquery(regconfig, query_str)
+            clause = document.op('@@')(ts_query)
             clauses.append(clause)
 
         return clauses
 
+    def _get_regconfig(self, settings, err_base):
+        """Return the text search configuration used to parse a query.
+
+        The configuration is given by the language code of the query, or
+        the default if the language is not given or not available.
+        """
+        lang = settings.get('language')
+        if lang is not None and not isinstance(lang, basestring):
+            msg = '{0}: "language" must be a string'.format(err_base)
+            raise ValueError(msg)
+        lang_map = current_app.config['FTS_LANGUAGE_MAP']
+        lang_code = lang.split('-')[0] if lang else None
+        config = lang_map.get(lang_code, current_app.config['FTS_DEFAULT'])
+        return func.lang_cast(config)
+
+    def _get_order_by(self, order_by):
+        """Return the Annotation column to order by."""
+        if (not isinstance(order_by, basestring) or
+                order_by not in Annotation.__table__.c):
+            msg = 'invalid "order_by": {} is not a column'.format(order_by)
+            raise ValueError(msg)
+        return _entity_descriptor(Annotation, order_by)
+
     def _get_vector(self, col):
         """Return the query vector."""
         try:
@@ -186,6 +262,18 @@ class Search(object):
         except InvalidRequestError:
             return _entity_descriptor(Annotation, '_data')[col]
 
+    def _get_document(self, col):
+        """Return the full-text search document.
+
+        The stored documents are used where available, otherwise the document
+        is computed using each Annotation's language.
+        """
+        stored = Annotation.__table__.c.get('{}_tsv'.format(col))
+        if stored is not None:
+            return stored
+        vector = self._get_vector(col)
+        return func.to_tsvector(func.lang_cast(Annotation.language), vector)
+
     def _get_deleted_clause(self, data):
         """Return the deleted clause."""
         if data.lower() == 'exclude':
@@ -0,0 +1,58 @@
+# -*- coding: utf8 -*-
+"""Session routing module.
+
+Queries made while handling GET and HEAD requests are read from the slave
+session, everything else uses the master session.
+"""
+
+import time
+from flask import request, current_app, has_request_context
+
+
+#: Cookie used to record when a client last wrote to the master.
+LAST_WRITE_COOKIE = 'explicates_last_write'
+
+#: HTTP methods that can be served by the slave.
+READ_METHODS = ['GET', 'HEAD']
+
+
+def get_read_session(db):
+    """Return the session to be used for read-only queries."""
+    if use_slave():
+        return db.slave_session
+    return db.session
+
+
+def use_slave():
+    """Check if the current request can read from the slave.
+
+    If READ_YOUR_WRITES_WINDOW is set then a client that wrote to the master
+    within that number of seconds continues to read from the master, so that
+    it sees its own changes regardless of any replication lag.
+    """
+    if not has_request_context() or request.method not in READ_METHODS:
+        return False
+    window = current_app.config.get('READ_YOUR_WRITES_WINDOW')
+    if window:
+        last_write = _get_last_write()
+        if last_write and time.time() - last_write < window:
+            return False
+    return True
+
+
+def set_last_write(response):
+    """Set the last write cookie after a successful write."""
+    window = current_app.config.get('READ_YOUR_WRITES_WINDOW')
+    is_write = request.method not in READ_METHODS + ['OPTIONS']
+    if window and is_write and response.status_code < 400:
+        response.set_cookie(LAST_WRITE_COOKIE, str(time.time()),
+                            max_age=window)
+    return response
+
+
+def _get_last_write():
+    """Return the time of the client's last write, if known."""
+    try:
+        return float(request.cookies.get(LAST_WRITE_COOKIE))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,49 @@
+# -*- coding: utf8 -*-
+"""Validator module."""
+
+import os
+import json
+from jsonschema.validators import validator_for
+
+
+class Validator(object):
+    """Validator class for domain objects.
+
+    The JSON schema for each model class is loaded and checked once, then
+    reused for every validation.
+    """
+
+    def __init__(self, model_classes, schemas_dir, auto_reload=False):
+        self.model_classes = model_classes
+        self.schemas_dir = schemas_dir
+        self.auto_reload = auto_reload
+        self.validators = {}
+        self.mtimes = {}
+        self.load()
+
+    def load(self):
+        """Load the JSON schemas and build a validator for each."""
+        for model_cls in self.model_classes:
+            schema_path = self._get_schema_path(model_cls)
+            with open(schema_path) as json_file:
+                schema = json.load(json_file)
+            validator_cls = validator_for(schema)
+            validator_cls.check_schema(schema)
+            self.validators[model_cls] = validator_cls(schema)
+            self.mtimes[model_cls] = os.path.getmtime(schema_path)
+
+    def validate(self, data, model_cls):
+        """Validate data according to the JSON schema for the model class."""
+        if self.auto_reload and self._is_modified(model_cls):
+            self.load()
+        self.validators[model_cls].validate(data)
+
+    def _get_schema_path(self, model_cls):
+        """Return the path to the JSON schema for the model class."""
+        schema_fn = '{}.json'.format(model_cls.__name__.lower())
+        return os.path.join(self.schemas_dir, schema_fn)
+
+    def _is_modified(self, model_cls):
+        """Check if a JSON schema was modified since it was loaded."""
+        schema_path = self._get_schema_path(model_cls)
+        return os.path.getmtime(schema_path) != self.mtimes[model_cls]
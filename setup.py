@@ -11,6 +11,7 @@ requirements = [
     "zipstream>=1.1.4, <1.2.0",
     "psycopg2>=2.5.2, <3.0",
     "future>=0.16.0, <1.0.0",
+    "prometheus_client>=0.10.0, <0.13.0",
     "mkdocs>=0.17.1, <1.0.0",
     "mkdocs-material",
     "pymdown-extensions",
@@ -3,6 +3,8 @@
 import os
 import json
 from functools import wraps
+from sqlalchemy import event
+from flask.testing import FlaskClient
 
 from factories import reset_all_pk_sequences
 
@@ -14,6 +16,21 @@ os.environ['EXPLICATES_SETTINGS'] = '../settings_test.py'
 flask_app = create_app()
 
 
+class BufferedClient(FlaskClient):
+    """A test client that reads each response in full.
+
+    As a WSGI server would, this closes streamed responses, and so any
+    request contexts held open by them, even if the body is never read.
+    """
+
+    def open(self, *args, **kwargs):
+        kwargs.setdefault('buffered', True)
+        return super(BufferedClient, self).open(*args, **kwargs)
+
+
+flask_app.test_client_class = BufferedClient
+
+
 def with_context(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -28,6 +45,23 @@ def rebuild_db():
     db.create_all()
 
 
+class QueryCounter(object):
+    """Count the SQL statements executed within a block."""
+
+    def __init__(self):
+        self.count = 0
+
+    def _increment(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(db.engine, 'before_cursor_execute', self._increment)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(db.engine, 'before_cursor_execute', self._increment)
+
+
 class Test(object):
 
     def setUp(self):
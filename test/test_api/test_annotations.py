@@ -251,7 +251,7 @@ class TestAnnotationsAPI(Test):
         assert_equal(collection.modified, annotation.modified)
 
     @with_context
-    @patch('explicates.api.base.validate_json')
+    @patch('explicates.api.base.validator.validate')
     def test_annotation_validated_before_create(self, mock_validate):
         """Test Annotation validated before creation."""
         collection = CollectionFactory()
@@ -260,15 +260,12 @@ class TestAnnotationsAPI(Test):
         mock_validate.side_effect = ValidationError('Bad Data')
         res = self.app_post_json_ld(endpoint, data=bad_data)
         assert_equal(res.status_code, 400, res.data)
-        schema_path = os.path.join(current_app.root_path, 'schemas',
-                                   'annotation.json')
-        schema = json.load(open(schema_path))
-        mock_validate.assert_called_once_with(bad_data, schema)
+        mock_validate.assert_called_once_with(bad_data, Annotation)
         annotations = repo.filter_by(Annotation)
         assert_equal(len(annotations), 0)
 
     @with_context
-    @patch('explicates.api.base.validate_json')
+    @patch('explicates.api.base.validator.validate')
     def test_annotation_validated_before_update(self, mock_validate):
         """Test Annotation validated before update."""
         annotation = AnnotationFactory()
@@ -278,8 +275,78 @@ class TestAnnotationsAPI(Test):
         mock_validate.side_effect = ValidationError('Bad Data')
         res = self.app_put_json_ld(endpoint, data=bad_data)
         assert_equal(res.status_code, 400, res.data)
-        schema_path = os.path.join(current_app.root_path, 'schemas',
-                                   'annotation.json')
-        schema = json.load(open(schema_path))
-        mock_validate.assert_called_once_with(bad_data, schema)
+        mock_validate.assert_called_once_with(bad_data, Annotation)
         assert_not_equal(annotation._data, bad_data)
+
+    @with_context
+    def test_annotation_etag_is_stable(self):
+        """Test Annotation ETag does not change until it is modified."""
+        annotation = AnnotationFactory()
+        endpoint = u'/annotations/{}/{}/'.format(annotation.collection.id,
+                                                 annotation.id)
+        with freeze_time("1984-11-19"):
+            etag = self.app_get_json_ld(endpoint).headers.get('ETag')
+        with freeze_time("1984-11-20"):
+            res = self.app_get_json_ld(endpoint)
+        assert_equal(res.headers.get('ETag'), etag)
+
+        with freeze_time("1984-11-21"):
+            self.app_put_json_ld(endpoint, data=annotation.data)
+            res = self.app_get_json_ld(endpoint)
+        assert_not_equal(res.headers.get('ETag'), etag)
+
+    @with_context
+    def test_annotation_not_modified(self):
+        """Test 304 returned for a current Annotation."""
+        with freeze_time("1984-11-19"):
+            annotation = AnnotationFactory()
+        endpoint = u'/annotations/{}/{}/'.format(annotation.collection.id,
+                                                 annotation.id)
+        res = self.app_get_json_ld(endpoint)
+        assert_equal(res.headers.get('Last-Modified'),
+                     'Mon, 19 Nov 1984 00:00:00 GMT')
+
+        headers = {'If-None-Match': res.headers.get('ETag')}
+        res = self.app_get_json_ld(endpoint, headers=headers)
+        assert_equal(res.status_code, 304, res.data)
+        assert_equal(res.data, b'')
+
+        headers = {'If-Modified-Since': 'Tue, 20 Nov 1984 00:00:00 GMT'}
+        res = self.app_get_json_ld(endpoint, headers=headers)
+        assert_equal(res.status_code, 304, res.data)
+
+        headers = {'If-Modified-Since': 'Sun, 18 Nov 1984 00:00:00 GMT'}
+        res = self.app_get_json_ld(endpoint, headers=headers)
+        assert_equal(res.status_code, 200, res.data)
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_annotation_etag_changes_within_the_same_second(self):
+        """Test Annotation ETag changes when modified in the same second."""
+        annotation = AnnotationFactory()
+        endpoint = u'/annotations/{}/{}/'.format(annotation.collection.id,
+                                                 annotation.id)
+        etag = self.app_get_json_ld(endpoint).headers.get('ETag')
+        data = dict(annotation.data, body='foo')
+        self.app_put_json_ld(endpoint, data=data)
+        res = self.app_get_json_ld(endpoint)
+        assert_not_equal(res.headers.get('ETag'), etag)
+        etag = res.headers.get('ETag')
+
+        data = dict(annotation.data, body='bar')
+        self.app_put_json_ld(endpoint, data=data)
+        headers = {'If-None-Match': etag}
+        res = self.app_get_json_ld(endpoint, headers=headers)
+        assert_equal(res.status_code, 200, res.data)
+        assert_equal(json.loads(res.data.decode('utf8'))['body'], 'bar')
+
+    @with_context
+    def test_last_modified_skipped_for_unexpected_timestamp(self):
+        """Test Last-Modified not sent for a timestamp it cannot parse."""
+        annotation = AnnotationFactory(created='2015-10-13T13:00:00.000Z')
+        endpoint = u'/annotations/{}/{}/'.format(annotation.collection.id,
+                                                 annotation.id)
+        res = self.app_get_json_ld(endpoint)
+        assert_equal(res.status_code, 200, res.data)
+        assert_not_in('Last-Modified', res.headers)
+        assert_in('ETag', res.headers)
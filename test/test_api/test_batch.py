@@ -2,11 +2,14 @@
 
 import json
 from nose.tools import *
+from freezegun import freeze_time
 from base import Test, with_context
 from factories import CollectionFactory, AnnotationFactory
+from flask import url_for
 
 from explicates.core import repo
 from explicates.model.annotation import Annotation
+from explicates.model.collection import Collection
 
 
 class TestBatchAPI(Test):
@@ -38,10 +41,25 @@ class TestBatchAPI(Test):
         res = self.app_delete_json_ld(endpoint, data=data)
         assert_equal(res.status_code, 400, res.data)
         err_msg = ("400 Bad Request: The query contains IDs that cannot be "
-                   "found in the database")
+                   "found in the database: foo")
         data = json.loads(res.data.decode('utf8'))
         assert_equal(data['message'], err_msg, res.data)
 
+    @with_context
+    def test_batch_delete_with_some_invalid_annotations(self):
+        """Test batch delete with some invalid Annotations deletes nothing."""
+        annotation = AnnotationFactory(id='foo')
+        data = [{'id': 'foo'}, {'id': 'bar'}, {'id': 'baz'}]
+        endpoint = '/batch/'
+        res = self.app_delete_json_ld(endpoint, data=data)
+        assert_equal(res.status_code, 400, res.data)
+        err_msg = ("400 Bad Request: The query contains IDs that cannot be "
+                   "found in the database: bar, baz")
+        data = json.loads(res.data.decode('utf8'))
+        assert_equal(data['message'], err_msg, res.data)
+        annotations_after = repo.filter_by(Annotation, deleted=False)
+        assert_equal(annotations_after, [annotation])
+
     @with_context
     def test_batch_delete_annotations_with_no_data(self):
         """Test batch delete Annotations with no data."""
@@ -56,3 +74,101 @@ class TestBatchAPI(Test):
         data = dict(foo='bar')
         res = self.app_delete_json_ld(endpoint, data=data)
         assert_equal(res.status_code, 400, res.data)
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_batch_create_annotations(self):
+        """Test batch create Annotations."""
+        collection = CollectionFactory()
+        data = [
+            {
+                'id': 'http://example.org/anno1',
+                'type': 'Annotation',
+                'body': {
+                    'value': 'foo',
+                    'language': 'fr'
+                },
+                'target': 'http://example.org/page1'
+            },
+            {
+                'type': 'Annotation',
+                'body': 'http://example.org/post2',
+                'target': 'http://example.org/page2'
+            }
+        ]
+        endpoint = u'/batch/?collection={}'.format(collection.iri)
+        res = self.app_post_json_ld(endpoint, data=data)
+        assert_equal(res.status_code, 201, res.data)
+
+        annotations = repo.filter_by(Annotation)
+        assert_equal(len(annotations), 2)
+        assert_equal([anno.collection for anno in annotations],
+                     [collection, collection])
+        assert_equal(annotations[0].data['via'], 'http://example.org/anno1')
+        assert_equal(annotations[0].language, 'french')
+        assert_equal(annotations[1].language, 'english')
+        assert_equal(annotations[1].created, '1984-11-19T00:00:00Z')
+        assert_equal(collection.total, 2)
+        assert_equal(collection.modified, '1984-11-19T00:00:00Z')
+
+        out = json.loads(res.data.decode('utf8'))
+        assert_equal(out['type'], 'AnnotationPage')
+        assert_equal(out['partOf'], collection.iri)
+        assert_equal(out['items'], [
+            url_for('api.annotations', collection_id=collection.id,
+                    annotation_id=anno.id)
+            for anno in annotations
+        ])
+
+    @with_context
+    def test_batch_create_with_invalid_annotation(self):
+        """Test nothing is created when any Annotation is invalid."""
+        collection = CollectionFactory()
+        data = [
+            {
+                'type': 'Annotation',
+                'body': 'foo',
+                'target': 'bar'
+            },
+            {
+                'type': 'Annotation'
+            }
+        ]
+        endpoint = u'/batch/?collection={}'.format(collection.id)
+        res = self.app_post_json_ld(endpoint, data=data)
+        assert_equal(res.status_code, 400, res.data)
+        out = json.loads(res.data.decode('utf8'))
+        assert_in('Annotation 1 is invalid', out['message'])
+        assert_equal(repo.filter_by(Annotation), [])
+
+    @with_context
+    def test_batch_create_without_collection(self):
+        """Test batch create Annotations without a Collection."""
+        data = [{'type': 'Annotation', 'body': 'foo', 'target': 'bar'}]
+        res = self.app_post_json_ld('/batch/', data=data)
+        assert_equal(res.status_code, 400, res.data)
+        res = self.app_post_json_ld('/batch/?collection=foo', data=data)
+        assert_equal(res.status_code, 404, res.data)
+
+    @with_context
+    def test_batch_create_with_invalid_data(self):
+        """Test batch create Annotations with invalid data."""
+        collection = CollectionFactory()
+        endpoint = u'/batch/?collection={}'.format(collection.id)
+        res = self.app_post_json_ld(endpoint, data=dict(foo='bar'))
+        assert_equal(res.status_code, 400, res.data)
+
+    @with_context
+    def test_batch_with_malformed_data(self):
+        """Test batch create and delete with malformed data."""
+        collection = CollectionFactory()
+        endpoints = [
+            ('post', u'/batch/?collection={}'.format(collection.id)),
+            ('delete', '/batch/')
+        ]
+        for method, endpoint in endpoints:
+            for data in [b'[{"id": "foo"', b'\xff', b'["foo"]']:
+                res = getattr(self.app, method)(
+                    endpoint, data=data, content_type='application/ld+json')
+                assert_equal(res.status_code, 400, res.data)
+        assert_equal(repo.filter_by(Annotation), [])
@@ -5,14 +5,18 @@ import json
 from nose.tools import *
 from mock import patch, call
 from freezegun import freeze_time
-from base import Test, with_context
+from base import Test, QueryCounter, db, with_context
 from factories import CollectionFactory, AnnotationFactory
 from flask import current_app, url_for
 from jsonschema.exceptions import ValidationError
+from sqlalchemy import tuple_
 
 from explicates.core import repo
 from explicates.model.collection import Collection
 from explicates.model.annotation import Annotation
+from explicates.api.base import APIBase, StreamedItems
+from explicates.api.collections import CollectionsAPI
+from explicates.search import Explain
 
 
 class TestCollectionsAPI(Test):
@@ -20,6 +24,7 @@ class TestCollectionsAPI(Test):
     def setUp(self):
         super(TestCollectionsAPI, self).setUp()
         assert_dict_equal.__self__.maxDiff = None
+        self.api_base = APIBase()
 
     @with_context
     def test_404_when_collection_does_not_exist(self):
@@ -174,7 +179,8 @@ class TestCollectionsAPI(Test):
                 'startIndex': 0,
                 'items': items,
                 'next': url_for('api.collections', collection_id=collection.id,
-                                page=1),
+                                after=self.api_base._encode_cursor(
+                                    annotations[per_page - 1])),
             },
             'last': url_for('api.collections',
                             collection_id=collection.id, page=last_page)
@@ -510,9 +516,11 @@ class TestCollectionsAPI(Test):
                 'generated': '1984-11-19T00:00:00Z'
             },
             'next': url_for('api.collections', collection_id=collection.id,
-                            page=current_page + 1),
+                            after=self.api_base._encode_cursor(
+                                annotations[start + per_page - 1])),
             'prev': url_for('api.collections', collection_id=collection.id,
-                            page=current_page - 1),
+                            before=self.api_base._encode_cursor(
+                                annotations[start])),
         }
 
         endpoint = u'/annotations/{}/'.format(collection.id)
@@ -555,6 +563,169 @@ class TestCollectionsAPI(Test):
         data = json.loads(res.data.decode('utf8'))
         assert_dict_equal(data, expected)
 
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_get_page_after_cursor(self):
+        """Test get AnnotationPage after a cursor."""
+        collection = CollectionFactory()
+        per_page = current_app.config.get('ANNOTATIONS_PER_PAGE')
+        annotations = AnnotationFactory.create_batch(per_page * 3,
+                                                     collection=collection)
+        page_annotations = annotations[per_page:per_page * 2]
+        after = self.api_base._encode_cursor(annotations[per_page - 1])
+
+        endpoint = u'/annotations/{0}/?iris=1&after={1}'.format(collection.id,
+                                                                after)
+        res = self.app_get_json_ld(endpoint)
+        data = json.loads(res.data.decode('utf8'))
+        assert_equal(data['id'], url_for('api.collections',
+                                         collection_id=collection.id,
+                                         **dict(after=after, iris=1)))
+        assert_equal(data['type'], 'AnnotationPage')
+        assert_equal(data['items'], [
+            url_for('api.annotations', collection_id=collection.id,
+                    annotation_id=anno.id)
+            for anno in page_annotations
+        ])
+        assert_equal(data['next'], url_for(
+            'api.collections', collection_id=collection.id,
+            **dict(after=self.api_base._encode_cursor(page_annotations[-1]),
+                   iris=1)))
+        assert_equal(data['prev'], url_for(
+            'api.collections', collection_id=collection.id,
+            **dict(before=self.api_base._encode_cursor(page_annotations[0]),
+                   iris=1)))
+        assert_equal(data['partOf']['total'], len(annotations))
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_get_page_before_cursor(self):
+        """Test get AnnotationPage before a cursor."""
+        collection = CollectionFactory()
+        per_page = current_app.config.get('ANNOTATIONS_PER_PAGE')
+        annotations = AnnotationFactory.create_batch(per_page * 2,
+                                                     collection=collection)
+        before = self.api_base._encode_cursor(annotations[per_page])
+
+        endpoint = u'/annotations/{0}/?iris=1&before={1}'.format(
+            collection.id, before)
+        res = self.app_get_json_ld(endpoint)
+        data = json.loads(res.data.decode('utf8'))
+        assert_equal(data['items'], [
+            url_for('api.annotations', collection_id=collection.id,
+                    annotation_id=anno.id)
+            for anno in annotations[:per_page]
+        ])
+        assert_equal(data['next'], url_for(
+            'api.collections', collection_id=collection.id,
+            **dict(after=self.api_base._encode_cursor(
+                annotations[per_page - 1]), iris=1)))
+        assert_not_in('prev', data)
+
+    @with_context
+    def test_last_cursor_page_has_no_next(self):
+        """Test the last AnnotationPage found by cursor has no next page."""
+        collection = CollectionFactory()
+        per_page = current_app.config.get('ANNOTATIONS_PER_PAGE')
+        annotations = AnnotationFactory.create_batch(per_page * 2,
+                                                     collection=collection)
+        after = self.api_base._encode_cursor(annotations[per_page - 1])
+
+        endpoint = u'/annotations/{0}/?after={1}'.format(collection.id, after)
+        res = self.app_get_json_ld(endpoint)
+        data = json.loads(res.data.decode('utf8'))
+        assert_equal([item['id'] for item in data['items']], [
+            url_for('api.annotations', collection_id=collection.id,
+                    annotation_id=anno.id)
+            for anno in annotations[per_page:]
+        ])
+        assert_not_in('next', data)
+        assert_in('prev', data)
+
+    @with_context
+    def test_404_when_cursor_page_does_not_exist(self):
+        """Test 404 when AnnotationPage after a cursor does not exist."""
+        collection = CollectionFactory()
+        annotation = AnnotationFactory(collection=collection)
+        after = self.api_base._encode_cursor(annotation)
+
+        endpoint = u'/annotations/{0}/?after={1}'.format(collection.id, after)
+        res = self.app_get_json_ld(endpoint)
+        assert_equal(res.status_code, 404, res.data)
+
+    @with_context
+    def test_400_with_invalid_cursor(self):
+        """Test 400 when a cursor is invalid."""
+        collection = CollectionFactory()
+        AnnotationFactory(collection=collection)
+
+        for cursor in ['foo', 'WyJmb28iXQ', 'WyJmb28iLCAiYmFyIl0']:
+            endpoint = u'/annotations/{0}/?after={1}'.format(collection.id,
+                                                             cursor)
+            res = self.app_get_json_ld(endpoint)
+            assert_equal(res.status_code, 400, res.data)
+
+    @with_context
+    def test_page_queries_independent_of_page_size(self):
+        """Test AnnotationPage queries do not grow with the page size."""
+        collection = CollectionFactory()
+        AnnotationFactory(collection=collection)
+        endpoint = u'/annotations/{}/'.format(collection.id)
+        db.session.expunge_all()
+        with QueryCounter() as single:
+            self.app_get_json_ld(endpoint)
+
+        per_page = current_app.config.get('ANNOTATIONS_PER_PAGE')
+        AnnotationFactory.create_batch(per_page - 1, collection=collection)
+        db.session.expunge_all()
+        with QueryCounter() as full:
+            res = self.app_get_json_ld(endpoint)
+
+        data = json.loads(res.data.decode('utf8'))
+        assert_equal(len(data['first']['items']), per_page)
+        assert_equal(single.count, full.count)
+
+    @with_context
+    def test_page_items_streamed(self):
+        """Test AnnotationPage items are dictized as the response is sent."""
+        collection = CollectionFactory()
+        AnnotationFactory.create_batch(3, collection=collection)
+        endpoint = u'/annotations/{}/'.format(collection.id)
+        res = self.app_get_json_ld(endpoint)
+        expected = json.loads(res.data.decode('utf8'))
+        dictize = Annotation.dictize
+        with patch.object(StreamedItems, 'batch_size', 2), \
+                patch.object(Annotation, 'dictize', autospec=True,
+                             side_effect=dictize) as mock_dictize, \
+                self.flask_app.test_request_context(endpoint):
+            response = CollectionsAPI().get(collection.id)
+            assert_equal(response.is_streamed, True)
+            assert_equal(mock_dictize.call_count, 0)
+            data = json.loads(response.get_data().decode('utf8'))
+            assert_equal(mock_dictize.call_count, 3)
+        assert_equal(data, expected)
+
+    @with_context
+    def test_cursor_pages_streamed_in_batches(self):
+        """Test AnnotationPages linked by cursors are streamed in batches."""
+        collection = CollectionFactory()
+        annotations = AnnotationFactory.create_batch(7, collection=collection)
+        iris = [anno.iri for anno in annotations]
+        endpoint = u'/annotations/{}/'.format(collection.id)
+        with patch.object(StreamedItems, 'batch_size', 2):
+            res = self.app_get_json_ld(endpoint + '?iris=1')
+            page = json.loads(res.data.decode('utf8'))['first']
+            pages = [page]
+            while 'next' in page:
+                res = self.app_get_json_ld(page['next'])
+                page = json.loads(res.data.decode('utf8'))
+                pages.append(page)
+            res = self.app_get_json_ld(page['prev'])
+            prev_page = json.loads(res.data.decode('utf8'))
+        assert_equal([len(page['items']) for page in pages], [3, 3, 1])
+        assert_equal(sum([page['items'] for page in pages], []), iris)
+        assert_equal(prev_page['items'], iris[3:6])
+
     @with_context
     def test_404_when_page_does_not_exist(self):
         """Test 404 when AnnotationPage does not exist."""
@@ -571,7 +742,7 @@ class TestCollectionsAPI(Test):
         assert_equal(res.status_code, 404, res.data)
 
     @with_context
-    @patch('explicates.api.base.validate_json')
+    @patch('explicates.api.base.validator.validate')
     def test_collection_validated_before_create(self, mock_validate):
         """Test Collection validated before creation."""
         endpoint = '/annotations/'
@@ -579,15 +750,12 @@ class TestCollectionsAPI(Test):
         mock_validate.side_effect = ValidationError('Bad Data')
         res = self.app_post_json_ld(endpoint, data=bad_data)
         assert_equal(res.status_code, 400, res.data)
-        schema_path = os.path.join(current_app.root_path, 'schemas',
-                                   'collection.json')
-        schema = json.load(open(schema_path))
-        mock_validate.assert_called_once_with(bad_data, schema)
+        mock_validate.assert_called_once_with(bad_data, Collection)
         collections = repo.filter_by(Annotation)
         assert_equal(len(collections), 0)
 
     @with_context
-    @patch('explicates.api.base.validate_json')
+    @patch('explicates.api.base.validator.validate')
     def test_collection_validated_before_update(self, mock_validate):
         """Test Collection validated before update."""
         collection = CollectionFactory()
@@ -596,10 +764,7 @@ class TestCollectionsAPI(Test):
         mock_validate.side_effect = ValidationError('Bad Data')
         res = self.app_put_json_ld(endpoint, data=bad_data)
         assert_equal(res.status_code, 400, res.data)
-        schema_path = os.path.join(current_app.root_path, 'schemas',
-                                   'collection.json')
-        schema = json.load(open(schema_path))
-        mock_validate.assert_called_once_with(bad_data, schema)
+        mock_validate.assert_called_once_with(bad_data, Collection)
         assert_not_equal(collection._data, bad_data)
 
     @with_context
@@ -641,3 +806,76 @@ class TestCollectionsAPI(Test):
         res = self.app_get_json_ld(endpoint)
         data = json.loads(res.data.decode('utf8'))
         assert_dict_equal(data, expected)
+
+    @with_context
+    def test_collection_etag_is_stable(self):
+        """Test container ETag only changes with the Collection."""
+        collection = CollectionFactory()
+        AnnotationFactory(collection=collection)
+        endpoint = u'/annotations/{}/'.format(collection.id)
+        with freeze_time("1984-11-19"):
+            etag = self.app_get_json_ld(endpoint).headers.get('ETag')
+        with freeze_time("1984-11-20"):
+            res = self.app_get_json_ld(endpoint)
+        assert_equal(res.headers.get('ETag'), etag)
+
+        res = self.app_get_json_ld(endpoint + '?page=0')
+        assert_not_equal(res.headers.get('ETag'), etag)
+
+        AnnotationFactory(collection=collection)
+        res = self.app_get_json_ld(endpoint)
+        assert_not_equal(res.headers.get('ETag'), etag)
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_collection_etag_changes_with_annotations(self):
+        """Test container ETag changes when an Annotation is modified."""
+        collection = CollectionFactory()
+        annotation = AnnotationFactory(collection=collection)
+        endpoint = u'/annotations/{}/'.format(collection.id)
+        etag = self.app_get_json_ld(endpoint).headers.get('ETag')
+
+        anno_endpoint = u'/annotations/{}/{}/'.format(collection.id,
+                                                      annotation.id)
+        data = dict(annotation.data, body='foo')
+        self.app_put_json_ld(anno_endpoint, data=data)
+        headers = {'If-None-Match': etag}
+        res = self.app_get_json_ld(endpoint, headers=headers)
+        assert_equal(res.status_code, 200, res.data)
+        assert_not_equal(res.headers.get('ETag'), etag)
+
+    @with_context
+    def test_collection_not_modified(self):
+        """Test 304 returned for a current container without querying it."""
+        collection = CollectionFactory()
+        AnnotationFactory(collection=collection)
+        endpoint = u'/annotations/{}/'.format(collection.id)
+        etag = self.app_get_json_ld(endpoint).headers.get('ETag')
+
+        db.session.expunge_all()
+        headers = {'If-None-Match': etag}
+        with QueryCounter() as counter:
+            res = self.app_get_json_ld(endpoint, headers=headers)
+        assert_equal(res.status_code, 304, res.data)
+        assert_equal(counter.count, 1)
+
+    @with_context
+    def test_collection_pages_use_index(self):
+        """Test Collection pages are read in order from the index."""
+        collection = CollectionFactory()
+        AnnotationFactory.create_batch(3, collection=collection)
+        db.session.execute('SET enable_seqscan = off')
+        api = CollectionsAPI()
+        items = api._get_items(collection)
+        sort_key = tuple_(Annotation.created, Annotation.key)
+        cursor = tuple_('1984-11-19T00:00:00Z', 1)
+        queries = [
+            items.limit(3),
+            items.filter(sort_key > cursor).limit(3)
+        ]
+        for query in queries:
+            plan = db.session.execute(Explain(query.statement)).scalar()
+            plan = json.dumps(plan)
+            assert_in('idx_annotation_collection', plan)
+            assert_not_in('"Sort"', plan)
+        db.session.rollback()
@@ -1,12 +1,21 @@
 # -*- coding: utf8 -*-
 
+import io
+import os
 import json
+import shutil
+import zipfile
+import tempfile
+from mock import patch
 from nose.tools import *
 from freezegun import freeze_time
 from base import Test, with_context
-from factories import AnnotationFactory
+from factories import CollectionFactory, AnnotationFactory
 from flask import current_app, url_for
 
+from explicates.core import exporter
+from explicates.cache import FileCache
+
 
 class TestExportAPI(Test):
 
@@ -58,3 +67,157 @@ class TestExportAPI(Test):
         assert_equal(res.headers['Content-Type'], 'application/zip')
         content_disposition = 'attachment; filename=collection1.zip'
         assert_equal(res.headers['Content-Disposition'], content_disposition)
+        zip_file = zipfile.ZipFile(io.BytesIO(res.data))
+        content = zip_file.read('collection1.json').decode('utf8')
+        assert_equal(json.loads(content)[0]['id'], annotation.iri)
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_collection_exported_as_ndjson(self):
+        """Test Collection exported as newline-delimited JSON."""
+        collection = CollectionFactory()
+        AnnotationFactory.create_batch(3, collection=collection)
+        endpoint = u'/export/{}/'.format(collection.id)
+        res = self.app.get(endpoint)
+        expected = json.loads(res.data.decode('utf8'))
+        headers = {'Accept': 'application/x-ndjson'}
+        res = self.app.get(endpoint, headers=headers)
+        assert_equal(res.status_code, 200, res.data)
+        assert_equal(res.mimetype, 'application/x-ndjson')
+        lines = res.data.decode('utf8').split('\n')
+        assert_equal(lines[-1], '')
+        assert_equal([json.loads(line) for line in lines[:-1]], expected)
+
+    @with_context
+    def test_export_varies_on_accept(self):
+        """Test exports in each format vary on Accept, with common headers."""
+        collection = CollectionFactory()
+        AnnotationFactory(collection=collection)
+        endpoint = u'/export/{}/'.format(collection.id)
+        cache_dir = tempfile.mkdtemp()
+        try:
+            # Requested twice, to be served from the cache the second time
+            requests = [(accept, query)
+                        for accept in ['application/ld+json',
+                                       'application/x-ndjson']
+                        for query in ['', '?zip=1']] * 2
+            with patch.object(exporter, 'cache', FileCache(cache_dir, 1e6)):
+                for accept, query in requests:
+                    res = self.app.get(endpoint + query,
+                                       headers={'Accept': accept})
+                    assert_equal(res.status_code, 200, res.data)
+                    assert_in('Accept', res.vary)
+                    assert_equal(res.headers['Allow'], 'GET,OPTIONS,HEAD')
+            assert_equal(len(os.listdir(cache_dir)), 4)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    @with_context
+    def test_collection_exported_as_zipped_ndjson(self):
+        """Test Collection exported as zipped newline-delimited JSON."""
+        annotation = AnnotationFactory()
+        endpoint = u'/export/{}/?zip=1'.format(annotation.collection.id)
+        headers = {'Accept': 'application/x-ndjson'}
+        res = self.app.get(endpoint, headers=headers)
+        assert_equal(res.headers['Content-Type'], 'application/zip')
+        zip_file = zipfile.ZipFile(io.BytesIO(res.data))
+        assert_equal(zip_file.namelist(), ['collection1.ndjson'])
+        content = zip_file.read('collection1.ndjson').decode('utf8')
+        assert_equal(json.loads(content)['id'], annotation.iri)
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_cached_export_served_from_disk(self):
+        """Test an unchanged Collection is exported from the cache."""
+        collection = CollectionFactory()
+        AnnotationFactory.create_batch(3, collection=collection)
+        endpoint = u'/export/{}/'.format(collection.id)
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with patch.object(exporter, 'cache', FileCache(cache_dir, 1e6)):
+                res = self.app.get(endpoint)
+                assert_equal(res.status_code, 200, res.data)
+                assert_not_in('Content-Length', res.headers)
+                assert_equal(len(os.listdir(cache_dir)), 1)
+
+                with patch.object(exporter, 'generate_data') as mock_gen:
+                    cached_res = self.app.get(endpoint)
+                    assert_equal(mock_gen.call_count, 0)
+                assert_equal(cached_res.status_code, 200)
+                assert_equal(cached_res.mimetype, 'application/ld+json')
+                assert_equal(cached_res.data, res.data)
+                assert_equal(cached_res.headers['Content-Length'],
+                             str(len(res.data)))
+                assert_equal(cached_res.headers['Accept-Ranges'], 'bytes')
+
+                headers = {'Range': 'bytes=0-9'}
+                range_res = self.app.get(endpoint, headers=headers)
+                assert_equal(range_res.status_code, 206)
+                assert_equal(range_res.data, res.data[:10])
+        finally:
+            shutil.rmtree(cache_dir)
+
+    @with_context
+    def test_cached_export_updated_with_collection(self):
+        """Test the cached export is replaced when the Collection changes."""
+        collection = CollectionFactory()
+        AnnotationFactory(collection=collection)
+        endpoint = u'/export/{}/'.format(collection.id)
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with patch.object(exporter, 'cache', FileCache(cache_dir, 1e6)):
+                self.app.get(endpoint)
+                old_files = os.listdir(cache_dir)
+                AnnotationFactory(collection=collection)
+                res = self.app.get(endpoint)
+                assert_equal(len(json.loads(res.data.decode('utf8'))), 2)
+                cached_res = self.app.get(endpoint)
+                assert_equal(cached_res.data, res.data)
+                new_files = os.listdir(cache_dir)
+                assert_equal(len(new_files), 1)
+                assert_not_equal(new_files, old_files)
+        finally:
+            shutil.rmtree(cache_dir)
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_cached_export_updated_within_the_same_second(self):
+        """Test the cached export is replaced when an Annotation is updated."""
+        collection = CollectionFactory()
+        annotation = AnnotationFactory(collection=collection)
+        endpoint = u'/export/{}/'.format(collection.id)
+        anno_endpoint = u'/annotations/{}/{}/'.format(collection.id,
+                                                      annotation.id)
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with patch.object(exporter, 'cache', FileCache(cache_dir, 1e6)):
+                self.app.get(endpoint)
+                data = dict(annotation.data, body='foo')
+                self.app_put_json_ld(anno_endpoint, data=data)
+                self.app.get(endpoint)
+                res = self.app.get(endpoint)
+                exported = json.loads(res.data.decode('utf8'))
+                assert_equal(exported[0]['body'], 'foo')
+        finally:
+            shutil.rmtree(cache_dir)
+
+    @with_context
+    def test_cached_zip_export(self):
+        """Test a Collection exported as zip from the cache."""
+        annotation = AnnotationFactory()
+        endpoint = u'/export/{}/?zip=1'.format(annotation.collection.id)
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with patch.object(exporter, 'cache', FileCache(cache_dir, 1e6)):
+                data = self.app.get(endpoint).data
+                cached_res = self.app.get(endpoint)
+                assert_equal(cached_res.data, data)
+        finally:
+            shutil.rmtree(cache_dir)
+        assert_equal(cached_res.headers['Content-Type'], 'application/zip')
+        content_disposition = 'attachment; filename=collection1.zip'
+        assert_equal(cached_res.headers['Content-Disposition'],
+                     content_disposition)
+        zip_file = zipfile.ZipFile(io.BytesIO(cached_res.data))
+        content = zip_file.read('collection1.json').decode('utf8')
+        assert_equal(json.loads(content)[0]['id'], annotation.iri)
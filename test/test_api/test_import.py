@@ -0,0 +1,142 @@
+# -*- coding: utf8 -*-
+
+import io
+import json
+import zipfile
+import tempfile
+from nose.tools import *
+from mock import patch
+from freezegun import freeze_time
+from base import Test, with_context
+from factories import CollectionFactory, AnnotationFactory
+
+from explicates.core import repo
+from explicates.model.annotation import Annotation
+
+
+class TestImportAPI(Test):
+
+    def setUp(self):
+        super(TestImportAPI, self).setUp()
+        self.data = [
+            {'id': 'http://example.org/anno1', 'body': 'foo', 'target': 'a'},
+            {'body': 'bar', 'target': 'b'}
+        ]
+
+    def post(self, collection_id, data, content_type):
+        endpoint = u'/import/{}/'.format(collection_id)
+        return self.app.post(endpoint, data=data, content_type=content_type)
+
+    def get_imported_data(self):
+        annotations = repo.filter_by(Annotation)
+        return [dict(anno.data, id=anno.id) for anno in annotations]
+
+    @with_context
+    def test_404_importing_into_unknown_collection(self):
+        """Test 404 importing into an unknown Collection."""
+        res = self.post('foo', json.dumps(self.data), 'application/json')
+        assert_equal(res.status_code, 404, res.data)
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_import_json(self):
+        """Test Annotations imported from JSON."""
+        collection = CollectionFactory()
+        res = self.post(collection.id, json.dumps(self.data),
+                        'application/ld+json')
+        assert_equal(res.status_code, 200, res.data)
+        data = json.loads(res.data.decode('utf8'))
+        assert_equal(data['id'], collection.iri)
+        assert_equal(data['total'], 2)
+        assert_equal(data['modified'], '1984-11-19T00:00:00Z')
+        imported = self.get_imported_data()
+        assert_equal(imported[0], dict(self.data[0], id='anno1'))
+        assert_equal(imported[1]['body'], 'bar')
+
+    @with_context
+    def test_import_ndjson(self):
+        """Test Annotations imported from newline-delimited JSON."""
+        collection = CollectionFactory()
+        ndjson = '\n'.join(json.dumps(anno) for anno in self.data)
+        res = self.post(collection.id, ndjson, 'application/x-ndjson')
+        assert_equal(res.status_code, 200, res.data)
+        assert_equal(len(self.get_imported_data()), 2)
+
+    @with_context
+    def test_import_zip(self):
+        """Test Annotations imported from a ZIP file."""
+        collection = CollectionFactory()
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+            zip_file.writestr('export.json', json.dumps(self.data))
+        res = self.post(collection.id, zip_buffer.getvalue(),
+                        'application/zip')
+        assert_equal(res.status_code, 200, res.data)
+        data = json.loads(res.data.decode('utf8'))
+        assert_equal(data['total'], 2)
+
+    @with_context
+    def test_only_zip_files_spooled(self):
+        """Test only ZIP files are copied to a temporary file."""
+        collection = CollectionFactory()
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
+            zip_file.writestr('export.ndjson', json.dumps(self.data[1]))
+        uploads = [
+            (json.dumps([self.data[1]]), 'application/json', 0),
+            (json.dumps(self.data[1]), 'application/x-ndjson', 0),
+            (zip_buffer.getvalue(), 'application/zip', 1)
+        ]
+        target = 'explicates.api.imports.tempfile.TemporaryFile'
+        for data, content_type, n_files in uploads:
+            with patch(target, wraps=tempfile.TemporaryFile) as mock_tmp:
+                res = self.post(collection.id, data, content_type)
+            assert_equal(res.status_code, 200, res.data)
+            assert_equal(mock_tmp.call_count, n_files)
+        assert_equal(len(self.get_imported_data()), 3)
+
+    @with_context
+    def test_400_importing_invalid_data(self):
+        """Test 400 importing invalid data."""
+        collection = CollectionFactory()
+        invalid = [
+            ('{"body": "foo"}', 'application/json'),
+            (json.dumps(self.data + [{'body': 'foo'}]), 'application/json'),
+            ('{"body": ', 'application/x-ndjson'),
+            (json.dumps([dict(self.data[1], created='yesterday')]),
+             'application/json'),
+            (json.dumps([dict(self.data[1], modified=1445000000)]),
+             'application/json'),
+            ('foo', 'application/zip')
+        ]
+        for data, content_type in invalid:
+            res = self.post(collection.id, data, content_type)
+            assert_equal(res.status_code, 400, res.data)
+        assert_equal(repo.filter_by(Annotation), [])
+
+    @with_context
+    def test_import_normalises_timestamps(self):
+        """Test imported timestamps normalised so Annotations can be read."""
+        collection = CollectionFactory()
+        data = dict(self.data[0], created='2015-10-13T13:00:00.000Z',
+                    modified='2015-10-13T15:30:00.5+02:00')
+        res = self.post(collection.id, json.dumps([data]), 'application/json')
+        assert_equal(res.status_code, 200, res.data)
+        endpoint = u'/annotations/{}/anno1/'.format(collection.id)
+        res = self.app_get_json_ld(endpoint)
+        assert_equal(res.status_code, 200, res.data)
+        anno = json.loads(res.data.decode('utf8'))
+        assert_equal(anno['created'], '2015-10-13T13:00:00Z')
+        assert_equal(anno['modified'], '2015-10-13T13:30:00Z')
+        assert_equal(res.headers.get('Last-Modified'),
+                     'Tue, 13 Oct 2015 13:30:00 GMT')
+
+    @with_context
+    def test_400_importing_existing_ids(self):
+        """Test 400 importing Annotations with existing IDs."""
+        collection = CollectionFactory()
+        AnnotationFactory(id='anno1')
+        res = self.post(collection.id, json.dumps(self.data),
+                        'application/json')
+        assert_equal(res.status_code, 400, res.data)
+        assert_equal(len(repo.filter_by(Annotation)), 1)
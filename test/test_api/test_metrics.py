@@ -0,0 +1,101 @@
+# -*- coding: utf8 -*-
+
+import json
+from nose.tools import *
+from base import Test, with_context
+from factories import CollectionFactory, AnnotationFactory
+
+from explicates.core import metrics
+
+
+class TestMetricsAPI(Test):
+
+    def setUp(self):
+        super(TestMetricsAPI, self).setUp()
+        metrics.enable(self.flask_app)
+
+    def tearDown(self):
+        metrics.disable()
+        super(TestMetricsAPI, self).tearDown()
+
+    def get_sample_value(self, name, **labels):
+        return metrics.registry.get_sample_value(name, labels) or 0
+
+    @with_context
+    def test_404_when_disabled(self):
+        """Test 404 getting metrics when disabled."""
+        metrics.disable()
+        res = self.app.get('/metrics')
+        assert_equal(res.status_code, 404, res.data)
+
+    @with_context
+    def test_get_metrics(self):
+        """Test metrics returned in the Prometheus text format."""
+        collection = CollectionFactory()
+        self.app.get(u'/annotations/{}/'.format(collection.id))
+        res = self.app.get('/metrics')
+        assert_equal(res.status_code, 200, res.data)
+        assert_equal(res.headers['Content-Type'],
+                     'text/plain; version=0.0.4; charset=utf-8')
+        out = res.data.decode('utf8')
+        assert_in('explicates_requests_total{endpoint="api.collections",'
+                  'method="GET",status="200"}', out)
+        assert_in('explicates_request_duration_seconds_bucket{'
+                  'endpoint="api.collections",le="0.005",method="GET"}', out)
+
+    @with_context
+    def test_export_bytes_counted(self):
+        """Test the bytes of each export format counted."""
+        collection = CollectionFactory()
+        AnnotationFactory.create_batch(3, collection=collection)
+        for query, fmt in [('', 'json'), ('?zip=1', 'zip')]:
+            labels = dict(format=fmt, source='database')
+            count = self.get_sample_value('explicates_export_bytes_total',
+                                          **labels)
+            endpoint = u'/export/{0}/{1}'.format(collection.id, query)
+            res = self.app.get(endpoint)
+            assert_equal(res.status_code, 200, res.data)
+            assert_equal(self.get_sample_value('explicates_export_bytes_total',
+                                               **labels),
+                         count + len(res.data))
+
+    @with_context
+    def test_batch_sizes_observed(self):
+        """Test the sizes of batch operations observed."""
+        collection = CollectionFactory()
+        create_sum = self.get_sample_value('explicates_batch_size_sum',
+                                           operation='create')
+        delete_sum = self.get_sample_value('explicates_batch_size_sum',
+                                           operation='delete')
+        data = [{'body': 'foo', 'target': 'bar'}] * 3
+        endpoint = u'/batch/?collection={}'.format(collection.iri)
+        res = self.app.post(endpoint, data=json.dumps(data),
+                            content_type='application/json')
+        assert_equal(res.status_code, 201, res.data)
+        items = json.loads(res.data.decode('utf8'))['items']
+        res = self.app.delete('/batch/',
+                              data=json.dumps([{'id': items[0]}]),
+                              content_type='application/json')
+        assert_equal(res.status_code, 204, res.data)
+        assert_equal(self.get_sample_value('explicates_batch_size_sum',
+                                           operation='create'),
+                     create_sum + 3)
+        assert_equal(self.get_sample_value('explicates_batch_size_sum',
+                                           operation='delete'),
+                     delete_sum + 1)
+
+    @with_context
+    def test_import_size_observed(self):
+        """Test the number of Annotations imported observed."""
+        collection = CollectionFactory()
+        labels = dict(operation='import')
+        count = self.get_sample_value('explicates_batch_size_count', **labels)
+        data = [{'body': 'foo', 'target': 'bar'}] * 2
+        endpoint = u'/import/{}/'.format(collection.id)
+        res = self.app.post(endpoint, data=json.dumps(data),
+                            content_type='application/json')
+        assert_equal(res.status_code, 200, res.data)
+        assert_equal(self.get_sample_value('explicates_batch_size_count',
+                                           **labels), count + 1)
+        assert_equal(self.get_sample_value('explicates_batch_size_bucket',
+                                           le='10.0', **labels), count + 1)
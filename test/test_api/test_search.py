@@ -2,11 +2,14 @@
 
 import json
 from nose.tools import *
+from mock import patch
 from freezegun import freeze_time
-from base import Test, with_context
+from base import Test, QueryCounter, db, with_context
 from factories import CollectionFactory, AnnotationFactory
 from flask import current_app, url_for
 
+from explicates.api.search import SearchAPI
+
 
 class TestSearchAPI(Test):
 
@@ -70,3 +73,118 @@ class TestSearchAPI(Test):
         }
         res = self.app_get_json_ld(endpoint, data=query)
         assert_equal(res.status_code, 400, res.data)
+
+    @with_context
+    def test_search_with_invalid_order_by(self):
+        """Test search with an invalid order_by when there are results."""
+        AnnotationFactory.create_batch(2)
+        for order_by in ['foo', 'iri']:
+            for query in [{'order_by': order_by},
+                          {'order_by': order_by, 'page': 0}]:
+                res = self.app.get('/search/', query_string=query)
+                assert_equal(res.status_code, 400, res.data)
+
+    @with_context
+    def test_search_page(self):
+        """Test search AnnotationPage."""
+        per_page = current_app.config.get('ANNOTATIONS_PER_PAGE')
+        annotations = AnnotationFactory.create_batch(per_page * 2 + 1)
+        endpoint = '/search/?page=1&iris=1'
+        res = self.app_get_json_ld(endpoint)
+        data = json.loads(res.data.decode('utf8'))
+        assert_equal(data['partOf']['total'], len(annotations))
+        assert_equal(data['items'], [
+            url_for('api.annotations', collection_id=anno.collection.id,
+                    annotation_id=anno.id)
+            for anno in annotations[per_page:per_page * 2]
+        ])
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_search_pages_with_equal_created(self):
+        """Test search AnnotationPages stable when created at the same time."""
+        per_page = current_app.config.get('ANNOTATIONS_PER_PAGE')
+        annotations = AnnotationFactory.create_batch(per_page * 5 + 1)
+        iris = []
+        for page in range(6):
+            endpoint = '/search/?page={}&iris=1'.format(page)
+            res = self.app_get_json_ld(endpoint)
+            assert_equal(res.status_code, 200, res.data)
+            iris += json.loads(res.data.decode('utf8'))['items']
+        assert_equal(iris, [
+            url_for('api.annotations', collection_id=anno.collection.id,
+                    annotation_id=anno.id)
+            for anno in annotations
+        ])
+
+    @with_context
+    def test_search_with_no_results(self):
+        """Test search with no results."""
+        endpoint = '/search/'
+        res = self.app_get_json_ld(endpoint)
+        data = json.loads(res.data.decode('utf8'))
+        assert_equal(data['total'], 0)
+        assert_not_in('first', data)
+
+    @with_context
+    def test_search_page_queries_independent_of_collections(self):
+        """Test search AnnotationPage queries do not grow per Collection."""
+        AnnotationFactory()
+        db.session.expunge_all()
+        with QueryCounter() as single:
+            self.app_get_json_ld('/search/')
+
+        AnnotationFactory.create_batch(2)
+        db.session.expunge_all()
+        with QueryCounter() as multiple:
+            res = self.app_get_json_ld('/search/')
+
+        data = json.loads(res.data.decode('utf8'))
+        assert_equal(len(data['first']['items']), 3)
+        assert_equal(single.count, multiple.count)
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_search_as_ndjson(self):
+        """Test search results streamed as newline-delimited JSON."""
+        endpoint = '/search/'
+        annotations = AnnotationFactory.create_batch(5)
+        query = {'order_by': 'key'}
+        headers = {'Accept': 'application/x-ndjson'}
+        for chunk_size in [2, 5]:
+            with patch.object(SearchAPI, 'chunk_size', chunk_size):
+                res = self.app.get(endpoint, query_string=query,
+                                   headers=headers)
+            assert_equal(res.status_code, 200, res.data)
+            assert_equal(res.mimetype, 'application/x-ndjson')
+            lines = res.data.decode('utf8').split('\n')
+            assert_equal(lines[-1], '')
+            assert_equal([json.loads(line) for line in lines[:-1]],
+                         [anno.dictize() for anno in annotations])
+
+    @with_context
+    def test_search_varies_on_accept(self):
+        """Test search results in each format vary on Accept."""
+        AnnotationFactory()
+        for accept in ['application/ld+json', 'application/x-ndjson']:
+            res = self.app.get('/search/', headers={'Accept': accept})
+            assert_equal(res.status_code, 200, res.data)
+            assert_in('Accept', res.vary)
+
+    @with_context
+    def test_search_as_ndjson_with_no_results(self):
+        """Test search with no results as newline-delimited JSON."""
+        endpoint = '/search/'
+        headers = {'Accept': 'application/x-ndjson'}
+        res = self.app.get(endpoint, headers=headers)
+        assert_equal(res.status_code, 200, res.data)
+        assert_equal(res.data, b'')
+
+    @with_context
+    def test_search_as_ndjson_with_bad_query(self):
+        """Test search with bad query as newline-delimited JSON."""
+        endpoint = '/search/'
+        headers = {'Accept': 'application/x-ndjson'}
+        query = {'order_by': 'foo'}
+        res = self.app.get(endpoint, query_string=query, headers=headers)
+        assert_equal(res.status_code, 400, res.data)
@@ -0,0 +1,62 @@
+# -*- coding: utf8 -*-
+
+import os
+import time
+import shutil
+import tempfile
+from nose.tools import *
+
+from explicates.cache import FileCache
+
+
+class TestFileCache(object):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = FileCache(self.cache_dir, 10)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def write(self, name, version, chunks):
+        return b''.join(self.cache.write(name, version, chunks))
+
+    def test_file_cached_when_complete(self):
+        """Test a file is cached once all chunks are written."""
+        assert_equal(self.cache.get('foo', '1'), None)
+        data = self.write('foo', '1', [b'abc', b'def'])
+        assert_equal(data, b'abcdef')
+        path = self.cache.get('foo', '1')
+        with open(path, 'rb') as f:
+            assert_equal(f.read(), b'abcdef')
+
+    def test_incomplete_file_not_cached(self):
+        """Test a file is not cached if writing stops early."""
+        chunks = self.cache.write('foo', '1', [b'abc', b'def'])
+        next(chunks)
+        chunks.close()
+        assert_equal(self.cache.get('foo', '1'), None)
+        assert_equal(os.listdir(self.cache_dir), [])
+
+    def test_old_versions_removed(self):
+        """Test only the latest version of a file is kept."""
+        self.write('foo', '1', [b'a'])
+        self.write('bar', '1', [b'b'])
+        self.write('foo', '2', [b'c'])
+        assert_equal(self.cache.get('foo', '1'), None)
+        assert_not_equal(self.cache.get('foo', '2'), None)
+        assert_not_equal(self.cache.get('bar', '1'), None)
+        assert_equal(len(os.listdir(self.cache_dir)), 2)
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used files are evicted first."""
+        self.write('foo', '1', [b'abcd'])
+        self.write('bar', '1', [b'abcd'])
+        past = time.time() - 60
+        for name in ['foo', 'bar']:
+            os.utime(self.cache.get(name, '1'), (past, past))
+        self.cache.get('foo', '1')
+        self.write('baz', '1', [b'abcd'])
+        assert_not_equal(self.cache.get('foo', '1'), None)
+        assert_equal(self.cache.get('bar', '1'), None)
+        assert_not_equal(self.cache.get('baz', '1'), None)
@@ -0,0 +1,59 @@
+# -*- coding: utf8 -*-
+
+import json
+import importlib
+from mock import patch
+from nose.tools import *
+
+from explicates.encoder import JSONEncoder
+
+
+class TestJSONEncoder(object):
+
+    def setUp(self):
+        self.data = {
+            'type': 'Annotation',
+            'body': {
+                'value': u'Ça va? "quoted" </script>',
+                'rating': 2.5
+            },
+            'target': ['http://example.org/1', None, True]
+        }
+
+    def test_default_backend_output(self):
+        """Test the default backend encodes the same data."""
+        encoder = JSONEncoder()
+        assert_in(encoder.backend, JSONEncoder.backends)
+        assert_equal(json.loads(encoder.dumps(self.data)), self.data)
+
+    def test_stdlib_backend_output(self):
+        """Test the standard library backend encodes compact JSON."""
+        encoder = JSONEncoder('json')
+        assert_equal(encoder.backend, 'json')
+        out = encoder.dumps({'b': [1, 2], 'a': u'é/'})
+        assert_equal(out, '{"b":[1,2],"a":"\\u00e9/"}')
+
+    def test_falls_back_to_stdlib(self):
+        """Test the standard library is used if nothing else is installed."""
+        import_module = importlib.import_module
+
+        def fake_import(name):
+            if name != 'json':
+                raise ImportError(name)
+            return import_module(name)
+
+        with patch('explicates.encoder.importlib.import_module',
+                   side_effect=fake_import):
+            encoder = JSONEncoder()
+        assert_equal(encoder.backend, 'json')
+        assert_equal(json.loads(encoder.dumps(self.data)), self.data)
+
+    @patch('explicates.encoder.importlib.import_module',
+           side_effect=ImportError)
+    def test_configured_backend_not_installed(self, mock_import):
+        """Test ImportError raised if the configured backend is missing."""
+        assert_raises(ImportError, JSONEncoder, 'ujson')
+
+    def test_unsupported_backend(self):
+        """Test ValueError raised for an unsupported backend."""
+        assert_raises(ValueError, JSONEncoder, 'foo')
@@ -0,0 +1,221 @@
+# -*- coding: utf8 -*-
+
+import json
+from nose.tools import *
+from freezegun import freeze_time
+from base import Test, db, with_context
+from factories import CollectionFactory, AnnotationFactory
+
+from explicates.core import repo, json_encoder
+from explicates.exporter import Exporter, PartitionExport
+from explicates.model.annotation import Annotation
+
+
+class TestExporter(Test):
+
+    def setUp(self):
+        super(TestExporter, self).setUp()
+        self.exporter = Exporter()
+
+    def export(self, collection):
+        return ''.join(self.exporter.generate_data(collection.id))
+
+    def dump_orm(self, collection):
+        """Return the export as previously generated from ORM objects."""
+        rows = self.exporter._stream_annotation_data(collection)
+        annotations = [repo.get_by(Annotation, id=row['id']) for row in rows]
+        return '[' + ', '.join(json_encoder.dumps(anno.dictize())
+                               for anno in annotations) + ']'
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_output_matches_dictize(self):
+        """Test the exported JSON matches that of dictized Annotations."""
+        collection = CollectionFactory()
+        annotations = [
+            AnnotationFactory(collection=collection),
+            AnnotationFactory(collection=collection, id=u'ünïcode id/1',
+                              data={
+                                  'type': 'Annotation',
+                                  'body': {
+                                      'type': 'TextualBody',
+                                      'value': u'Ça va? "quoted"',
+                                      'language': 'fr'
+                                  },
+                                  'target': ['http://example.org/1', 2.5],
+                                  'via': 'http://example.org/anno1'
+                              }),
+            AnnotationFactory(collection=collection, data={
+                'type': 'Annotation',
+                'body': 'foo',
+                'target': 'bar',
+                'created': '2000-01-01T00:00:00Z',
+                'generator': 'http://example.org/other'
+            })
+        ]
+        annotations[0].data = {'body': 'baz', 'target': 'qux'}
+        repo.update(Annotation, annotations[0])
+        db.session.expire_all()
+        assert_equal(self.export(collection), self.dump_orm(collection))
+
+    @with_context
+    def test_output_without_generator(self):
+        """Test the exported JSON matches without a default generator."""
+        collection = CollectionFactory()
+        annotation = AnnotationFactory(collection=collection)
+        generator = self.flask_app.config.pop('GENERATOR')
+        try:
+            with freeze_time('1984-11-19'):
+                assert_equal(self.export(collection),
+                             self.dump_orm(collection))
+        finally:
+            self.flask_app.config['GENERATOR'] = generator
+
+    @with_context
+    def test_deleted_annotations_not_exported(self):
+        """Test deleted Annotations are not exported."""
+        collection = CollectionFactory()
+        annotation = AnnotationFactory(collection=collection)
+        AnnotationFactory(collection=collection, deleted=True)
+        AnnotationFactory()
+        data = json.loads(self.export(collection))
+        assert_equal([anno['id'] for anno in data], [annotation.iri])
+
+    @with_context
+    def test_output_generated_in_chunks(self):
+        """Test the exported JSON is valid when generated in chunks."""
+        collection = CollectionFactory()
+        AnnotationFactory.create_batch(5, collection=collection)
+        for n in range(0, 7):
+            self.exporter.chunk_size = n + 1
+            data = json.loads(self.export(collection))
+            assert_equal(len(data), 5)
+        empty = CollectionFactory()
+        assert_equal(self.export(empty), '[]')
+
+    @with_context
+    @freeze_time("1984-11-19")
+    def test_server_side_json_matches_output(self):
+        """Test JSON built by the database matches the default output."""
+        collection = CollectionFactory()
+        AnnotationFactory(collection=collection)
+        AnnotationFactory(collection=collection, id=u'ünïcode id/1', data={
+            'id': 'http://example.org/anno1',
+            'type': 'Annotation',
+            'body': {
+                'type': 'TextualBody',
+                'value': u'Ça va? "quoted"'
+            },
+            'target': ['http://example.org/1', 2.5],
+            'generated': '2000-01-01T00:00:00Z',
+            'generator': 'http://example.org/other'
+        })
+        AnnotationFactory(collection=collection, deleted=True)
+        expected = json.loads(self.export(collection))
+        self.flask_app.config['EXPORT_SERVER_SIDE_JSON'] = True
+        try:
+            data = json.loads(self.export(collection))
+        finally:
+            self.flask_app.config['EXPORT_SERVER_SIDE_JSON'] = False
+        assert_equal(len(data), 2)
+        assert_equal(data, expected)
+
+    @with_context
+    def test_server_side_json_without_generator(self):
+        """Test JSON built by the database without a default generator."""
+        collection = CollectionFactory()
+        annotation = AnnotationFactory(collection=collection)
+        generator = self.flask_app.config.pop('GENERATOR')
+        self.flask_app.config['EXPORT_SERVER_SIDE_JSON'] = True
+        try:
+            data = json.loads(self.export(collection))
+        finally:
+            self.flask_app.config['GENERATOR'] = generator
+            self.flask_app.config['EXPORT_SERVER_SIDE_JSON'] = False
+        assert_not_in('generator', data[0])
+        assert_equal(data[0]['id'], annotation.iri)
+
+    def export_ids(self, collection):
+        return [anno['id'] for anno in json.loads(self.export(collection))]
+
+    @with_context
+    def test_parallel_export_matches_output(self):
+        """Test Annotations exported in parallel partitions."""
+        collection = CollectionFactory()
+        AnnotationFactory.create_batch(5, collection=collection)
+        AnnotationFactory(collection=collection, deleted=True)
+        AnnotationFactory.create_batch(3)
+        AnnotationFactory.create_batch(4, collection=collection)
+        expected = sorted(self.export_ids(collection))
+        assert_equal(len(expected), 9)
+        self.exporter.workers = 3
+        for partition_size in [1, 2, 4, 100]:
+            self.exporter.partition_size = partition_size
+            data = self.export_ids(collection)
+            assert_equal(sorted(data), expected)
+        self.flask_app.config['EXPORT_SERVER_SIDE_JSON'] = True
+        try:
+            data = self.export_ids(collection)
+        finally:
+            self.flask_app.config['EXPORT_SERVER_SIDE_JSON'] = False
+        assert_equal(sorted(data), expected)
+
+    @with_context
+    def test_parallel_export_in_processes(self):
+        """Test Annotations exported in parallel worker processes."""
+        collection = CollectionFactory()
+        AnnotationFactory.create_batch(5, collection=collection)
+        expected = sorted(self.export_ids(collection))
+        self.exporter.workers = 2
+        self.exporter.processes = True
+        self.exporter.partition_size = 2
+        assert_equal(sorted(self.export_ids(collection)), expected)
+
+    @with_context
+    def test_parallel_export_of_empty_collection(self):
+        """Test an empty Collection exported in parallel."""
+        collection = CollectionFactory()
+        self.exporter.workers = 2
+        assert_equal(self.export(collection), '[]')
+        ndjson = ''.join(self.exporter.generate_ndjson(collection.id))
+        assert_equal(ndjson, '')
+
+    @with_context
+    def test_partitions(self):
+        """Test Collection keys split into ranges."""
+        collection = CollectionFactory()
+        annotations = AnnotationFactory.create_batch(10,
+                                                     collection=collection)
+        first = annotations[0].key
+        self.exporter.workers = 2
+        self.exporter.partition_size = 3
+        with db.engine.connect() as conn:
+            partitions = self.exporter._get_partitions(conn, collection)
+        assert_equal(partitions, [
+            (first, first + 3),
+            (first + 3, first + 6),
+            (first + 6, first + 9),
+            (first + 9, first + 12)
+        ])
+
+    @with_context
+    def test_partition_export_reads_snapshot(self):
+        """Test partitions are read from the exported snapshot."""
+        collection = CollectionFactory()
+        annotation = AnnotationFactory(collection=collection)
+        query = self.exporter._get_query(collection, partitioned=True)
+        serialize = self.exporter._get_serializer(collection)
+        conn = db.engine.connect()
+        trans = conn.begin()
+        try:
+            conn.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            snapshot = conn.execute('SELECT pg_export_snapshot()').scalar()
+            AnnotationFactory(collection=collection)
+            job = PartitionExport(db.engine, query, serialize,
+                                  snapshot=snapshot)
+            data = job((0, 100))
+        finally:
+            trans.rollback()
+            conn.close()
+        assert_equal([json.loads(item)['id'] for item in data],
+                     [annotation.iri])
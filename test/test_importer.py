@@ -0,0 +1,162 @@
+# -*- coding: utf8 -*-
+
+import io
+import json
+import zipfile
+from nose.tools import *
+from freezegun import freeze_time
+from base import Test, db, with_context
+from factories import CollectionFactory, AnnotationFactory
+from sqlalchemy.exc import IntegrityError
+
+from explicates.core import repo
+from explicates.exporter import Exporter
+from explicates.importer import Importer
+from explicates.model.annotation import Annotation
+from explicates.model.collection import Collection
+
+
+class TestImporter(Test):
+
+    def setUp(self):
+        super(TestImporter, self).setUp()
+        self.importer = Importer()
+        self.data = [
+            {'id': 'http://example.org/a/1/', 'body': u'[ü, ]', 'target': '1'},
+            {'body': {'value': '{"a": "\\"}"}'}, 'target': [1.5, None]},
+            {'body': 'foo', 'target': {'n': -10}}
+        ]
+
+    def read_json(self, text):
+        return list(self.importer.read_json(io.BytesIO(text.encode('utf8'))))
+
+    def export(self, collection, fmt='json'):
+        exporter = Exporter()
+        if fmt == 'ndjson':
+            return ''.join(exporter.generate_ndjson(collection.id))
+        return ''.join(exporter.generate_data(collection.id))
+
+    def test_read_json_in_pieces(self):
+        """Test a JSON list is read in pieces of any size."""
+        texts = [
+            json.dumps(self.data),
+            json.dumps(self.data, indent=4),
+            ' \n' + json.dumps(self.data, separators=(',', ':')) + '\n'
+        ]
+        for text in texts:
+            for read_size in [1, 2, 7, 100, 65536]:
+                self.importer.read_size = read_size
+                assert_equal(self.read_json(text), self.data)
+
+    def test_read_empty_json(self):
+        """Test an empty JSON list is read."""
+        assert_equal(self.read_json('[]'), [])
+        assert_equal(self.read_json(' [\n] '), [])
+
+    def test_read_invalid_json(self):
+        """Test ValueError raised reading invalid JSON."""
+        self.importer.read_size = 3
+        invalid = ['{"body": "foo"}', '[{"body": "foo"}', '[{"body": }]', '']
+        for text in invalid:
+            assert_raises(ValueError, self.read_json, text)
+
+    def test_read_ndjson(self):
+        """Test newline-delimited JSON is read."""
+        text = '\n'.join(json.dumps(obj) for obj in self.data) + '\n\n'
+        data = self.importer.read_ndjson(io.BytesIO(text.encode('utf8')))
+        assert_equal(list(data), self.data)
+
+    def test_read_zip(self):
+        """Test a ZIP file containing JSON or NDJSON is read."""
+        for fn, text in [('a.json', json.dumps(self.data)),
+                         ('a.ndjson', '\n'.join(json.dumps(obj)
+                                                for obj in self.data))]:
+            buf = io.BytesIO()
+            with zipfile.ZipFile(buf, 'w') as z:
+                z.writestr(fn, text.encode('utf8'))
+            buf.seek(0)
+            assert_equal(list(self.importer.read_zip(buf)), self.data)
+
+    def test_read_invalid_zip(self):
+        """Test ValueError raised reading an invalid ZIP file."""
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w') as z:
+            z.writestr('a.txt', b'foo')
+        buf.seek(0)
+        assert_raises(ValueError, list, self.importer.read_zip(buf))
+        not_zip = io.BytesIO(b'foo')
+        assert_raises(ValueError, list, self.importer.read_zip(not_zip))
+
+    def test_read_unsupported_format(self):
+        """Test ValueError raised reading an unsupported format."""
+        assert_raises(ValueError, self.importer.read, io.BytesIO(), 'csv')
+
+    @with_context
+    def test_import_exported_collection(self):
+        """Test an exported AnnotationCollection is restored."""
+        collection = CollectionFactory()
+        AnnotationFactory(collection=collection, data={
+            'body': {'value': u'Ça va?\ttab\\', 'language': 'fr'},
+            'target': 'foo',
+            'generator': 'http://example.org/other'
+        })
+        AnnotationFactory.create_batch(2, collection=collection)
+        AnnotationFactory(collection=collection, deleted=True)
+        for fmt in ['json', 'ndjson']:
+            with freeze_time('1984-11-19'):
+                text = self.export(collection, fmt)
+            db.session.execute('DELETE FROM annotation')
+            db.session.commit()
+            data = self.importer.read(io.BytesIO(text.encode('utf8')), fmt)
+            n = self.importer.import_data(collection, data)
+            assert_equal(n, 3)
+            assert_equal(collection.total, 3)
+            with freeze_time('1984-11-19'):
+                assert_equal(self.export(collection, fmt), text)
+
+    @with_context
+    def test_import_computes_columns(self):
+        """Test Annotation columns are computed for imported data."""
+        collection = CollectionFactory()
+        with freeze_time('1984-11-19'):
+            self.importer.import_data(collection, self.data + [{
+                'body': {'value': 'foo', 'language': 'fr'},
+                'target': 'bar',
+                'created': '2000-01-01T00:00:00Z',
+                'modified': '2001-01-01T00:00:00Z',
+                'generated': '2002-01-01T00:00:00Z'
+            }])
+        annotations = repo.filter_by(Annotation, collection=collection)
+        assert_equal(len(annotations), 4)
+        assert_equal(annotations[0].id, '1')
+        assert_equal(len(annotations[1].id), 36)
+        assert_equal([anno.created for anno in annotations],
+                     ['1984-11-19T00:00:00Z'] * 3 + ['2000-01-01T00:00:00Z'])
+        assert_equal(annotations[3].modified, '2001-01-01T00:00:00Z')
+        assert_equal([anno.language for anno in annotations],
+                     ['english'] * 3 + ['french'])
+        assert_equal(annotations[3].data, {
+            'body': {'value': 'foo', 'language': 'fr'},
+            'target': 'bar'
+        })
+        assert_equal(annotations[1].data, self.data[1])
+        assert_equal(collection.modified, '1984-11-19T00:00:00Z')
+
+    @with_context
+    def test_invalid_import_rolled_back(self):
+        """Test nothing is imported if an Annotation is invalid."""
+        collection = CollectionFactory()
+        self.importer.chunk_size = 1
+        data = self.data + [{'body': 'foo'}]
+        assert_raises(ValueError, self.importer.import_data, collection, data)
+        assert_equal(repo.filter_by(Annotation), [])
+        assert_equal(collection.modified, None)
+
+    @with_context
+    def test_import_duplicate_ids(self):
+        """Test IntegrityError raised importing an existing ID."""
+        collection = CollectionFactory()
+        AnnotationFactory(id='1')
+        assert_raises(IntegrityError, self.importer.import_data, collection,
+                      self.data)
+        assert_equal(len(repo.filter_by(Annotation)), 1)
@@ -0,0 +1,110 @@
+# -*- coding: utf8 -*-
+
+import re
+from nose.tools import *
+from mock import patch
+from base import Test, QueryCounter, db, with_context
+from factories import CollectionFactory, AnnotationFactory
+from sqlalchemy import event
+
+from explicates.core import instrumentation
+from explicates.instrumentation import RequestTimings, SerializationTimer
+
+
+SERVER_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries, (\d+) rows", '
+                           r'serialize;dur=[\d.]+, app;dur=[\d.]+$')
+
+
+class TestInstrumentation(Test):
+
+    def setUp(self):
+        super(TestInstrumentation, self).setUp()
+        instrumentation.enable(self.flask_app)
+
+    def tearDown(self):
+        instrumentation.disable()
+        super(TestInstrumentation, self).tearDown()
+
+    @with_context
+    def test_server_timing_not_sent_when_disabled(self):
+        """Test Server-Timing header not sent when disabled."""
+        instrumentation.disable()
+        collection = CollectionFactory()
+        res = self.app.get(u'/annotations/{}/'.format(collection.id))
+        assert_equal(res.status_code, 200, res.data)
+        assert_not_in('Server-Timing', res.headers)
+
+    @with_context
+    def test_listeners_removed_when_disabled(self):
+        """Test engine listeners removed when disabled."""
+        listener = instrumentation._after_cursor_execute
+        assert event.contains(db.engine, 'after_cursor_execute', listener)
+        instrumentation.disable()
+        assert not event.contains(db.engine, 'after_cursor_execute',
+                                  listener)
+
+    @with_context
+    def test_server_timing_header(self):
+        """Test Server-Timing header sent with the queries made."""
+        collection = CollectionFactory()
+        AnnotationFactory.create_batch(2, collection=collection)
+        endpoint = u'/annotations/{}/?page=0'.format(collection.id)
+        with QueryCounter() as counter:
+            res = self.app.get(endpoint)
+        assert_equal(res.status_code, 200, res.data)
+        match = SERVER_TIMING.match(res.headers['Server-Timing'])
+        assert match, res.headers['Server-Timing']
+        assert_equal(int(match.group(1)), counter.count)
+
+    @with_context
+    def test_timings_logged_after_response(self):
+        """Test timings logged after the streamed page items are sent."""
+        collection = CollectionFactory()
+        AnnotationFactory.create_batch(3, collection=collection)
+        endpoint = u'/annotations/{}/?page=0'.format(collection.id)
+        with patch.object(instrumentation, 'logger') as mock_logger:
+            res = self.app.get(endpoint)
+        assert_equal(res.status_code, 200, res.data)
+        assert_equal(mock_logger.info.call_count, 1)
+        msg = mock_logger.info.call_args[0][0]
+        timings = mock_logger.info.call_args[1]['extra']['timings']
+        assert msg.startswith(u'method=GET path=/annotations/{}/ status=200 '
+                              .format(collection.id)), msg
+        assert_equal(sorted(timings.keys()),
+                     ['method', 'path', 'queries', 'rows', 'serialize_ms',
+                      'sql_ms', 'status', 'total_ms'])
+        match = SERVER_TIMING.match(res.headers['Server-Timing'])
+        assert_equal(timings['queries'], int(match.group(1)))
+        assert_equal(timings['rows'], int(match.group(2)) + 3)
+
+    @with_context
+    def test_timings_logged_for_errors(self):
+        """Test timings logged for error responses."""
+        with patch.object(instrumentation, 'logger') as mock_logger:
+            res = self.app.get('/annotations/foo/')
+        assert_equal(res.status_code, 404, res.data)
+        timings = mock_logger.info.call_args[1]['extra']['timings']
+        assert_equal(timings['status'], 404)
+        assert_equal(timings['queries'], 1)
+        assert_in('Server-Timing', res.headers)
+
+    @with_context
+    def test_queries_outside_requests_not_recorded(self):
+        """Test queries made outside of a request are not recorded."""
+        collection = CollectionFactory()
+        assert_equal(instrumentation.get_timings(), None)
+        with instrumentation.serializing():
+            collection.dictize()
+        instrumentation.add_rows(1)
+
+    @patch('explicates.instrumentation.default_timer')
+    def test_serialization_excludes_sql(self, mock_timer):
+        """Test SQL time excluded from nested serialization timers."""
+        mock_timer.side_effect = [0, 1, 10]
+        timings = RequestTimings()
+        with SerializationTimer(timings):
+            timings.sql += 3
+            with SerializationTimer(timings):
+                pass
+        assert_equal(timings.serialize, 6)
+        assert_equal(timings.serializing, 0)
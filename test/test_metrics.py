@@ -0,0 +1,111 @@
+# -*- coding: utf8 -*-
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+from nose.tools import *
+from mock import patch
+from base import Test, db, with_context
+from sqlalchemy import event
+
+import explicates
+from explicates.core import metrics
+from explicates.metrics import Metrics
+
+
+class TestMetrics(Test):
+
+    def setUp(self):
+        super(TestMetrics, self).setUp()
+        metrics.enable(self.flask_app)
+
+    def tearDown(self):
+        metrics.disable()
+        super(TestMetrics, self).tearDown()
+
+    def get_sample_value(self, name, **labels):
+        return metrics.registry.get_sample_value(name, labels) or 0
+
+    @with_context
+    def test_pool_gauges(self):
+        """Test pool gauges track the connections checked out."""
+        labels = dict(bind='default')
+        conn1 = db.engine.connect()
+        conn2 = db.engine.connect()
+        assert_equal(self.get_sample_value('explicates_db_pool_checked_out',
+                                           **labels), 2)
+        assert_equal(self.get_sample_value('explicates_db_pool_overflow',
+                                           **labels), 0)
+        conn1.close()
+        conn2.close()
+        assert_equal(self.get_sample_value('explicates_db_pool_checked_out',
+                                           **labels), 0)
+
+    @with_context
+    def test_pool_overflow_gauge(self):
+        """Test pool overflow gauge counts connections beyond the size."""
+        labels = dict(bind='default')
+        with patch.object(db.engine.pool, 'size', return_value=1):
+            conn1 = db.engine.connect()
+            conn2 = db.engine.connect()
+            assert_equal(self.get_sample_value('explicates_db_pool_overflow',
+                                               **labels), 1)
+            conn2.close()
+            assert_equal(self.get_sample_value('explicates_db_pool_overflow',
+                                               **labels), 0)
+            conn1.close()
+
+    @with_context
+    def test_pool_listeners_removed_when_disabled(self):
+        """Test pool listeners removed when disabled."""
+        pool, identifier, listener = metrics._listeners[0]
+        assert event.contains(pool, identifier, listener)
+        metrics.disable()
+        assert not event.contains(pool, identifier, listener)
+
+    @with_context
+    def test_request_latency_recorded(self):
+        """Test request counts and latencies recorded by endpoint."""
+        labels = dict(endpoint='none', method='GET')
+        count = self.get_sample_value(
+            'explicates_request_duration_seconds_count', **labels)
+        res = self.app.get('/foo/')
+        assert_equal(res.status_code, 404, res.data)
+        assert_equal(self.get_sample_value(
+            'explicates_request_duration_seconds_count', **labels), count + 1)
+        assert self.get_sample_value('explicates_requests_total',
+                                     status='404', **labels) >= 1
+
+    @with_context
+    def test_requests_not_recorded_when_disabled(self):
+        """Test requests not recorded when disabled."""
+        metrics.disable()
+        labels = dict(endpoint='api.index', method='GET', status='200')
+        count = self.get_sample_value('explicates_requests_total', **labels)
+        self.app.get('/annotations/')
+        assert_equal(self.get_sample_value('explicates_requests_total',
+                                           **labels), count)
+
+    def test_metrics_aggregated_across_processes(self):
+        """Test metrics aggregated from the files of each process."""
+        tmp_dir = tempfile.mkdtemp()
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=tmp_dir,
+                   PYTHONPATH=os.path.dirname(os.path.dirname(
+                       os.path.abspath(explicates.__file__))))
+        script = ("from explicates.metrics import Metrics; "
+                  "m = Metrics(None); "
+                  "m.requests.labels('api.index', 'GET', 200).inc(); "
+                  "m.pool_checked_out.labels('default').set(2)")
+        try:
+            for _ in range(2):
+                subprocess.check_call([sys.executable, '-c', script],
+                                      env=env)
+            with patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=tmp_dir):
+                out = Metrics(None).generate().decode('utf8')
+        finally:
+            shutil.rmtree(tmp_dir)
+        assert_in('explicates_requests_total{endpoint="api.index",'
+                  'method="GET",status="200"} 2.0', out)
+        assert_in('explicates_db_pool_checked_out{bind="default"} 4.0', out)
@@ -85,3 +85,60 @@ class TestModelAnnotation(Test):
         db.session.add(annotation)
         db.session.commit()
         assert_equal(annotation.language, 'german')
+
+    @with_context
+    def test_language_updated_with_data(self):
+        """Test language is updated when the data is modified."""
+        annotation_data = {
+            'body': 'foo',
+            'target': 'bar'
+        }
+        collection = Collection()
+        annotation = Annotation(collection=collection, data=annotation_data)
+        db.session.add(annotation)
+        db.session.commit()
+        annotation.data = {
+            'body': {
+                'language': 'fr'
+            },
+            'target': 'bar'
+        }
+        db.session.commit()
+        assert_equal(annotation.language, 'french')
+
+    @with_context
+    def test_tsv_columns_stored(self):
+        """Test the full-text search documents are stored."""
+        annotation_data = {
+            'body': {
+                'type': 'TextualBody',
+                'value': 'les chevaux',
+                'language': 'fr'
+            },
+            'target': 'http://example.org/foo'
+        }
+        collection = Collection()
+        annotation = Annotation(collection=collection, data=annotation_data)
+        db.session.add(annotation)
+        db.session.commit()
+        assert_in("'cheval'", annotation.body_tsv)
+        assert_in("'example.org/foo'", annotation.target_tsv)
+
+    @with_context
+    def test_tsv_columns_updated_with_data(self):
+        """Test the full-text search documents are updated with the data."""
+        annotation_data = {
+            'body': 'foo',
+            'target': 'bar'
+        }
+        collection = Collection()
+        annotation = Annotation(collection=collection, data=annotation_data)
+        db.session.add(annotation)
+        db.session.commit()
+        annotation.data = {
+            'body': 'baz',
+            'target': 'qux'
+        }
+        db.session.commit()
+        assert_equal(annotation.body_tsv, "'baz':1")
+        assert_equal(annotation.target_tsv, "'qux':1")
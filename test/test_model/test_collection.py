@@ -3,7 +3,9 @@
 from flask import url_for
 from nose.tools import *
 from base import Test, db, with_context
+from factories import CollectionFactory, AnnotationFactory
 
+from explicates.core import repo
 from explicates.model.collection import Collection
 from explicates.model.annotation import Annotation
 
@@ -71,3 +73,53 @@ class TestModelCollection(Test):
         db.session.add(deleted_annotation)
         db.session.commit()
         assert_equal(collection.total, 1)
+
+    @with_context
+    def test_total_of_new_collection_is_zero(self):
+        """Test Collection total is zero before it is saved."""
+        collection = Collection()
+        assert_equal(collection.total, 0)
+
+    @with_context
+    def test_total_updated_when_annotations_deleted(self):
+        """Test Collection total updated when Annotations are deleted."""
+        collection = CollectionFactory()
+        annotations = AnnotationFactory.create_batch(4, collection=collection)
+        other_annotation = AnnotationFactory()
+        assert_equal(collection.total, 4)
+
+        repo.delete(Annotation, annotations[0].key)
+        assert_equal(collection.total, 3)
+
+        repo.batch_delete(Annotation, [anno.id for anno in annotations[1:3]])
+        assert_equal(collection.total, 1)
+        assert_equal(other_annotation.collection.total, 1)
+
+    @with_context
+    def test_total_updated_when_annotations_removed(self):
+        """Test Collection total updated when Annotations are removed."""
+        collection = CollectionFactory()
+        annotations = AnnotationFactory.create_batch(2, collection=collection)
+        db.session.delete(annotations[0])
+        db.session.commit()
+        assert_equal(collection.total, 1)
+
+    @with_context
+    def test_version_updated_when_annotations_change(self):
+        """Test Collection version changes whenever its Annotations do."""
+        collection = CollectionFactory()
+        annotation = AnnotationFactory(collection=collection)
+        other_annotation = AnnotationFactory()
+        version = collection.get_version()
+
+        annotation.data = dict(annotation.data, body='foo')
+        repo.update(Annotation, annotation)
+        assert_not_equal(collection.get_version(), version)
+        version = collection.get_version()
+
+        other_annotation.data = dict(other_annotation.data, body='foo')
+        repo.update(Annotation, other_annotation)
+        assert_equal(collection.get_version(), version)
+
+        repo.delete(Annotation, annotation.key)
+        assert_not_equal(collection.get_version(), version)
@@ -57,3 +57,55 @@ class TestRepository(Test):
         db.session.commit()
         n = repo.count(Annotation)
         assert_equal(n, 1)
+
+    @with_context
+    def test_batch_save_in_chunks(self):
+        """Test batch save inserts all rows when split into chunks."""
+        collection = Collection()
+        db.session.add(collection)
+        db.session.commit()
+        rows = [dict(id=str(i), collection_key=collection.key, deleted=False,
+                     language='english', _data={'body': 'foo'})
+                for i in range(5)]
+        repo.batch_save(Annotation, rows, chunk_size=2)
+        annotations = repo.filter_by(Annotation)
+        assert_equal([anno.id for anno in annotations],
+                     ['0', '1', '2', '3', '4'])
+        assert_equal(collection.total, 5)
+
+    @with_context
+    def test_batch_delete_in_chunks(self):
+        """Test batch delete updates all rows when split into chunks."""
+        collection = Collection()
+        db.session.add(collection)
+        db.session.commit()
+        rows = [dict(id=str(i), collection_key=collection.key, deleted=False,
+                     language='english', _data={'body': 'foo'})
+                for i in range(5)]
+        repo.batch_save(Annotation, rows)
+        repo.batch_delete(Annotation, ['0', '1', '2', '3', '1'], chunk_size=2)
+        annotations = repo.filter_by(Annotation, deleted=False)
+        assert_equal([anno.id for anno in annotations], ['4'])
+        assert_equal(collection.total, 1)
+
+    @with_context
+    def test_batch_copy_in_chunks(self):
+        """Test batch copy loads all rows when split into chunks."""
+        collection = Collection()
+        db.session.add(collection)
+        db.session.commit()
+        body = u'tab\there\nnewline \\ backslash ✓'
+        rows = [dict(id=str(i), collection_key=collection.key, deleted=False,
+                     language='english', modified=None,
+                     _data={'body': body})
+                for i in range(5)]
+        columns = ['id', 'collection_key', 'deleted', 'language', 'modified',
+                   '_data']
+        n = repo.batch_copy(Annotation, iter(rows), columns, chunk_size=2)
+        assert_equal(n, 5)
+        annotations = repo.filter_by(Annotation)
+        assert_equal([anno.id for anno in annotations],
+                     ['0', '1', '2', '3', '4'])
+        assert_equal([anno.data['body'] for anno in annotations], [body] * 5)
+        assert_equal([anno.modified for anno in annotations], [None] * 5)
+        assert_equal(collection.total, 5)
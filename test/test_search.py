@@ -2,13 +2,17 @@
 
 import json
 from nose.tools import *
+from mock import patch
+from flask import current_app
 from base import Test, db, with_context
 from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.sql import and_
 from datetime import datetime, timedelta
 
-from factories import AnnotationFactory
-from explicates.search import Search
+from factories import CollectionFactory, AnnotationFactory
+from explicates.core import repo
+from explicates.model.annotation import Annotation
+from explicates.search import Search, Explain
 
 
 class TestSearch(Test):
@@ -17,6 +21,41 @@ class TestSearch(Test):
         super(TestSearch, self).setUp()
         self.search = Search(db)
 
+    @with_context
+    def test_search_by_fts_phrase_with_language(self):
+        """Test search by fts phrase parses the query in its language."""
+        anno = AnnotationFactory(data={
+            'body': {
+                'type': 'TextualBody',
+                'value': 'les chevaux noirs',
+                'language': 'fr'
+            }
+        })
+        fts_phrase_query = {
+            'body': {
+                'query': 'chevaux noirs',
+                'language': 'fr'
+            }
+        }
+        results = self.search.search(fts_phrase=fts_phrase_query).all()
+        assert_equal(results, [anno])
+
+    @with_context
+    def test_search_with_invalid_order_by(self):
+        """Test search raises ValueError ordering by an unknown column."""
+        for order_by in ['foo', 'iri', 'created desc', None]:
+            assert_raises(ValueError, self.search.search, order_by=order_by)
+
+    @with_context
+    def test_search_ordered_by_column(self):
+        """Test search ordered by a column, with and without a limit."""
+        anno1 = AnnotationFactory(data={'body': 'b', 'target': 'b'})
+        anno2 = AnnotationFactory(data={'body': 'a', 'target': 'a'})
+        results = self.search.search(order_by='_data').all()
+        assert_equal(results, [anno2, anno1])
+        results = self.search.search(order_by='_data', limit=1).all()
+        assert_equal(results, [anno2])
+
     def test_collection_clause(self):
         """Test collection clause."""
         iri = 'foo'
@@ -29,7 +68,7 @@ class TestSearch(Test):
         anno = AnnotationFactory()
         AnnotationFactory()
         collection_iri = anno.collection.id
-        results = self.search.search(collection=collection_iri)
+        results = self.search.search(collection=collection_iri).all()
         assert_equal(results, [anno])
 
     def test_contains_clause(self):
@@ -49,7 +88,7 @@ class TestSearch(Test):
         data = {'foo': 'bar'}
         anno = AnnotationFactory(data=data)
         AnnotationFactory(data={'baz': 'qux'})
-        results = self.search.search(contains=data)
+        results = self.search.search(contains=data).all()
         assert_equal(results, [anno])
 
     @with_context
@@ -59,9 +98,20 @@ class TestSearch(Test):
         anno = AnnotationFactory(data=data)
         AnnotationFactory(data={'baz': 'qux'})
         collection_iri = anno.collection.id
-        results = self.search.search(collection=collection_iri, contains=data)
+        results = self.search.search(collection=collection_iri,
+                                     contains=data).all()
         assert_equal(results, [anno])
 
+    @with_context
+    def test_contains_queries_use_index(self):
+        """Test contains queries use the data index."""
+        AnnotationFactory.create_batch(3)
+        db.session.execute('SET enable_seqscan = off')
+        query = self.search.search(contains={'target': {'source': 'foo'}})
+        plan = db.session.execute(Explain(query.statement)).scalar()
+        assert_in('idx_annotation_data', json.dumps(plan))
+        db.session.rollback()
+
     def test_ranges_clause(self):
         """Test range clauses."""
         data = {
@@ -107,7 +157,7 @@ class TestSearch(Test):
                 'lt': anno_now.created
             }
         }
-        results = self.search.search(range=range_query)
+        results = self.search.search(range=range_query).all()
         assert_equal(results, [anno_yesterday])
 
     @with_context
@@ -120,7 +170,7 @@ class TestSearch(Test):
                 'gt': 42
             }
         }
-        results = self.search.search(range=range_query)
+        results = self.search.search(range=range_query).all()
         assert_equal(results, [anno])
 
     def test_fts_clauses_with_invalid_json(self):
@@ -148,9 +198,88 @@ class TestSearch(Test):
                 'query': 'fo'
             }
         }
-        results = self.search.search(fts=fts_query)
+        results = self.search.search(fts=fts_query).all()
         assert_equal(results, [anno1])
 
+    @with_context
+    def test_search_by_fts_multiple_columns(self):
+        """Test search by fts over multiple columns."""
+        anno1 = AnnotationFactory(data={'body': 'foo', 'target': 'bar'})
+        anno2 = AnnotationFactory(data={'body': 'foo', 'target': 'baz'})
+        fts_query = {
+            'body': {
+                'query': 'foo'
+            },
+            'target': {
+                'query': 'bar'
+            }
+        }
+        results = self.search.search(fts=fts_query).all()
+        assert_equal(results, [anno1])
+
+    @with_context
+    def test_search_by_fts_uses_annotation_language(self):
+        """Test search by fts uses the language of each Annotation."""
+        anno = AnnotationFactory(data={
+            'body': {
+                'type': 'TextualBody',
+                'value': 'les chevaux',
+                'language': 'fr'
+            }
+        })
+        assert_equal(anno.language, 'french')
+        fts_query = {
+            'body': {
+                'query': 'chevaux',
+                'prefix': False,
+                'language': 'fr-FR'
+            }
+        }
+        results = self.search.search(fts=fts_query).all()
+        assert_equal(results, [anno])
+
+        # Parsed using the default language
+        del fts_query['body']['language']
+        results = self.search.search(fts=fts_query).all()
+        assert_equal(results, [])
+
+    @with_context
+    def test_search_by_fts_with_invalid_language(self):
+        """Test search by fts with an invalid language."""
+        fts_query = {
+            'body': {
+                'query': 'foo',
+                'language': ['fr']
+            }
+        }
+        assert_raises(ValueError, self.search.search, fts=fts_query)
+
+    @with_context
+    def test_fts_queries_use_indexes(self):
+        """Test fts and fts phrase queries use the full-text indexes."""
+        # Enough rows for the planner to choose a selective index
+        collection = CollectionFactory()
+        rows = [dict(id=str(i), created='1984-11-19T00:00:00Z', deleted=False,
+                     language='english', collection_key=collection.key,
+                     _data={'body': 'body{}'.format(i),
+                            'target': 'target{}'.format(i)})
+                for i in range(1000)]
+        repo.batch_save(Annotation, rows)
+        db.session.execute('ANALYZE annotation')
+        db.session.execute('SET LOCAL enable_seqscan = off')
+        for path in ['body', 'target']:
+            search_args = {
+                'fts': {path: {'query': 'foo'}},
+                'fts_phrase': {path: {'query': 'foo bar'}}
+            }
+            for key, value in search_args.items():
+                query = self.search.search(**{key: value})
+                explain = Explain(query.statement)
+                plan = db.session.execute(explain).scalar()
+                index_name = 'idx_annotation_{}_tsv'.format(path)
+                assert_in(index_name, json.dumps(plan))
+        db.session.rollback()
+
     @with_context
     def test_search_by_fts_different_case(self):
         """Test search by fts with different case."""
@@ -161,7 +290,7 @@ class TestSearch(Test):
                 'query': 'fo'
             }
         }
-        results = self.search.search(fts=fts_query)
+        results = self.search.search(fts=fts_query).all()
         assert_equal(results, [anno1])
 
     @with_context
@@ -173,7 +302,7 @@ class TestSearch(Test):
                 'query': 'source'
             }
         }
-        results = self.search.search(fts=fts_query)
+        results = self.search.search(fts=fts_query).all()
         assert_equal(results, [])
 
     @with_context
@@ -187,7 +316,7 @@ class TestSearch(Test):
                 'prefix': False
             }
         }
-        results = self.search.search(fts=fts_query)
+        results = self.search.search(fts=fts_query).all()
         assert_equal(results, [anno1])
 
     @with_context
@@ -202,7 +331,7 @@ class TestSearch(Test):
                 'operator': 'or'
             }
         }
-        results = self.search.search(fts=fts_query)
+        results = self.search.search(fts=fts_query).all()
         assert_equal(results, [anno1, anno2])
 
     def test_fts_phrase_clauses_with_invalid_settings(self):
@@ -226,7 +355,7 @@ class TestSearch(Test):
                 'query': 'foo bar baz'
             }
         }
-        results = self.search.search(fts_phrase=fts_phrase_query)
+        results = self.search.search(fts_phrase=fts_phrase_query).all()
         assert_equal(results, [anno1, anno2])
 
     @with_context
@@ -241,7 +370,7 @@ class TestSearch(Test):
                 'distance': 3
             }
         }
-        results = self.search.search(fts_phrase=fts_phrase_query)
+        results = self.search.search(fts_phrase=fts_phrase_query).all()
         assert_equal(results, [anno1])
 
     def test_collection_clause(self):
@@ -255,7 +384,7 @@ class TestSearch(Test):
         """Test search excludes deleted Annotations by default."""
         anno = AnnotationFactory()
         AnnotationFactory(deleted=True)
-        results = self.search.search()
+        results = self.search.search().all()
         assert_equal(results, [anno])
 
     @with_context
@@ -263,7 +392,7 @@ class TestSearch(Test):
         """Test search excludes deleted Annotations explicitly."""
         anno = AnnotationFactory()
         AnnotationFactory(deleted=True)
-        results = self.search.search(deleted='exclude')
+        results = self.search.search(deleted='exclude').all()
         assert_equal(results, [anno])
 
     @with_context
@@ -271,7 +400,7 @@ class TestSearch(Test):
         """Test search includes deleted Annotations."""
         anno1 = AnnotationFactory()
         anno2 = AnnotationFactory(deleted=True)
-        results = self.search.search(deleted='include')
+        results = self.search.search(deleted='include').all()
         assert_equal(results, [anno1, anno2])
 
     @with_context
@@ -279,7 +408,7 @@ class TestSearch(Test):
         """Test search returns only deleted Annotations."""
         anno = AnnotationFactory(deleted=True)
         AnnotationFactory()
-        results = self.search.search(deleted='only')
+        results = self.search.search(deleted='only').all()
         assert_equal(results, [anno])
 
     @with_context
@@ -293,5 +422,50 @@ class TestSearch(Test):
         size = 5
         offset = 2
         annotations = AnnotationFactory.create_batch(size)
-        results = self.search.search(offset=offset)
+        results = self.search.search(offset=offset).all()
         assert_equal(len(results), size - offset)
+
+    @with_context
+    def test_limited_results_can_be_sliced(self):
+        """Test search results with limit and offset can be sliced."""
+        annotations = AnnotationFactory.create_batch(6)
+        results = self.search.search(limit=3, offset=2)
+        assert_equal(results[1:5], annotations[3:5])
+
+    @with_context
+    def test_count(self):
+        """Test count search results."""
+        AnnotationFactory.create_batch(3)
+        AnnotationFactory(deleted=True)
+        query = self.search.search()
+        assert_equal(self.search.count(query), 3)
+
+    @with_context
+    def test_count_with_limit(self):
+        """Test count search results with limit."""
+        AnnotationFactory.create_batch(3)
+        query = self.search.search(limit=2)
+        assert_equal(self.search.count(query), 2)
+
+    @with_context
+    @patch('explicates.search.Search.estimate')
+    def test_count_estimated_over_threshold(self, mock_estimate):
+        """Test count search results estimated over the threshold."""
+        AnnotationFactory.create_batch(3)
+        query = self.search.search()
+        mock_estimate.return_value = 100
+        current_app.config['SEARCH_ESTIMATE_THRESHOLD'] = 10
+        try:
+            assert_equal(self.search.count(query), 100)
+            mock_estimate.return_value = 5
+            assert_equal(self.search.count(query), 3)
+        finally:
+            current_app.config['SEARCH_ESTIMATE_THRESHOLD'] = None
+
+    @with_context
+    def test_estimate(self):
+        """Test estimate search results using the query planner."""
+        AnnotationFactory.create_batch(3)
+        query = self.search.search()
+        estimate = self.search.estimate(query)
+        assert_true(isinstance(estimate, int))
@@ -0,0 +1,94 @@
+# -*- coding: utf8 -*-
+
+import time
+from mock import patch, MagicMock
+from nose.tools import *
+from base import Test, with_context
+from factories import CollectionFactory
+
+from explicates.core import db, repo
+from explicates.session import get_read_session, LAST_WRITE_COOKIE
+from explicates.model.collection import Collection
+
+
+class TestSession(Test):
+
+    def setUp(self):
+        super(TestSession, self).setUp()
+        self.slave_session = MagicMock()
+
+    @with_context
+    def test_read_session_outside_request(self):
+        """Test the master session is used outside of a request."""
+        with patch.object(db, 'slave_session', self.slave_session):
+            assert_equal(get_read_session(db), db.session)
+
+    @with_context
+    def test_read_session_for_read_requests(self):
+        """Test the slave session is used for GET and HEAD requests."""
+        with patch.object(db, 'slave_session', self.slave_session):
+            for method in ['GET', 'HEAD']:
+                with self.flask_app.test_request_context(method=method):
+                    assert_equal(get_read_session(db), self.slave_session)
+
+    @with_context
+    def test_read_session_for_write_requests(self):
+        """Test the master session is used for write requests."""
+        with patch.object(db, 'slave_session', self.slave_session):
+            for method in ['POST', 'PUT', 'DELETE']:
+                with self.flask_app.test_request_context(method=method):
+                    assert_equal(get_read_session(db), db.session)
+
+    @with_context
+    def test_read_session_after_recent_write(self):
+        """Test the master session is used after a recent write."""
+        self.flask_app.config['READ_YOUR_WRITES_WINDOW'] = 5
+        now = time.time()
+        cookies = {
+            str(now - 1): db.session,
+            str(now - 10): self.slave_session,
+            'foo': self.slave_session
+        }
+        with patch.object(db, 'slave_session', self.slave_session):
+            for value, session in cookies.items():
+                cookie = '{0}={1}'.format(LAST_WRITE_COOKIE, value)
+                headers = {'Cookie': cookie}
+                with self.flask_app.test_request_context(headers=headers):
+                    assert_equal(get_read_session(db), session)
+        self.flask_app.config['READ_YOUR_WRITES_WINDOW'] = None
+
+    @with_context
+    def test_repository_reads_from_read_session(self):
+        """Test the repository reads via the read session."""
+        collection = CollectionFactory()
+        self.slave_session.query.return_value = db.session.query(Collection)
+        with patch.object(db, 'slave_session', self.slave_session):
+            with self.flask_app.test_request_context(method='GET'):
+                assert_equal(repo.get_by(Collection, id=collection.id),
+                             collection)
+        self.slave_session.query.assert_called_once_with(Collection)
+
+    @with_context
+    def test_last_write_cookie_set_after_write(self):
+        """Test the last write cookie is set after a write."""
+        self.flask_app.config['READ_YOUR_WRITES_WINDOW'] = 5
+        endpoint = '/annotations/'
+        data = dict(type=['AnnotationCollection', 'BasicContainer'])
+        res = self.app_post_json_ld(endpoint, data=data)
+        assert_equal(res.status_code, 201, res.data)
+        cookie = res.headers.get('Set-Cookie')
+        assert_true(cookie.startswith(LAST_WRITE_COOKIE), cookie)
+        assert_in('Max-Age=5', cookie)
+
+        res = self.app.get(endpoint)
+        assert_equal(res.headers.get('Set-Cookie'), None)
+        self.flask_app.config['READ_YOUR_WRITES_WINDOW'] = None
+
+    @with_context
+    def test_last_write_cookie_not_set_by_default(self):
+        """Test the last write cookie is not set by default."""
+        endpoint = '/annotations/'
+        data = dict(type=['AnnotationCollection', 'BasicContainer'])
+        res = self.app_post_json_ld(endpoint, data=data)
+        assert_equal(res.status_code, 201, res.data)
+        assert_equal(res.headers.get('Set-Cookie'), None)
@@ -0,0 +1,62 @@
+# -*- coding: utf8 -*-
+
+import os
+import json
+import shutil
+import tempfile
+from nose.tools import *
+from base import Test, with_context
+from flask import current_app
+from jsonschema.exceptions import ValidationError
+
+from explicates.validator import Validator
+from explicates.model.annotation import Annotation
+from explicates.model.collection import Collection
+
+
+class TestValidator(Test):
+
+    def setUp(self):
+        super(TestValidator, self).setUp()
+        self.schemas_dir = os.path.join(self.flask_app.root_path, 'schemas')
+        self.validator = Validator([Annotation, Collection], self.schemas_dir)
+
+    def test_validators_built_for_each_model(self):
+        """Test a validator is built for each model class."""
+        assert_equal(set(self.validator.validators.keys()),
+                     set([Annotation, Collection]))
+
+    def test_valid_data(self):
+        """Test valid data passes validation."""
+        data = {
+            'type': 'Annotation',
+            'body': 'foo',
+            'target': 'bar'
+        }
+        self.validator.validate(data, Annotation)
+
+    def test_invalid_data(self):
+        """Test invalid data raises a ValidationError."""
+        data = {'type': 'Annotation'}
+        assert_raises(ValidationError, self.validator.validate, data,
+                      Annotation)
+
+    def test_schema_reloaded_when_modified(self):
+        """Test a modified schema is reloaded when auto reload is enabled."""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            for fn in ['annotation.json', 'collection.json']:
+                shutil.copy(os.path.join(self.schemas_dir, fn), tmp_dir)
+            validator = Validator([Annotation, Collection], tmp_dir,
+                                  auto_reload=True)
+            data = {'type': ['AnnotationCollection', 'BasicContainer']}
+            validator.validate(data, Collection)
+
+            schema_path = os.path.join(tmp_dir, 'collection.json')
+            with open(schema_path, 'w') as json_file:
+                json.dump({'type': 'object', 'required': ['label']}, json_file)
+            os.utime(schema_path, (0, 0))
+            assert_raises(ValidationError, validator.validate, data,
+                          Collection)
+        finally:
+            shutil.rmtree(tmp_dir)